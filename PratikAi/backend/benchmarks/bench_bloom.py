@@ -0,0 +1,87 @@
+"""
+Bloom analizcisi benchmark'ı - büyük soru bankalarında sınıflandırma hızı
+
+Kullanım:
+    python benchmarks/bench_bloom.py
+    python benchmarks/bench_bloom.py --sizes 1000,50000 --json sonuc.json
+
+"eski" modu, her soru için iki anahtar kelime listesini iç içe any() ile tarayan önceki
+davranışı taklit eder (yalnızca iki düzey ayırt eder).
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+# Backend dizinini path'e ekle
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from services.bloom_analyzer import bloom_distribution
+
+TEMPLATES = (
+    "Hücre zarının görevi aşağıdakilerden hangisidir?",
+    "Mitokondri ile kloroplastı enerji dönüşümü bakımından karşılaştırınız.",
+    "Fotosentezin neden gündüz gerçekleştiğini açıklayınız.",
+    "Verilen kütle ve ivmeye göre kuvveti hesaplayınız.",
+    "Osmanlı Devleti'nin kuruluşu ne zaman gerçekleşmiştir?",
+    "Sizce bu deney düzeneğindeki en önemli eksiklik nedir? Değerlendiriniz.",
+    "Besin zinciri için yeni bir deney tasarlayınız.",
+    "İstanbul'un fethinin ticaret yollarına etkisini inceleyiniz.",
+    "Aşağıdaki ifadelerden hangisi mitoz bölünme için doğrudur?",
+)
+
+
+def make_questions(count: int, seed: int = 42):
+    """Tekrarlanabilir sentetik soru bankası"""
+    rng = random.Random(seed)
+    return [{"question": f"{i + 1}. {rng.choice(TEMPLATES)}"} for i in range(count)]
+
+
+def legacy_analyze(questions):
+    """Önceki davranış: iki anahtar kelime listesi, soru başına iç içe tarama"""
+    knowledge_keywords = ["nedir", "kimdir", "nerede", "ne zaman", "hangisidir", "tanımla"]
+    comprehension_keywords = ["neden", "nasıl", "açıkla", "karşılaştır", "yorumla", "örnek ver"]
+    knowledge_count = comprehension_count = 0
+    for q_data in questions:
+        question_text = q_data.get("question", "").lower()
+        if any(keyword in question_text for keyword in comprehension_keywords):
+            comprehension_count += 1
+        elif any(keyword in question_text for keyword in knowledge_keywords):
+            knowledge_count += 1
+    return knowledge_count, comprehension_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bloom analizcisi benchmark'ı")
+    parser.add_argument("--sizes", default="100,10000,50000")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    report = {}
+    for size in [int(n) for n in args.sizes.split(",")]:
+        questions = make_questions(size)
+        for name, analyze in (("eski", legacy_analyze), ("otomat", bloom_distribution)):
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                analyze(questions)
+                timings.append(time.perf_counter() - start)
+            best = min(timings)
+            report[f"{name}_{size}"] = {"seconds": round(best, 4), "questions_per_s": round(size / best)}
+            print(f"{name:<7} {size:>6} soru: {best * 1000:8.1f} ms ({size / best:,.0f} soru/s)")
+
+    print("\nDağılım örneği:", bloom_distribution(make_questions(1000))["counts"])
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nSonuçlar '{args.json}' dosyasına yazıldı.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+OCR ön işleme benchmark'ı - gecikme ve karakter doğruluğu karşılaştırması
+
+Kullanım:
+    python benchmarks/bench_ocr.py                      # Sentetik örnek seti
+    python benchmarks/bench_ocr.py --samples klasor/    # Yerel örnek seti
+    python benchmarks/bench_ocr.py --json sonuc.json
+
+Yerel örnek setinde her görselin yanında aynı isimli bir .txt dosyası
+(beklenen metin) bulunmalıdır: sayfa1.jpg + sayfa1.txt
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Backend dizinini path'e ekle
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from PIL import Image, ImageDraw, ImageFont
+
+from services.image_preprocessor import preprocess_image
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+SAMPLE_SENTENCES = [
+    "Hücre canlıların en küçük yapı birimidir.",
+    "Fotosentez klorofil içeren hücrelerde gerçekleşir.",
+    "Osmanlı Devleti 1299 yılında kuruldu.",
+    "Newton'un ikinci yasası F = m * a şeklindedir.",
+    "Su molekülü iki hidrojen ve bir oksijen atomundan oluşur.",
+    "Türkiye'nin başkenti Ankara'dır.",
+    "Mitoz bölünme sonucunda iki yeni hücre oluşur.",
+    "Işık hızı saniyede yaklaşık üç yüz bin kilometredir.",
+]
+
+# Karşılaştırılan ön işleme yapılandırmaları
+CONFIGS = {
+    "ham": None,
+    "kucultme": {"deskew": False, "binarize_output": False},
+    "kucultme+egiklik": {"deskew": True, "binarize_output": False},
+    "kucultme+ikili": {"deskew": False, "binarize_output": True},
+}
+
+
+def _load_font(size: int):
+    """Backend'deki DejaVuSans.ttf'i, yoksa Pillow'un varsayılan fontunu kullan"""
+    try:
+        return ImageFont.truetype(os.path.join(backend_dir, "DejaVuSans.ttf"), size)
+    except OSError:
+        return ImageFont.load_default(size=size)
+
+
+def generate_synthetic_samples(output_dir: str, count: int = 6, seed: int = 42) -> None:
+    """
+    Sabit tohumla tekrarlanabilir, telefon fotoğrafı boyutunda (4000x3000)
+    hafif eğik metin görselleri üretir.
+    """
+    rng = random.Random(seed)
+    font = _load_font(72)
+    for index in range(count):
+        lines = rng.sample(SAMPLE_SENTENCES, 4)
+        image = Image.new("L", (4000, 3000), 235)
+        draw = ImageDraw.Draw(image)
+        for line_no, line in enumerate(lines):
+            draw.text((300, 400 + line_no * 200), line, fill=20, font=font)
+        image = image.rotate(rng.uniform(-3, 3), fillcolor=235, resample=Image.Resampling.BICUBIC)
+        image.convert("RGB").save(os.path.join(output_dir, f"ornek_{index}.jpg"), quality=90)
+        with open(os.path.join(output_dir, f"ornek_{index}.txt"), "w", encoding="utf-8") as f:
+            f.write(" ".join(lines))
+
+
+def load_samples(sample_dir: str):
+    """(görsel yolu, beklenen metin) çiftlerini sıralı olarak döndürür"""
+    samples = []
+    for name in sorted(os.listdir(sample_dir)):
+        stem, ext = os.path.splitext(name)
+        truth_path = os.path.join(sample_dir, stem + ".txt")
+        if ext.lower() in IMAGE_EXTENSIONS and os.path.exists(truth_path):
+            with open(truth_path, encoding="utf-8") as f:
+                samples.append((os.path.join(sample_dir, name), f.read().strip()))
+    return samples
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein mesafesi (tek satırlık dinamik programlama)"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def char_accuracy(predicted: str, expected: str) -> float:
+    """1 - (düzenleme mesafesi / beklenen uzunluk), boşluklar normalize edilir"""
+    predicted = " ".join(predicted.split())
+    expected = " ".join(expected.split())
+    if not expected:
+        return 1.0 if not predicted else 0.0
+    return max(0.0, 1.0 - edit_distance(predicted, expected) / len(expected))
+
+
+def run(samples, reader):
+    """Her yapılandırma için ortalama gecikme ve karakter doğruluğunu ölçer"""
+    report = {}
+    for name, options in CONFIGS.items():
+        latencies, accuracies = [], []
+        for path, expected in samples:
+            start = time.perf_counter()
+            image = path if options is None else preprocess_image(path, **options)
+            result = reader.readtext(image)
+            latencies.append(time.perf_counter() - start)
+            accuracies.append(char_accuracy(" ".join(item[1] for item in result), expected))
+        report[name] = {
+            "mean_latency_s": round(sum(latencies) / len(latencies), 4),
+            "max_latency_s": round(max(latencies), 4),
+            "char_accuracy": round(sum(accuracies) / len(accuracies), 4),
+        }
+        print(f"{name:<20} gecikme={report[name]['mean_latency_s']:.3f}s  doğruluk={report[name]['char_accuracy']:.3f}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR ön işleme benchmark'ı")
+    parser.add_argument("--samples", help="Görsel + .txt çiftlerini içeren klasör")
+    parser.add_argument("--json", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    try:
+        import easyocr
+    except ImportError:
+        print("EasyOCR yüklü değil, benchmark çalıştırılamıyor.")
+        sys.exit(1)
+    reader = easyocr.Reader(["tr", "en"])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sample_dir = args.samples
+        if not sample_dir:
+            generate_synthetic_samples(tmp_dir)
+            sample_dir = tmp_dir
+        samples = load_samples(sample_dir)
+        if not samples:
+            print(f"Örnek bulunamadı: {sample_dir}")
+            sys.exit(1)
+        print(f"{len(samples)} örnek üzerinde ölçülüyor...\n")
+        report = run(samples, reader)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nSonuçlar '{args.json}' dosyasına yazıldı.")
+
+
+if __name__ == "__main__":
+    main()
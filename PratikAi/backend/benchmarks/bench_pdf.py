@@ -0,0 +1,100 @@
+"""
+PDF üretim benchmark'ı - eşzamanlılık altında saniyedeki render sayısı
+
+Kullanım:
+    python benchmarks/bench_pdf.py
+    python benchmarks/bench_pdf.py --renders 200 --questions 20 --json sonuc.json
+
+"eski" modu, fontu her çağrıda dosyadan yeniden ayrıştıran ve PDF'i diske (geçici dosyaya) yazıp
+geri okuyan önceki davranışı taklit eder; "onbellekli" modu süreç başına ayrıştırılan fontu kullanır.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Backend dizinini path'e ekle
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from fpdf import FPDF
+
+from services import pdf_generator
+from services.pdf_generator import create_quiz_pdf
+
+
+def make_quiz(num_questions: int):
+    """Tekrarlanabilir sentetik sınav verisi"""
+    return [
+        {
+            "question": f"Soru {i + 1}: Hücre zarının görevi aşağıdakilerden hangisidir? Şıkları dikkatle okuyunuz.",
+            "options": {
+                "A": "Madde alışverişini kontrol etmek",
+                "B": "Protein sentezlemek",
+                "C": "Genetik bilgiyi saklamak",
+                "D": "Enerji üretmek",
+            },
+            "correct_answer": "A",
+        }
+        for i in range(num_questions)
+    ]
+
+
+def legacy_render(quiz_data) -> bytes:
+    """Önceki davranış: font her çağrıda ayrıştırılır, PDF diske yazılır ve dosya geri okunur"""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.add_font(pdf_generator.FONT_FAMILY, "", pdf_generator.FONT_PATH)
+    pdf.set_font(pdf_generator.FONT_FAMILY, "", 12)
+    for i, q in enumerate(quiz_data):
+        pdf.multi_cell(0, 8, f"{i+1}. {q['question']}", new_x="LMARGIN", new_y="NEXT")
+        for key, value in q["options"].items():
+            pdf.multi_cell(0, 8, f"  {key}) {value}", new_x="LMARGIN", new_y="NEXT")
+        pdf.multi_cell(0, 8, f"--> Doğru Cevap: {q['correct_answer']}", new_x="LMARGIN", new_y="NEXT")
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as f:
+        pdf.output(f.name)
+        with open(f.name, "rb") as saved:
+            return saved.read()
+
+
+def measure(render, quiz_data, renders: int, concurrency: int) -> float:
+    """Verilen eşzamanlılıkta saniyedeki render sayısını döndürür"""
+    render(quiz_data)  # Isınma (font önbelleği vb.)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: render(quiz_data), range(renders)))
+    return renders / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF üretim benchmark'ı")
+    parser.add_argument("--renders", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--json", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    if not pdf_generator._font_is_available():
+        print("Font yüklenemedi, benchmark çalıştırılamıyor.")
+        sys.exit(1)
+
+    quiz_data = make_quiz(args.questions)
+    report = {}
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        for name, render in (("eski", legacy_render), ("onbellekli", create_quiz_pdf)):
+            rate = measure(render, quiz_data, args.renders, concurrency)
+            report[f"{name}_c{concurrency}"] = {"renders_per_s": round(rate, 2)}
+            print(f"{name:<12} eşzamanlılık={concurrency:<3} {rate:8.2f} render/s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nSonuçlar '{args.json}' dosyasına yazıldı.")
+
+
+if __name__ == "__main__":
+    main()
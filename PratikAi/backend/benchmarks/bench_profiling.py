@@ -0,0 +1,102 @@
+"""
+İstek profilleme benchmark'ı - ProfilingMiddleware'in istek gecikmesine etkisi
+
+Kullanım:
+    python benchmarks/bench_profiling.py
+    python benchmarks/bench_profiling.py --pages 5 --requests 50 --json sonuc.json
+
+Middleware, senkron endpoint gibi thread havuzunda özetleme yapan küçük bir ASGI uygulamasının
+önüne konur ve istekler doğrudan ASGI arayüzünden gönderilir (HTTP maliyeti ölçüme karışmaz).
+Dört durum karşılaştırılır: middleware yok, middleware var ama tetiklenmedi,
+örnekleme profili (sample) ve cProfile. Profil dosyaları geçici bir dizine yazılır.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Backend dizinini path'e ekle
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from services.profiling import ProfilingMiddleware, make_profile_token, TOKEN_HEADER, MODE_HEADER
+from services.text_analysis import extractive_summary
+
+from bench_summary import make_document
+
+SECRET = "bench-secret"
+
+
+def make_app(text: str):
+    """Metni thread havuzunda özetleyen en küçük ASGI uygulaması"""
+    async def app(scope, receive, send):
+        summary = await asyncio.to_thread(extractive_summary, text)
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": summary.encode()})
+    return app
+
+
+async def run_requests(app, headers, count: int):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "POST", "path": "/bench", "headers": headers}
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        await app(dict(scope), receive, send)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="İstek profilleme benchmark'ı")
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--json", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    inner = make_app(make_document(args.pages))
+    token = make_profile_token(SECRET).encode()
+    with tempfile.TemporaryDirectory() as directory:
+        profiled = ProfilingMiddleware(inner, directory=directory, sample_rate=0, secret=SECRET, max_files=5)
+        cases = (
+            ("no_middleware", inner, []),
+            ("not_triggered", profiled, []),
+            ("sample", profiled, [(TOKEN_HEADER, token), (MODE_HEADER, b"sample")]),
+            ("cprofile", profiled, [(TOKEN_HEADER, token), (MODE_HEADER, b"cprofile")]),
+        )
+
+        asyncio.run(run_requests(inner, [], 3))  # ısınma
+        report = {"pages": args.pages, "requests": args.requests, "results": {}}
+        baseline = None
+        for name, app, headers in cases:
+            timings = asyncio.run(run_requests(app, headers, args.requests))
+            median_ms = statistics.median(timings) * 1000
+            baseline = baseline or median_ms
+            entry = {
+                "median_ms": round(median_ms, 3),
+                "p95_ms": round(sorted(timings)[int(len(timings) * 0.95) - 1] * 1000, 3),
+                "overhead_percent": round((median_ms / baseline - 1) * 100, 1),
+            }
+            report["results"][name] = entry
+            print(f"{name:<14} medyan={entry['median_ms']:>8.2f} ms  p95={entry['p95_ms']:>8.2f} ms  "
+                  f"ek yük={entry['overhead_percent']:>6.1f}%")
+        report["profile_files"] = len(os.listdir(directory))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nSonuçlar '{args.json}' dosyasına yazıldı.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+İstem küçültme benchmark'ı - ön işleme öncesi/sonrası istem boyutu ve gecikme
+
+Kullanım:
+    python benchmarks/bench_prompt.py
+    python benchmarks/bench_prompt.py --pages 10,50 --questions 5 --json sonuc.json
+    GOOGLE_API_KEY=... python benchmarks/bench_prompt.py --live --pages 10
+
+Sentetik belge PDF çıktısına benzetilir: her sayfada başlık, altbilgi, sayfa numarası,
+yumuşak satır kırılımları ve fazla boşluklar bulunur. Her sayfa sayısı için ham, temizlenmiş
+ve pasaj seçimli metnin token sayısı ile ön işleme süresi raporlanır.
+--live verilirse aynı metinlerle Gemini'den soru istenir ve istek gecikmesi de ölçülür (kota harcar).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Backend dizinini path'e ekle
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from services.prompt_preprocessor import PAGE_BREAK, prepare_prompt_text, prompt_token_budget
+from services.usage_accounting import estimate_tokens
+
+from bench_summary import make_document
+
+WORDS_PER_LINE = 11
+
+
+def make_pdf_like_document(pages: int, seed: int = 42) -> str:
+    """make_document sayfalarını PyMuPDF get_text() çıktısına benzetir"""
+    page_texts = []
+    for number, body in enumerate(make_document(pages, seed).split("\n\n"), 1):
+        words = body.split()
+        lines = ["  ".join(words[i:i + WORDS_PER_LINE]) for i in range(0, len(words), WORDS_PER_LINE)]
+        page_texts.append(
+            "Biyoloji 9. Sınıf  -  Ünite 2: Hücre\n\n"
+            + "\n".join(lines)
+            + f"\n\n© 2024 Örnek Yayınları - Tüm hakları saklıdır\nSayfa {number} / {pages}\n"
+        )
+    return PAGE_BREAK.join(page_texts)
+
+
+def time_call(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="İstem küçültme benchmark'ı")
+    parser.add_argument("--pages", default="1,10,50,100")
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--live", action="store_true", help="Gemini gecikmesini de ölç (GOOGLE_API_KEY gerekir)")
+    parser.add_argument("--json", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    provider = None
+    if args.live:
+        from services.ai_provider import GeminiProvider
+        provider = GeminiProvider()
+        if not provider.is_available():
+            print("Gemini kullanılamıyor (GOOGLE_API_KEY?), --live ölçümü yapılamıyor.")
+            sys.exit(1)
+
+    budget = prompt_token_budget(args.questions)
+    print(f"Bütçe: {budget} token ({args.questions} soru)\n")
+    report = {"budget_tokens": budget, "questions": args.questions, "results": {}}
+    for pages in [int(p) for p in args.pages.split(",")]:
+        text = make_pdf_like_document(pages)
+        cleaned, clean_report = prepare_prompt_text(text, args.questions, select=False)
+        selected, select_report = prepare_prompt_text(text, args.questions, select=True)
+        entry = {
+            "raw_tokens": estimate_tokens(text),
+            "cleaned_tokens": clean_report["tokens"],
+            "selected_tokens": select_report["tokens"],
+            "boilerplate_lines": clean_report["boilerplate_lines"],
+            "clean_seconds": round(time_call(lambda: prepare_prompt_text(text, args.questions, select=False), args.repeat), 4),
+            "select_seconds": round(time_call(lambda: prepare_prompt_text(text, args.questions, select=True), args.repeat), 4),
+        }
+        print(f"{pages:>4} sayfa: ham={entry['raw_tokens']:>7} temiz={entry['cleaned_tokens']:>7} "
+              f"seçili={entry['selected_tokens']:>6} token | şablon satırı={entry['boilerplate_lines']:>4} | "
+              f"ön işleme {entry['clean_seconds'] * 1000:.1f} ms / seçimle {entry['select_seconds'] * 1000:.1f} ms")
+
+        if provider is not None:
+            # Ön işleme GeminiProvider içinde yapılır; "önce" ölçümü için geçici olarak kapatılır
+            from services import prompt_preprocessor
+            for label, enabled, select in (("raw", False, False), ("cleaned", True, False), ("selected", True, True)):
+                prompt_preprocessor.PROMPT_PREPROCESS_ENABLED = enabled
+                prompt_preprocessor.PROMPT_PASSAGE_SELECTION = select
+                start = time.perf_counter()
+                try:
+                    provider.generate_questions(text, args.questions, "çoktan seçmeli", "orta")
+                    entry[f"{label}_latency_seconds"] = round(time.perf_counter() - start, 2)
+                except Exception as e:
+                    print(f"      {label}: istek başarısız: {e}")
+                    entry[f"{label}_latency_seconds"] = None
+            print("      gecikme: " + ", ".join(f"{k}={entry[f'{k}_latency_seconds']} s" for k in ("raw", "cleaned", "selected")))
+
+        report["results"][f"{pages}p"] = entry
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nSonuçlar '{args.json}' dosyasına yazıldı.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Soru bankası benchmark'ı - 100 bin soruda ekleme hızı ve arama gecikmesi
+
+Kullanım:
+    python benchmarks/bench_question_bank.py
+    python benchmarks/bench_question_bank.py --questions 100000 --sources 2000 --json sonuc.json
+
+Banka geçici bir SQLite dosyasında oluşturulur ve sonunda silinir.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Backend dizinini path'e ekle
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from services.question_bank import QuestionBank
+
+SYLLABLES = ("ka", "le", "mi", "to", "ru", "se", "na", "di", "lo", "ya", "bir", "han", "göz", "tür", "zar", "ek")
+
+
+def make_vocabulary(size: int, rng: random.Random):
+    """Gerçekçi boyutta sahte kelime dağarcığı (ders kitabı ölçeği)"""
+    return list({"".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(size)})
+
+
+STEMS = ("nedir?", "neden önemlidir?", "açıklayınız.", "karşılaştırınız.", "hangisidir?", "tasarlayınız.")
+
+
+def make_question(rng: random.Random, vocabulary):
+    """Rastgele, birbirine benzemeyen sentetik soru"""
+    words = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(8, 16)))
+    return {
+        "question": f"{words} {rng.choice(STEMS)}",
+        "options": {letter: " ".join(rng.choice(vocabulary) for _ in range(3)) for letter in "ABCD"},
+        "correct_answer": rng.choice("ABCD"),
+    }
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soru bankası benchmark'ı")
+    parser.add_argument("--questions", type=int, default=100000)
+    parser.add_argument("--sources", type=int, default=2000)
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--json", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(5000, rng)
+    sources = [f"kaynak-{i}" for i in range(args.sources)]
+    path = os.path.join(tempfile.mkdtemp(), "bench_bank.db")
+    bank = QuestionBank(path)
+
+    # Ekleme: her istekte 10 soruluk gruplar
+    batch = 10
+    start = time.perf_counter()
+    for i in range(0, args.questions, batch):
+        bank.add_questions(rng.choice(sources), [make_question(rng, vocabulary) for _ in range(batch)], "çoktan seçmeli", "orta")
+    insert_seconds = time.perf_counter() - start
+    print(f"Ekleme: {args.questions} soru {insert_seconds:.1f} s ({args.questions / insert_seconds:,.0f} soru/s), "
+          f"bankada {bank.stats()['questions']}")
+
+    # Kopya kontrolü: bankadaki bir sorunun küçük değişiklikle yeniden eklenmesi
+    sample = bank.find_questions(sources[0], "çoktan seçmeli", "orta", 1)[0]
+    words = sample["question"].split()
+    words[len(words) // 2] = "değiştirildi"
+    near = dict(sample, question=" ".join(words))
+    outcome = bank.add_questions(sources[0], [near], "çoktan seçmeli", "orta")
+    print(f"Kopya tespiti: {outcome['duplicates']} / 1")
+
+    # Arama gecikmesi
+    timings = []
+    for _ in range(args.lookups):
+        src = rng.choice(sources)
+        t0 = time.perf_counter()
+        bank.find_questions(src, "çoktan seçmeli", "orta", 10)
+        timings.append((time.perf_counter() - t0) * 1000)
+    p50, p99 = percentile(timings, 50), percentile(timings, 99)
+    print(f"Arama: p50={p50:.4f} ms p99={p99:.4f} ms")
+
+    # Yeniden açılış (kalıcılıktan yükleme)
+    start = time.perf_counter()
+    QuestionBank(path)
+    load_seconds = time.perf_counter() - start
+    print(f"Yeniden yükleme: {load_seconds:.2f} s")
+
+    report = {
+        "questions": bank.stats()["questions"],
+        "insert_per_s": round(args.questions / insert_seconds),
+        "lookup_p50_ms": round(p50, 4),
+        "lookup_p99_ms": round(p99, 4),
+        "near_duplicate_detected": outcome["duplicates"] == 1,
+        "reload_seconds": round(load_seconds, 2),
+    }
+    os.remove(path)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nSonuçlar '{args.json}' dosyasına yazıldı.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Soru çıktı modu benchmark'ı - JSON şemalı mod ile metin (regex) modunun karşılaştırması
+
+Kullanım:
+    GOOGLE_API_KEY=... python benchmarks/bench_quiz_output.py
+    GOOGLE_API_KEY=... python benchmarks/bench_quiz_output.py --requests 10 --questions 5 --json sonuc.json
+
+Gerçek Gemini API'si çağrılır (kota harcar). Her mod için ayrıştırma başarı oranı
+(ayrıştırılan / istenen soru) ve soru başına çıktı token sayısı raporlanır.
+Tamamlama istekleri (top-up) ölçümü karıştırmasın diye kapatılır.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Backend dizinini path'e ekle
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from services import ai_provider
+from services.ai_provider import GeminiProvider
+
+from bench_summary import make_document
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soru çıktı modu benchmark'ı")
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=1)
+    parser.add_argument("--json", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    ai_provider.QUIZ_TOPUP_MAX_RETRIES = 0
+    provider = GeminiProvider()
+    if not provider.is_available():
+        print("Gemini kullanılamıyor (GOOGLE_API_KEY?), benchmark çalıştırılamıyor.")
+        sys.exit(1)
+
+    report = {}
+    for mode in ("json", "text"):
+        provider.structured_output = mode == "json"
+        start = time.perf_counter()
+        for i in range(args.requests):
+            text = make_document(args.pages, seed=i)
+            try:
+                provider.generate_questions(text, args.questions, "çoktan seçmeli", "orta")
+            except Exception as e:
+                print(f"{mode}: istek {i + 1} başarısız: {e}")
+        elapsed = time.perf_counter() - start
+        stats = provider.get_output_stats()[mode]
+        stats["seconds_per_request"] = round(elapsed / args.requests, 2)
+        report[mode] = stats
+        print(f"{mode:<5} başarı={stats['parse_success_rate']} "
+              f"token/soru={stats['output_tokens_per_question']} "
+              f"süre/istek={stats['seconds_per_request']} s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nSonuçlar '{args.json}' dosyasına yazıldı.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Etmen yanıt boyutu benchmark'ı - tam / kompakt görünüm ve json / orjson serileştirme karşılaştırması
+
+Kullanım:
+    python benchmarks/bench_response.py
+    python benchmarks/bench_response.py --pages 5 --questions 10 --repeat 200 --json sonuc.json
+
+/api/v1/agent/generate-quiz ve /api/v1/multi-agent/process yanıtları endpoint'lerle aynı şekilde
+(SimulatedProvider ile, ağsız) üretilir. Her endpoint ve görünüm (full, compact) için yanıt boyutu
+ve iki serileştirme yolu ölçülür:
+    json:   önceki yol - jsonable_encoder + JSONResponse (standart json)
+    orjson: yeni yol - doğrudan FastJSONResponse
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+# Backend dizinini path'e ekle
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+# bench_suite servisleri ağ ve disk yan etkileri kapalı olarak yükler
+from bench_suite import install_provider
+from bench_summary import make_document
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from services.learning_agent import create_learning_agent
+from services.multi_agent_system import MultiAgentSystem
+from services.response_format import FastJSONResponse, select_sections, ORJSON_AVAILABLE
+from services.tools import call_tool
+
+# main.py'deki kompakt bölümlerle aynı
+AGENT_COMPACT_SECTIONS = ("results", "explanation", "trace")
+MULTI_AGENT_COMPACT_SECTIONS = ("plan", "results", "error", "trace")
+
+
+def agent_response(text: str, num_questions: int) -> dict:
+    """/api/v1/agent/generate-quiz tam yanıtı"""
+    agent = create_learning_agent()
+    perceived_data = agent.perceive({"text": text, "file_type": "text", "preferences": {}})
+    reasoning_result = agent.reason(perceived_data, goal="generate_quiz")
+    reasoning_result["num_questions"] = num_questions
+    reasoning_result["difficulty"] = "orta"
+    plan = agent.plan("generate_quiz", reasoning_result)
+
+    def external_function(**kwargs):
+        return call_tool("generate_quiz", {
+            "text": text,
+            "num_questions": kwargs.get("num_questions", num_questions),
+            "difficulty": kwargs.get("difficulty", "orta")
+        }, None)
+
+    results = agent.act(plan, external_function)
+    return {
+        "agent_state": agent.get_state(),
+        "perception": perceived_data,
+        "reasoning": reasoning_result,
+        "plan": plan,
+        "results": results.get("soru_uretim", {}),
+        "explanation": agent.get_explanation(),
+        "self_model": agent.self_model
+    }
+
+
+def multi_agent_response(text: str, num_questions: int) -> dict:
+    """/api/v1/multi-agent/process tam yanıtı"""
+    input_data = {"text": text, "file_type": "text", "preferences": {"num_questions": num_questions, "difficulty": "orta"}}
+    return MultiAgentSystem().process_request("generate_quiz", input_data)
+
+
+def measure(func, repeat: int) -> float:
+    """Medyan süre (ms)"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Etmen yanıt boyutu benchmark'ı")
+    parser.add_argument("--pages", type=int, default=3, help="Girdi belgesinin sayfa sayısı")
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--json", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    if not ORJSON_AVAILABLE:
+        print("⚠️ orjson yüklü değil; orjson yolu standart json ile ölçülüyor.")
+
+    install_provider(0)
+    text = make_document(args.pages)
+    endpoints = {
+        "agent/generate-quiz": (agent_response(text, args.questions), AGENT_COMPACT_SECTIONS),
+        "multi-agent/process": (multi_agent_response(text, args.questions), MULTI_AGENT_COMPACT_SECTIONS),
+    }
+
+    report = {"input_chars": len(text), "questions": args.questions, "endpoints": {}}
+    print(f"{'endpoint':<22} {'görünüm':<8} {'bayt':>8} {'json ms':>8} {'orjson ms':>9}")
+    for name, (full_response, compact_sections) in endpoints.items():
+        rows = {}
+        for view in ("full", "compact"):
+            payload = select_sections(full_response, view, None, compact_sections)
+            rows[view] = {
+                "bytes": len(FastJSONResponse(payload).body),
+                "json_ms": round(measure(lambda: JSONResponse(jsonable_encoder(payload)), args.repeat), 4),
+                "orjson_ms": round(measure(lambda: FastJSONResponse(payload), args.repeat), 4),
+            }
+            row = rows[view]
+            print(f"{name:<22} {view:<8} {row['bytes']:>8} {row['json_ms']:>8} {row['orjson_ms']:>9}")
+        rows["bytes_reduction"] = round(1 - rows["compact"]["bytes"] / rows["full"]["bytes"], 3)
+        report["endpoints"][name] = rows
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nSonuçlar '{args.json}' dosyasına yazıldı.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Backend sıcak yolları benchmark paketi - çevrimdışı, JSON çıktılı, commit'ler arası karşılaştırmalı
+
+Kullanım:
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --json sonuc.json
+    python benchmarks/bench_suite.py --only parse,memory --latency-ms 50
+    python benchmarks/bench_suite.py --json yeni.json --compare eski.json --threshold 15
+
+Ölçülenler: parse_quiz_text, analyze_question_types, MemorySystem kaydetme/okuma,
+EpisodicMemory benzer epizot araması, çoklu etmen akışı (Coordinator -> Delegator -> Worker),
+uzman çalışanların görevleri, istem ön işleme (istem boyutu token olarak raporlanır) ve create_quiz_pdf.
+Veriler benchmarks/synthetic.py ile sabit seed'lerle üretilir.
+
+Ağ kullanılmaz: Gemini anahtarı yok sayılır, provider zinciri yalnızca MockProvider'dan türeyen
+ve --latency-ms kadar bekleyen SimulatedProvider'dan oluşur. Soru bankası, kullanım muhasebesi
+ve izleme kapatılır (yan etkisiz, yalnızca sıcak yol ölçülür).
+--compare verilirse medyan süresi veya istem boyutu eşik yüzdesinden fazla artan durumlar listelenir ve çıkış kodu 1 olur.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+# Backend dizinini path'e ekle
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+# Servisler import edilmeden önce: ağ ve disk yan etkileri kapatılır
+os.environ.pop("GOOGLE_API_KEY", None)
+os.environ["QUESTION_BANK_ENABLED"] = "false"
+os.environ["USAGE_ACCOUNTING_ENABLED"] = "false"
+os.environ["TRACING_ENABLED"] = "false"
+
+from services.ai_provider import MockProvider, ProviderStats, get_ai_provider_manager
+from services.gemini_service import parse_quiz_text, analyze_question_types
+from services.memory_system import MemorySystem, EpisodicMemory
+from services.multi_agent_system import MultiAgentSystem
+from services.pdf_generator import create_quiz_pdf
+from services.prompt_preprocessor import prepare_prompt_text
+
+from bench_prompt import make_pdf_like_document
+from bench_summary import make_document
+from synthetic import make_questions, make_quiz_text, make_memory_items, make_episodes, make_goals
+
+
+class SimulatedProvider(MockProvider):
+    """Sabit gecikmeli sahte provider; istenen sayıda sentetik soru döndürür"""
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000.0
+
+    def generate_questions(self, text, num_questions, question_type, difficulty):
+        time.sleep(self.latency)
+        return {"questions": make_questions(num_questions), "recommendations": [], "feedback": None, "provider": "mock"}
+
+    def generate_summary(self, text):
+        time.sleep(self.latency)
+        return text[:500]
+
+
+def install_provider(latency_ms: float):
+    """Global provider yöneticisinin zincirini tek bir SimulatedProvider ile değiştirir"""
+    manager = get_ai_provider_manager()
+    provider = SimulatedProvider(latency_ms)
+    manager.providers = [provider]
+    manager.current_provider = provider
+    manager.stats = {provider.__class__.__name__: ProviderStats()}
+
+
+# --- DURUMLAR ---
+# Her durum (ad, grup, hazırlık, boyutlar) dörtlüsüdür; hazırlık boyut başına (ölçülecek fonksiyon, işlem sayısı, parametreler) döndürür.
+
+def case_parse_quiz_text(size):
+    text = make_quiz_text(size)
+    return lambda: parse_quiz_text(text), 1, {"questions": size}
+
+
+def case_analyze_question_types(size):
+    questions = make_questions(size)
+    return lambda: analyze_question_types(questions), 1, {"questions": size}
+
+
+def case_memory_store(size):
+    items = make_memory_items(size)
+
+    def run():
+        memory = MemorySystem()
+        for key, value in items:
+            memory.store_context("short", key, value)
+            memory.store_context("long", key, value)
+    return run, size * 2, {"items": size}
+
+
+def case_memory_retrieve(size):
+    items = make_memory_items(size)
+    memory = MemorySystem()
+    for key, value in items:
+        memory.store_context("short", key, value)
+        memory.store_context("long", key, value)
+    # Kısa süreli bellekte olmayan anahtarlar deque taramasına düşer
+    keys = [key for key, _ in items] + [f"missing_{i}" for i in range(size // 10)]
+
+    def run():
+        for key in keys:
+            memory.retrieve_context("short", key)
+            memory.retrieve_context("long", key)
+    return run, len(keys) * 2, {"items": size, "lookups": len(keys)}
+
+
+def case_episodic_retrieve(size):
+    episodic = EpisodicMemory(max_episodes=size)
+    for episode in make_episodes(size):
+        episodic.store_episode(episode)
+    goals = make_goals(100)
+
+    def run():
+        for goal in goals:
+            episodic.retrieve_similar_episodes(goal)
+    return run, len(goals), {"episodes": size, "queries": len(goals)}
+
+
+def case_task_context(size):
+    memory = MemorySystem()
+    memory.episodic = EpisodicMemory(max_episodes=size)
+    for episode in make_episodes(size):
+        memory.episodic.store_episode(episode)
+
+    def run():
+        for i in range(100):
+            memory.get_task_context(f"task_{i}")
+    return run, 100, {"episodes": size, "queries": 100}
+
+
+def case_multi_agent(size):
+    """Coordinator -> Delegator -> Worker akışı; çalışanlardan biri görevi reddederse ölçülmez (boş iş ölçülmez)"""
+    system = MultiAgentSystem()
+    text = make_document(size)
+    input_data = {"text": text, "file_type": "text", "preferences": {"num_questions": 5, "difficulty": "orta"}}
+    results = system.process_request("generate_quiz", input_data)["results"]
+    failed = [result["error"] for result in results if "error" in result]
+    if failed:
+        raise RuntimeError(f"çalışan görevi yürütmedi: {failed[0]}")
+    return lambda: system.process_request("generate_quiz", input_data), len(results), {"pages": size, "tasks": len(results)}
+
+
+def case_multi_agent_workers(size):
+    """Uzman çalışanlar kendi görev türleriyle doğrudan çalıştırılır (provider, Bloom, öneri yolları)"""
+    system = MultiAgentSystem()
+    text = make_document(size)
+    tasks = (
+        {"type": "generate_questions", "text": text, "num_questions": 5, "difficulty": "orta"},
+        {"type": "generate_summary", "text": text},
+        {"type": "analyze", "questions": make_questions(20)},
+        {"type": "recommend", "text": text},
+    )
+
+    def run():
+        for worker, task in zip(system.workers, tasks):
+            worker.execute_task(task)
+    return run, len(tasks), {"pages": size}
+
+
+def case_prepare_prompt(size):
+    """PDF benzeri belgenin soru istemi için hazırlanması; istemin boyutu params'ta raporlanır"""
+    text = make_pdf_like_document(size)
+    _, prompt = prepare_prompt_text(text, 5, select=True)
+    params = {"pages": size, "original_tokens": prompt["original_tokens"], "tokens": prompt["tokens"],
+              "boilerplate_lines": prompt["boilerplate_lines"]}
+    return lambda: prepare_prompt_text(text, 5, select=True), 1, params
+
+
+def case_create_quiz_pdf(size):
+    questions = make_questions(size)
+    return lambda: create_quiz_pdf(questions), 1, {"questions": size}
+
+
+CASES = (
+    ("parse_quiz_text", "parse", case_parse_quiz_text, (10, 100)),
+    ("analyze_question_types", "parse", case_analyze_question_types, (10, 100)),
+    ("memory_store", "memory", case_memory_store, (1000, 10000)),
+    ("memory_retrieve", "memory", case_memory_retrieve, (1000, 10000)),
+    ("episodic_retrieve", "memory", case_episodic_retrieve, (50, 10000)),
+    ("task_context", "memory", case_task_context, (50, 10000)),
+    ("multi_agent_pipeline", "agent", case_multi_agent, (1, 10)),
+    ("multi_agent_workers", "agent", case_multi_agent_workers, (1, 10)),
+    ("prepare_prompt", "prompt", case_prepare_prompt, (10, 50)),
+    ("create_quiz_pdf", "pdf", case_create_quiz_pdf, (10, 50)),
+)
+
+
+def measure(func, repeat: int):
+    func()  # ısınma (önbellekler, tembel yüklemeler)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=backend_dir,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(results, baseline_path: str, threshold: float):
+    """Medyanı eşikten fazla yavaşlayan veya istemi (token) eşikten fazla büyüyen durumları döndürür"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    print(f"\n'{baseline_path}' ile karşılaştırma (eşik %{threshold}):")
+    for name, entry in results.items():
+        old = baseline.get(name)
+        if not old or "median_ms" not in entry or "median_ms" not in old:
+            continue
+        change = (entry["median_ms"] / old["median_ms"] - 1) * 100 if old["median_ms"] else 0.0
+        marker = "  <-- YAVAŞLAMA" if change > threshold else ""
+        print(f"  {name:<34} {old['median_ms']:>10.3f} -> {entry['median_ms']:>10.3f} ms  ({change:+.1f}%){marker}")
+        if change > threshold:
+            regressions.append(name)
+        old_tokens, new_tokens = old.get("params", {}).get("tokens"), entry["params"].get("tokens")
+        if old_tokens and new_tokens is not None:
+            growth = (new_tokens / old_tokens - 1) * 100
+            if growth > threshold:
+                print(f"  {name:<34} istem {old_tokens} -> {new_tokens} token ({growth:+.1f}%)  <-- BÜYÜME")
+                if name not in regressions:
+                    regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend sıcak yolları benchmark paketi")
+    parser.add_argument("--only", help="Virgülle ayrılmış grup veya durum adları (parse, memory, agent, prompt, pdf)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simüle edilen provider gecikmesi")
+    parser.add_argument("--json", help="Sonuçların yazılacağı JSON dosyası")
+    parser.add_argument("--compare", help="Karşılaştırılacak önceki JSON sonucu")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Yavaşlama eşiği (yüzde)")
+    args = parser.parse_args()
+
+    selected = set(args.only.split(",")) if args.only else None
+    install_provider(args.latency_ms)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeat": args.repeat,
+        "latency_ms": args.latency_ms,
+        "results": {},
+    }
+    for name, group, setup, sizes in CASES:
+        if selected and name not in selected and group not in selected:
+            continue
+        for size in sizes:
+            key = f"{name}[{size}]"
+            try:
+                func, ops, params = setup(size)
+                timings = measure(func, args.repeat)
+            except Exception as e:
+                print(f"{key:<34} atlandı: {e}")
+                report["results"][key] = {"error": str(e)}
+                continue
+            median = statistics.median(timings)
+            entry = {
+                "params": params,
+                "median_ms": round(median * 1000, 3),
+                "min_ms": round(min(timings) * 1000, 3),
+                "max_ms": round(max(timings) * 1000, 3),
+                "ops_per_second": round(ops / median, 1) if median else None,
+            }
+            report["results"][key] = entry
+            print(f"{key:<34} medyan={entry['median_ms']:>10.3f} ms  min={entry['min_ms']:>10.3f} ms  "
+                  f"{entry['ops_per_second']:>12} işlem/s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nSonuçlar '{args.json}' dosyasına yazıldı.")
+
+    if args.compare:
+        regressions = compare(report["results"], args.compare, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} durumda yavaşlama: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Çevrimdışı özetleme benchmark'ı - sayfa sayısına göre özetleme süresi
+
+Kullanım:
+    python benchmarks/bench_summary.py
+    python benchmarks/bench_summary.py --pages 10,50,100 --json sonuc.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+# Backend dizinini path'e ekle
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from services.text_analysis import extractive_summary
+
+VOCABULARY = (
+    "hücre zar çekirdek mitokondri enerji protein sentez ribozom kromozom gen bölünme mitoz "
+    "mayoz canlı organizma doku organ sistem solunum fotosentez klorofil bitki hayvan besin "
+    "madde osmanlı devlet padişah savaş antlaşma ekonomi ticaret kuvvet hareket ivme kütle"
+).split()
+
+# Yaklaşık bir ders kitabı sayfası
+WORDS_PER_PAGE = 400
+
+
+def make_document(pages: int, seed: int = 42) -> str:
+    """Tekrarlanabilir sentetik belge; sayfalar boş satırla ayrılır"""
+    rng = random.Random(seed)
+    page_texts = []
+    for _ in range(pages):
+        sentences = []
+        words = 0
+        while words < WORDS_PER_PAGE:
+            length = rng.randint(6, 25)
+            sentences.append(" ".join(rng.choice(VOCABULARY) for _ in range(length)).capitalize() + ".")
+            words += length
+        page_texts.append(" ".join(sentences))
+    return "\n\n".join(page_texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Çevrimdışı özetleme benchmark'ı")
+    parser.add_argument("--pages", default="1,10,50,100")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    report = {}
+    for pages in [int(p) for p in args.pages.split(",")]:
+        text = make_document(pages)
+        for method in ("textrank", "centroid"):
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                extractive_summary(text, method=method)
+                timings.append(time.perf_counter() - start)
+            best = min(timings)
+            report[f"{method}_{pages}p"] = {"seconds": round(best, 4), "characters": len(text)}
+            print(f"{method:<9} {pages:>4} sayfa ({len(text):>7} karakter): {best * 1000:8.1f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nSonuçlar '{args.json}' dosyasına yazıldı.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Yük üreteci - çalışan backend'e eşzamanlı istek gönderir, endpoint başına verim ve p50/p95/p99 raporlar
+
+Kullanım:
+    # 1. Sahte Gemini sunucusu ve ona yönlendirilmiş backend
+    python benchmarks/stub_gemini.py --latency-ms 800 --rate-limit-rate 0.02
+    GOOGLE_API_KEY=stub GEMINI_API_ENDPOINT=http://127.0.0.1:8089 uvicorn main:app --port 8000
+    # 2. Yük
+    python benchmarks/loadgen.py --concurrency 16 --duration 60
+    python benchmarks/loadgen.py --mix quiz=3,summary=1,agent=1,health=1 --requests 500 --json sonuc.json
+
+Kapalı döngü çalışır: --concurrency kadar işçi, yanıt gelir gelmez bir sonraki isteği gönderir.
+Endpoint'ler --mix ağırlıklarıyla (sabit seed ile) seçilir, metinler bench_summary.make_document ile üretilir.
+--stub-url verilirse sahte sunucunun /stats sayaçları da rapora eklenir.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Backend dizinini path'e ekle
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from bench_summary import make_document
+
+# Ad -> (yöntem, yol, form alanları üreteci)
+ENDPOINTS = {
+    "quiz": ("POST", "/api/v1/generate-quiz-from-text",
+             lambda text: {"text": text, "num_questions": 5, "question_type": "çoktan seçmeli", "difficulty": "orta"}),
+    "summary": ("POST", "/api/v1/generate-summary-from-text", lambda text: {"text": text}),
+    "agent": ("POST", "/api/v1/agent/generate-quiz", lambda text: {"text": text, "num_questions": 5}),
+    "multi_agent": ("POST", "/api/v1/multi-agent/process", lambda text: {"text": text}),
+    "health": ("GET", "/api/v1/health", None),
+}
+
+
+def percentile(latencies, p: float):
+    """En yakın sıra (nearest-rank) yöntemi, ms"""
+    if not latencies:
+        return None
+    rank = max(0, min(len(latencies) - 1, int(round(p / 100.0 * len(latencies) + 0.5)) - 1))
+    return round(latencies[rank] * 1000, 1)
+
+
+def parse_mix(mix: str):
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Bilinmeyen endpoint: {name} (seçenekler: {', '.join(ENDPOINTS)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def send(base_url: str, name: str, text: str, timeout: float):
+    """Tek istek; (durum kodu veya hata adı, süre sn)"""
+    method, path, make_form = ENDPOINTS[name]
+    data = urllib.parse.urlencode(make_form(text)).encode() if make_form else None
+    request = urllib.request.Request(base_url + path, data=data, method=method)
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    except Exception as e:
+        status = type(e).__name__
+    return status, time.perf_counter() - started
+
+
+def fetch_json(url: str):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return json.loads(response.read())
+    except Exception as e:
+        print(f"⚠️ {url} okunamadı: {e}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend yük üreteci")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--mix", default="quiz=3,summary=1,health=1", help=f"Ağırlıklar ({', '.join(ENDPOINTS)})")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="Saniye (--requests verilmezse)")
+    parser.add_argument("--requests", type=int, help="Toplam istek sayısı")
+    parser.add_argument("--pages", type=int, default=2, help="İstek metni uzunluğu (sayfa)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stub-url", help="Sahte Gemini sunucusu (örn. http://127.0.0.1:8089)")
+    parser.add_argument("--json", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    names = list(weights)
+    texts = [make_document(args.pages, seed=i) for i in range(20)]
+    rng = random.Random(args.seed)
+    lock = threading.Lock()
+    results = {name: {"latencies": [], "statuses": {}} for name in names}
+    issued = 0
+    deadline = None if args.requests else time.monotonic() + args.duration
+
+    def next_request():
+        """Paylaşılan seed'li sıradan bir sonraki (endpoint, metin) veya None"""
+        nonlocal issued
+        with lock:
+            if args.requests is not None and issued >= args.requests:
+                return None
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            issued += 1
+            return rng.choices(names, [weights[n] for n in names])[0], rng.choice(texts)
+
+    def worker():
+        while True:
+            item = next_request()
+            if item is None:
+                return
+            name, text = item
+            status, elapsed = send(args.url, name, text, args.timeout)
+            with lock:
+                entry = results[name]
+                entry["statuses"][str(status)] = entry["statuses"].get(str(status), 0) + 1
+                if status == 200:
+                    entry["latencies"].append(elapsed)
+
+    if fetch_json(args.url + "/api/v1/health") is None:
+        sys.exit(1)
+    print(f"{args.url} üzerinde yük: {args.concurrency} işçi, "
+          f"{f'{args.requests} istek' if args.requests else f'{args.duration:g} s'}, karışım {args.mix}\n")
+    stub_before = fetch_json(args.stub_url + "/stats") if args.stub_url else None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for _ in range(args.concurrency):
+            pool.submit(worker)
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "url": args.url, "concurrency": args.concurrency, "mix": weights,
+        "seconds": round(elapsed, 2), "endpoints": {},
+    }
+    total = ok = 0
+    for name in names:
+        latencies = sorted(results[name]["latencies"])
+        count = sum(results[name]["statuses"].values())
+        total += count
+        ok += len(latencies)
+        entry = {
+            "requests": count,
+            "statuses": results[name]["statuses"],
+            "error_rate": round(1 - len(latencies) / count, 3) if count else 0.0,
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+        }
+        report["endpoints"][name] = entry
+        print(f"{name:<12} istek={count:>5} başarılı/s={entry['throughput_rps']:>7} hata={entry['error_rate']:>5} "
+              f"p50={entry['p50_ms']} p95={entry['p95_ms']} p99={entry['p99_ms']} ms  {entry['statuses']}")
+    report["total"] = {"requests": total, "ok": ok, "throughput_rps": round(ok / elapsed, 2)}
+    print(f"\nToplam: {total} istek, {ok} başarılı, {report['total']['throughput_rps']} başarılı istek/s ({elapsed:.1f} s)")
+
+    if stub_before is not None:
+        stub_after = fetch_json(args.stub_url + "/stats")
+        if stub_after is not None:
+            report["stub"] = {key: stub_after[key] - stub_before.get(key, 0) for key in stub_after}
+            print(f"Sahte Gemini: {report['stub']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nSonuçlar '{args.json}' dosyasına yazıldı.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+Yerel sahte Gemini sunucusu - kota harcamadan yük testi için
+
+Kullanım:
+    python benchmarks/stub_gemini.py --port 8089 --latency-ms 800 --latency-sigma 0.4
+    python benchmarks/stub_gemini.py --error-rate 0.02 --rate-limit-rate 0.05 --rpm 600
+
+    # Backend'i sahte sunucuya yönlendirmek için (anahtar herhangi bir değer olabilir):
+    GOOGLE_API_KEY=stub GEMINI_API_ENDPOINT=http://127.0.0.1:8089 uvicorn main:app
+
+google-generativeai'nin REST taşıyıcısının kullandığı alt küme desteklenir:
+    POST /v1beta/models/{model}:generateContent
+    POST /v1beta/models/{model}:streamGenerateContent   (?alt=sse ile SSE, aksi halde JSON dizi)
+    GET  /stats                                          (istek / hata sayaçları)
+
+Yanıtlar istemden çıkarılır: soru istemlerine istenen sayıda soru (JSON modunda şemaya uygun
+{"questions": [...]}, metin modunda **1. Soru:** formatı), özet istemlerine kısa özet, anahtar
+kelime istemlerine virgüllü liste döner. usageMetadata karakter/4 ile doldurulur.
+
+Gecikme log-normal dağılımlıdır (medyan --latency-ms, yayılım --latency-sigma), çıktı token'ı başına
+--ms-per-token eklenir. --error-rate oranında 500, --rate-limit-rate oranında ve dakikalık
+--rpm kotası aşıldığında 429 (RESOURCE_EXHAUSTED) döner.
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+_ROUTE_RE = re.compile(r"^/v1(?:beta)?/models/([^/:]+):(generateContent|streamGenerateContent)$")
+_COUNT_RE = re.compile(r"(\d+)\s+adet")
+_TEXT_RE = re.compile(r'Metin:\s*"(.*)"', re.DOTALL)
+_WORD_RE = re.compile(r"\w{4,}")
+OPTION_KEYS = ("A", "B", "C", "D")
+STREAM_CHUNKS = 4
+
+
+class StubConfig:
+    """Komut satırından gelen davranış ayarları ve sayaçlar"""
+
+    def __init__(self, args):
+        self.latency_ms = args.latency_ms
+        self.latency_sigma = args.latency_sigma
+        self.ms_per_token = args.ms_per_token
+        self.error_rate = args.error_rate
+        self.rate_limit_rate = args.rate_limit_rate
+        self.rpm = args.rpm
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.window: deque = deque()
+        self.counts = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0, "streamed": 0}
+
+    def count(self, key: str):
+        with self.lock:
+            self.counts[key] += 1
+
+    def latency_seconds(self, output_tokens: int) -> float:
+        with self.lock:
+            sample = self.rng.lognormvariate(math.log(max(self.latency_ms, 0.001)), self.latency_sigma)
+        return (sample + output_tokens * self.ms_per_token) / 1000.0
+
+    def failure(self):
+        """Bu istek için (durum kodu, gRPC durum adı, mesaj) veya None"""
+        now = time.monotonic()
+        with self.lock:
+            roll = self.rng.random()
+            if self.rpm:
+                while self.window and now - self.window[0] > 60:
+                    self.window.popleft()
+                if len(self.window) >= self.rpm:
+                    return 429, "RESOURCE_EXHAUSTED", "Resource has been exhausted (e.g. check quota)."
+                self.window.append(now)
+        if roll < self.error_rate:
+            return 500, "INTERNAL", "An internal error has occurred."
+        if roll < self.error_rate + self.rate_limit_rate:
+            return 429, "RESOURCE_EXHAUSTED", "Resource has been exhausted (e.g. check quota)."
+        return None
+
+
+def _prompt_text(body) -> str:
+    parts = []
+    for content in body.get("contents", []):
+        for part in content.get("parts", []):
+            parts.append(part.get("text", ""))
+    return "\n".join(parts)
+
+
+def _is_json_mode(body) -> bool:
+    config = body.get("generationConfig") or body.get("generation_config") or {}
+    return (config.get("responseMimeType") or config.get("response_mime_type")) == "application/json"
+
+
+def _source_words(prompt: str):
+    """Sorular ve özet istemdeki metnin kelimelerinden kurulur"""
+    match = _TEXT_RE.search(prompt)
+    return _WORD_RE.findall(match.group(1) if match else prompt) or ["hücre", "enerji", "madde", "canlı"]
+
+
+def _phrase(words, rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.choice(words) for _ in range(rng.randint(low, high)))
+
+
+def canned_output(prompt: str, json_mode: bool) -> str:
+    """İsteme uygun hazır çıktı; aynı istem her zaman aynı çıktıyı verir"""
+    rng = random.Random(prompt)
+    words = _source_words(prompt)
+    if "soru oluştur" in prompt:
+        match = _COUNT_RE.search(prompt)
+        count = int(match.group(1)) if match else 5
+        questions = [
+            {
+                "question": f"{_phrase(words, rng, 5, 12).capitalize()} nedir?",
+                "options": {key: _phrase(words, rng, 2, 5) for key in OPTION_KEYS},
+                "correct_answer": rng.choice(OPTION_KEYS),
+            }
+            for _ in range(count)
+        ]
+        if json_mode:
+            return json.dumps({"questions": questions}, ensure_ascii=False)
+        blocks = []
+        for i, q in enumerate(questions, 1):
+            options = "\n".join(f"{key}) {value}" for key, value in q["options"].items())
+            blocks.append(f"**{i}. Soru:** {q['question']}\n{options}\n**Doğru Cevap: {q['correct_answer']}**\n")
+        return "\n".join(blocks)
+    if "anahtar kelime" in prompt:
+        return ", ".join(w.capitalize() for w in rng.sample(words, min(3, len(words))))
+    if "özet" in prompt:
+        return " ".join(f"{_phrase(words, rng, 8, 16).capitalize()}." for _ in range(4))
+    return f"{_phrase(words, rng, 10, 20).capitalize()}."
+
+
+def _response(text: str, prompt: str, model: str, finish: bool = True):
+    prompt_tokens = len(prompt) // 4
+    output_tokens = len(text) // 4
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if finish:
+        candidate["finishReason"] = "STOP"
+    return {
+        "candidates": [candidate],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + output_tokens,
+        },
+        "modelVersion": model,
+    }
+
+
+def make_handler(config: StubConfig):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload):
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=UTF-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if urlparse(self.path).path == "/stats":
+                with config.lock:
+                    counts = dict(config.counts)
+                self._send_json(200, counts)
+                return
+            self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            route = _ROUTE_RE.match(url.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b"{}"
+            if route is None:
+                self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+                return
+            config.count("requests")
+            try:
+                body = json.loads(raw or b"{}")
+            except ValueError:
+                self._send_json(400, {"error": {"code": 400, "message": "Invalid JSON", "status": "INVALID_ARGUMENT"}})
+                return
+
+            failure = config.failure()
+            if failure is not None:
+                status, name, message = failure
+                config.count("rate_limited" if status == 429 else "errors")
+                # Hatalar da bir süre sonra döner (gerçek API gibi)
+                time.sleep(config.latency_seconds(0) / 4)
+                self._send_json(status, {"error": {"code": status, "message": message, "status": name}})
+                return
+
+            model, method = route.groups()
+            prompt = _prompt_text(body)
+            text = canned_output(prompt, _is_json_mode(body))
+            delay = config.latency_seconds(len(text) // 4)
+
+            if method == "generateContent":
+                time.sleep(delay)
+                self._send_json(200, _response(text, prompt, model))
+                config.count("ok")
+                return
+
+            config.count("streamed")
+            self._stream(text, prompt, model, delay, "sse" in parse_qs(url.query).get("alt", []))
+            config.count("ok")
+
+        def _stream(self, text: str, prompt: str, model: str, delay: float, sse: bool):
+            """İlk parça gecikmenin yarısında, kalanlar eşit aralıklarla gönderilir"""
+            size = max(1, math.ceil(len(text) / STREAM_CHUNKS))
+            chunks = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream" if sse else "application/json; charset=UTF-8")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            time.sleep(delay / 2)
+            for i, chunk in enumerate(chunks):
+                if i:
+                    time.sleep(delay / 2 / len(chunks))
+                payload = json.dumps(_response(chunk, prompt, model, finish=i == len(chunks) - 1), ensure_ascii=False)
+                if sse:
+                    data = f"data: {payload}\r\n\r\n"
+                else:
+                    data = ("[" if i == 0 else ",\r\n") + payload + ("]" if i == len(chunks) - 1 else "")
+                self._write_chunk(data.encode("utf-8"))
+            self._write_chunk(b"")
+
+        def _write_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    return StubHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yerel sahte Gemini sunucusu")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Medyan yanıt gecikmesi")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="Log-normal yayılım (0 = sabit)")
+    parser.add_argument("--ms-per-token", type=float, default=0.0, help="Çıktı token'ı başına ek gecikme")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 dönen isteklerin oranı")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="429 dönen isteklerin oranı")
+    parser.add_argument("--rpm", type=int, default=0, help="Dakikalık istek kotası (0 = sınırsız)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(StubConfig(args)))
+    server.daemon_threads = True
+    print(f"✅ Sahte Gemini sunucusu: http://{args.host}:{args.port} "
+          f"(gecikme ~{args.latency_ms} ms, hata %{args.error_rate * 100:g}, 429 %{args.rate_limit_rate * 100:g}, rpm {args.rpm or '∞'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
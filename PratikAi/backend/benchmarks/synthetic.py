@@ -0,0 +1,75 @@
+"""
+Benchmark'lar için tekrarlanabilir sentetik veri üreteçleri
+Aynı seed her çalıştırmada aynı veriyi üretir; böylece commit'ler arası sonuçlar karşılaştırılabilir.
+Ders metni üreteci bench_summary.make_document'tır.
+"""
+
+import random
+from typing import Dict, List, Any
+
+from bench_summary import VOCABULARY
+
+# Bloom düzeylerine dağılan soru kökleri (hatırlama -> yaratma)
+QUESTION_STEMS = (
+    "nedir?", "hangisidir?", "tanımlayınız.", "neden önemlidir?", "nasıl açıklanır?",
+    "örnek veriniz.", "nasıl uygulanır?", "karşılaştırınız.", "farkları nelerdir?",
+    "değerlendiriniz.", "eleştiriniz.", "tasarlayınız.", "bir model öneriniz.",
+)
+GOALS = ("generate_quiz", "generate_summary", "analyze_text", "recommend_resources")
+OPTION_KEYS = ("A", "B", "C", "D")
+
+
+def _phrase(rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(low, high)))
+
+
+def make_questions(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Yapısal çoktan seçmeli sorular (Bloom analizi ve PDF için)"""
+    rng = random.Random(seed)
+    return [
+        {
+            "question": f"{_phrase(rng, 6, 14).capitalize()} {rng.choice(QUESTION_STEMS)}",
+            "options": {key: _phrase(rng, 2, 6) for key in OPTION_KEYS},
+            "correct_answer": rng.choice(OPTION_KEYS),
+        }
+        for _ in range(count)
+    ]
+
+
+def make_quiz_text(count: int, seed: int = 42) -> str:
+    """Gemini'nin metin modundaki ham sınav çıktısı (parse_quiz_text girdisi)"""
+    blocks = []
+    for i, q in enumerate(make_questions(count, seed), 1):
+        options = "\n".join(f"{key}) {value}" for key, value in q["options"].items())
+        blocks.append(f"**{i}. Soru:** {q['question']}\n{options}\n**Doğru Cevap: {q['correct_answer']}**\n")
+    return "\n".join(blocks)
+
+
+def make_memory_items(count: int, seed: int = 42) -> List[tuple]:
+    """(anahtar, değer) çiftleri; değerler küçük bağlam sözlükleridir"""
+    rng = random.Random(seed)
+    return [
+        (f"key_{i}", {"topic": rng.choice(VOCABULARY), "score": rng.random(), "text": _phrase(rng, 5, 20)})
+        for i in range(count)
+    ]
+
+
+def make_episodes(count: int, task_ids: int = 100, seed: int = 42) -> List[Dict[str, Any]]:
+    """Etmen epizotları: hedef, eylemler, sonuç ve görev kimliği"""
+    rng = random.Random(seed)
+    return [
+        {
+            "goal": f"{rng.choice(GOALS)} {rng.choice(VOCABULARY)}",
+            "actions": [rng.choice(GOALS) for _ in range(rng.randint(1, 4))],
+            "result": {"success": rng.random() > 0.2, "questions": rng.randint(0, 10)},
+            "task_id": f"task_{rng.randrange(task_ids)}",
+        }
+        for _ in range(count)
+    ]
+
+
+def make_goals(count: int, seed: int = 7) -> List[str]:
+    """Epizot aramasında kullanılan hedefler (bir kısmı hiçbir epizotla eşleşmez)"""
+    rng = random.Random(seed)
+    return [f"{rng.choice(GOALS + ('unknown_goal',))} {rng.choice(VOCABULARY)}" for _ in range(count)]
+
@@ -1,20 +1,33 @@
+import asyncio
+import io
+import json
 import os
 import re
-from fastapi import FastAPI, UploadFile, File, Form, Body
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, Form, Body, Query, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse, Response, JSONResponse
 from typing import List, Dict, Any
 from dotenv import load_dotenv
 from pathlib import Path
 
 # Servis dosyalarımızdaki fonksiyonları import ediyoruz
 from services.gemini_service import init_gemini, generate_questions_from_gemini, generate_summary_from_gemini, get_recommendations
-from services.file_processor import process_uploaded_file
-from services.pdf_generator import create_quiz_pdf
+from services.file_processor import process_uploaded_file, process_uploaded_files, save_upload_to_temp, UploadSizeLimitMiddleware, MAX_MULTI_REQUEST_BODY_SIZE
+from services.pdf_generator import get_quiz_pdfs, stream_quiz_zip, PDF_VARIANTS
 from services.learning_agent import LearningAgent, create_learning_agent
 from services.tools import call_tool, get_tool_descriptions
 from services.multi_agent_system import get_multi_agent_system
 from services.memory_system import get_memory_system
+from services.request_context import RequestContextMiddleware, set_user_id, get_user_id, get_endpoint
+from services.usage_accounting import get_usage_ledger, accounting_user
+from services.metrics import MetricsMiddleware, render_metrics, METRICS_CONTENT_TYPE
+from services.tracing import start_trace, recent_traces, get_trace
+from services.profiling import ProfilingMiddleware
+from services.job_queue import get_job_queue, discard_job_upload, FINISHED_STATUSES, JOB_UPLOAD_DIR
+from services.response_format import FastJSONResponse, check_sections, select_sections
+from services.scheduler import size_thread_limiter
 
 # .env dosyasını manuel olarak yükle
 load_dotenv()
@@ -26,7 +39,7 @@ api_key = os.getenv("GOOGLE_API_KEY")
 init_gemini(api_key)
 
 # AI Provider Manager'ı başlat (Fallback mekanizması)
-from services.ai_provider import get_ai_provider_manager
+from services.ai_provider import get_ai_provider_manager, get_last_degraded_reason
 ai_provider_manager = get_ai_provider_manager()
 
 # Etmen oluştur - Hafta 2: Etmen Sistemleri
@@ -38,7 +51,26 @@ multi_agent_system = get_multi_agent_system()
 # Bellek Sistemi - Hafta 7: Bellek Mimarisi
 memory_system = get_memory_system()
 
-app = FastAPI(title="PratikAi API")
+# Arka plan iş kuyruğu - uzun süren üretimler için gönder/sorgula (bekleyen işler yeniden başlatmada devam eder)
+job_queue = get_job_queue()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Slot bekleyen provider çağrıları thread tutar; havuz zamanlayıcı kuyruklarına göre büyütülür
+    threads = size_thread_limiter()
+    if threads:
+        print(f"✅ Thread havuzu {threads} olarak ayarlandı")
+    yield
+
+# Yanıtlar orjson ile serileştirilir (yüklü değilse standart json)
+app = FastAPI(title="PratikAi API", default_response_class=FastJSONResponse, lifespan=lifespan)
+
+# Yükleme boyutu sınırı - büyük istekler multipart ayrıştırılmadan reddedilir
+# CORS'tan önce eklenir: CORS dışta kalır, 413 yanıtları da CORS başlıklarını taşır
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    path_limits={"/api/v1/generate-quiz-from-files": MAX_MULTI_REQUEST_BODY_SIZE}
+)
 
 # CORS Ayarları
 origins = ["http://localhost:3000"]
@@ -48,12 +80,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Profile-Id"],
 )
 
+# Kullanıcı (X-User-Id) ve endpoint bilgisi token muhasebesi için istek bağlamına yazılır
+app.add_middleware(RequestContextMiddleware)
+
+# Endpoint başına istek sayısı ve süre histogramı (/metrics)
+app.add_middleware(MetricsMiddleware)
+
+# İmzalı X-Profile-Token başlığı veya PROFILE_SAMPLE_RATE ile tetiklenen istek profilleme (en dış katman)
+app.add_middleware(ProfilingMiddleware)
+
 # --- API ENDPOINT'LERİ ---
 
+# Gözlem endpoint'leri async çalışır: thread havuzu dolduğunda da yanıt verir
 @app.get("/api/v1/health", tags=["General"])
-def read_health():
+async def read_health():
     """Uygulamanın ayakta olup olmadığını kontrol eder."""
     # AI Provider durumunu kontrol et
     current_provider = ai_provider_manager.get_provider()
@@ -62,21 +105,29 @@ def read_health():
     return {
         "status": "OK",
         "ai_provider": provider_name,
-        "ai_available": current_provider.is_available() if current_provider else False
+        "ai_available": current_provider.is_available() if current_provider else False,
+        "routing": ai_provider_manager.get_routing_stats()
     }
 
+@app.get("/metrics", tags=["General"], include_in_schema=False)
+async def read_metrics():
+    """Prometheus metin formatında metrikler"""
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 @app.post("/api/v1/generate-quiz-from-text", tags=["Quiz Generation"])
 def generate_quiz_from_text(
     text: str = Form(...),
     num_questions: int = Form(5),
     question_type: str = Form("çoktan seçmeli"),
     difficulty: str = Form("orta"),
-    user_id: str = Form(None)  # Chapter 4: Kullanıcı tercihlerini hatırlama
+    user_id: str = Form(None),  # Chapter 4: Kullanıcı tercihlerini hatırlama
+    bank_first: bool = Form(False)  # Önce soru bankasındaki sorular kullanılır
 ):
     """
     Doğrudan metin alıp sınav ve tavsiye üretir.
     Chapter 4: Self-Explanation ve Memory System entegrasyonu
     """
+    set_user_id(user_id)
     # Chapter 4: Kullanıcı tercihlerini Memory System'den al
     user_preferences = {}
     if user_id:
@@ -102,7 +153,7 @@ def generate_quiz_from_text(
     reasoning_result["difficulty"] = difficulty
     
     # Soruları üret
-    result = generate_questions_from_gemini(text, num_questions, question_type, difficulty)
+    result = generate_questions_from_gemini(text, num_questions, question_type, difficulty, bank_first)
     
     # Chapter 4: Self-Explanation ekle
     result["explanation"] = reasoning_result.get("explanation", "")
@@ -127,35 +178,223 @@ async def generate_quiz_from_file(
     file: UploadFile = File(...),
     num_questions: int = Form(5),
     question_type: str = Form("çoktan seçmeli"),
-    difficulty: str = Form("orta")
+    difficulty: str = Form("orta"),
+    bank_first: bool = Form(False)
 ):
     """Dosya (resim, pdf) alıp metni çıkarır ve sınav/tavsiye üretir."""
     extracted_text = await process_uploaded_file(file)
-    return generate_questions_from_gemini(extracted_text, num_questions, question_type, difficulty)
+    return await run_in_threadpool(
+        generate_questions_from_gemini, extracted_text, num_questions, question_type, difficulty, bank_first
+    )
+
+@app.post("/api/v1/generate-quiz-from-files", tags=["Quiz Generation"])
+async def generate_quiz_from_files(
+    files: List[UploadFile] = File(...),
+    num_questions: int = Form(5),
+    question_type: str = Form("çoktan seçmeli"),
+    difficulty: str = Form("orta"),
+    bank_first: bool = Form(False)
+):
+    """
+    Birden fazla dosyayı (PDF, resim) eşzamanlı işler, metinleri sırayla birleştirir
+    ve tüm içerik üzerinden tek bir sınav üretir. Her dosyanın kökeni "sources" alanında döner.
+    """
+    extracted = await process_uploaded_files(files)
+    result = await run_in_threadpool(
+        generate_questions_from_gemini, extracted["text"], num_questions, question_type, difficulty, bank_first
+    )
+    result["sources"] = extracted["sources"]
+    return result
+
+def _summary_response(summary: str, recommendations: List[Dict[str, str]]) -> Dict[str, Any]:
+    """Özet yanıtını oluşturur; özet degrade yoldan geldiyse işaretler."""
+    response = {"summary": summary, "recommendations": recommendations}
+    degraded_reason = get_last_degraded_reason()
+    if degraded_reason:
+        response["degraded"] = True
+        response["degraded_reason"] = degraded_reason
+    return response
+
+def _summarize(text: str) -> Dict[str, Any]:
+    """Özet ve tavsiyeleri üretip yanıtı oluşturur."""
+    summary = generate_summary_from_gemini(text)
+    recommendations = get_recommendations(text)
+    return _summary_response(summary, recommendations)
+
+@app.get("/api/v1/question-bank/stats", tags=["Quiz Generation"])
+def get_question_bank_stats():
+    """Soru bankasındaki soru/kaynak sayısı ve Bloom düzeyi dağılımı."""
+    from services.question_bank import get_question_bank
+    return get_question_bank().stats()
+
+@app.get("/api/v1/usage", tags=["General"])
+def get_usage(user_id: str = Query(None), day: str = Query(None)):
+    """Günlük token ve maliyet raporu (endpoint / provider / kullanıcı kırılımı ve bütçe durumu)"""
+    ledger = get_usage_ledger()
+    if ledger is None:
+        raise HTTPException(status_code=404, detail="Kullanım muhasebesi devre dışı.")
+    return ledger.report(user_id, day)
 
 @app.post("/api/v1/generate-summary-from-text", tags=["Summary Generation"])
 def generate_summary_from_text(text: str = Form(...)):
     """Doğrudan metin alıp özet ve tavsiye üretir."""
-    summary = generate_summary_from_gemini(text)
-    recommendations = get_recommendations(text)
-    return {"summary": summary, "recommendations": recommendations}
+    return _summarize(text)
 
 @app.post("/api/v1/generate-summary-from-file", tags=["Summary Generation"])
 async def generate_summary_from_file(file: UploadFile = File(...)):
     """Dosya (resim, pdf) alıp metni çıkarır ve özet/tavsiye üretir."""
     extracted_text = await process_uploaded_file(file)
-    summary = generate_summary_from_gemini(extracted_text)
-    recommendations = get_recommendations(extracted_text)
-    return {"summary": summary, "recommendations": recommendations}
+    # Degrade bilgisi thread'in bağlamında kalır; yanıt da aynı thread'de oluşturulur
+    return await run_in_threadpool(_summarize, extracted_text)
 
 @app.post("/api/v1/download-quiz-pdf", tags=["PDF Generation"])
-def download_quiz_pdf(quiz_data: List[Dict[str, Any]] = Body(...)):
-    """Sınav verisini (JSON) alıp PDF dosyasına dönüştürür."""
-    pdf_path = create_quiz_pdf(quiz_data)
-    return FileResponse(path=pdf_path, media_type='application/pdf', filename='PratikAi_Sinavi.pdf')
+async def download_quiz_pdf(
+    quiz_data: List[Dict[str, Any]] = Body(...),
+    include_answers: bool = Query(True)
+):
+    """
+    Sınav verisini (JSON) alıp PDF dosyasına dönüştürür.
+    PDF bellekte üretilir (render event loop dışında çalışır) ve doğrudan akış olarak döner.
+    Aynı sınav verisi için üretilmiş PDF önbellekten verilir.
+    Öğretmen kopyasında cevaplar son sayfadaki cevap anahtarında yer alır;
+    include_answers=false ise cevap anahtarı olmayan öğrenci kopyası üretilir.
+    """
+    variant = "teacher" if include_answers else "student"
+    pdfs = await get_quiz_pdfs(quiz_data, (variant,))
+    return StreamingResponse(
+        io.BytesIO(pdfs[variant]),
+        media_type='application/pdf',
+        headers={"Content-Disposition": 'attachment; filename="PratikAi_Sinavi.pdf"'}
+    )
+
+@app.post("/api/v1/download-quizzes-zip", tags=["PDF Generation"])
+async def download_quizzes_zip(
+    quizzes: List[List[Dict[str, Any]]] = Body(...),
+    copies: str = Query("both")  # "student", "teacher" veya "both"
+):
+    """
+    Birden fazla sınavı tek seferde ZIP arşivi olarak indirir (sınıf geneli dışa aktarma).
+    PDF'ler paralel üretilir ve arşiv her PDF hazır oldukça parça parça akıtılır.
+    """
+    if copies == "both":
+        variants = PDF_VARIANTS
+    elif copies in PDF_VARIANTS:
+        variants = (copies,)
+    else:
+        raise HTTPException(status_code=422, detail="copies parametresi 'student', 'teacher' veya 'both' olmalıdır.")
+
+    return StreamingResponse(
+        stream_quiz_zip(quizzes, variants),
+        media_type='application/zip',
+        headers={"Content-Disposition": 'attachment; filename="PratikAi_Sinavlari.zip"'}
+    )
+
+# --- ARKA PLAN İŞLERİ ---
+# Büyük belgelerde üretim proxy zaman aşımını geçebilir; iş gönderilir, sonuç sorgulanır veya akış olarak beklenir
+
+# Olay akışında iş durumunun kontrol aralığı (sn)
+JOB_EVENTS_POLL_SECONDS = 0.5
+
+async def _submit_job(kind: str, text: str, file: UploadFile, params: Dict[str, Any],
+                      user_id: str, idempotency_key: str) -> JSONResponse:
+    """
+    Metni veya dosyayı işe ekler; yeni iş 202, idempotency anahtarıyla bulunan mevcut iş 200 döner.
+    Dosya yalnızca diske kaydedilir, metin çıkarma (PDF okuma / OCR) işte yapılır.
+    """
+    set_user_id(user_id)
+    if file is not None:
+        file_path, file_kind = await save_upload_to_temp(file, JOB_UPLOAD_DIR)
+        params.update(file_path=file_path, file_kind=file_kind)
+    elif text:
+        params["text"] = text
+    else:
+        raise HTTPException(status_code=422, detail="'text' veya 'file' alanlarından biri gönderilmelidir.")
+    try:
+        job, created = job_queue.submit(kind, params, accounting_user(), get_endpoint(), idempotency_key)
+    except BaseException:
+        discard_job_upload(params)
+        raise
+    if not created:
+        discard_job_upload(params)
+    job["status_url"] = f"/api/v1/jobs/{job['job_id']}"
+    job["events_url"] = f"/api/v1/jobs/{job['job_id']}/events"
+    return JSONResponse(job, status_code=202 if created else 200)
+
+@app.post("/api/v1/jobs/quiz", tags=["Jobs"])
+async def submit_quiz_job(
+    text: str = Form(None),
+    file: UploadFile = File(None),
+    num_questions: int = Form(5),
+    question_type: str = Form("çoktan seçmeli"),
+    difficulty: str = Form("orta"),
+    bank_first: bool = Form(False),
+    user_id: str = Form(None),
+    idempotency_key: str = Form(None),
+    idempotency_header: str = Header(None, alias="Idempotency-Key")
+):
+    """Sınav üretimini arka planda başlatır; iş kimliği hemen döner."""
+    params = {"num_questions": num_questions, "question_type": question_type, "difficulty": difficulty, "bank_first": bank_first}
+    return await _submit_job("quiz", text, file, params, user_id, idempotency_key or idempotency_header)
+
+@app.post("/api/v1/jobs/summary", tags=["Jobs"])
+async def submit_summary_job(
+    text: str = Form(None),
+    file: UploadFile = File(None),
+    user_id: str = Form(None),
+    idempotency_key: str = Form(None),
+    idempotency_header: str = Header(None, alias="Idempotency-Key")
+):
+    """Özet ve tavsiye üretimini arka planda başlatır; iş kimliği hemen döner."""
+    return await _submit_job("summary", text, file, {}, user_id, idempotency_key or idempotency_header)
+
+@app.get("/api/v1/jobs/stats", tags=["Jobs"])
+async def get_job_stats():
+    """Kuyruktaki iş sayısı, işçi sayısı ve durum dağılımı."""
+    return job_queue.stats()
+
+@app.get("/api/v1/jobs/{job_id}", tags=["Jobs"])
+def get_job(job_id: str):
+    """İşin durumu (queued/running/succeeded/failed); bittiyse sonuç veya hata."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="İş bulunamadı veya sonucun süresi doldu.")
+    return job
+
+@app.get("/api/v1/jobs/{job_id}/events", tags=["Jobs"])
+async def stream_job_events(job_id: str):
+    """
+    İş durumunu Server-Sent Events olarak akıtır: her durum değişikliğinde bir "status" olayı,
+    iş bitince sonucu/hatayı içeren son bir "done" olayı gönderilir.
+    """
+    if job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="İş bulunamadı veya sonucun süresi doldu.")
+
+    async def events():
+        last_status = None
+        while True:
+            job = job_queue.get(job_id)
+            if job is None:
+                yield "event: error\ndata: {\"detail\": \"expired\"}\n\n"
+                return
+            if job["status"] in FINISHED_STATUSES:
+                yield f"event: done\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+                return
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield f"event: status\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+            await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 # --- ETMEN TABANLI ENDPOINT'LER - Hafta 2, 3, 5 ---
 
+# Yanıtta bulunabilecek bölümler (fields ile seçilebilir; trace yalnızca include_trace ile gelir)
+AGENT_SECTIONS = ("agent_state", "perception", "reasoning", "plan", "results", "explanation", "self_model", "trace")
+MULTI_AGENT_SECTIONS = ("coordinator_state", "plan", "results", "error", "trace")
+# view=compact yanıtlarında kalan bölümler (iz istenmişse o da korunur)
+AGENT_COMPACT_SECTIONS = ("results", "explanation", "trace")
+MULTI_AGENT_COMPACT_SECTIONS = ("plan", "results", "error", "trace")
+
 @app.get("/api/v1/agent/state", tags=["Agent"])
 def get_agent_state():
     """Etmen durumunu döndürür - Hafta 2: Etmen Durum Yönetimi"""
@@ -166,7 +405,11 @@ async def agent_generate_quiz(
     text: str = Form(...),
     num_questions: int = Form(5),
     difficulty: str = Form("orta"),
-    user_id: str = Form(None)  # Chapter 4: Kullanıcı tercihlerini hatırlama
+    user_id: str = Form(None),  # Chapter 4: Kullanıcı tercihlerini hatırlama
+    bank_first: bool = Form(False),  # Önce soru bankasındaki sorular kullanılır
+    include_trace: bool = Form(False),  # Algılama/akıl yürütme/planlama/eylem span'leri yanıta eklenir
+    view: str = Form("full"),  # compact: yalnızca sonuçlar ve açıklama
+    fields: str = Form(None)  # Virgülle ayrılmış bölümler, örn. "results,plan" (view'dan önceliklidir)
 ):
     """
     Etmen tabanlı sınav üretimi - Hafta 2, 3, 5: Etmen Mimarisi
@@ -178,7 +421,12 @@ async def agent_generate_quiz(
     - Planlama (Planning)
     - Eylem (Action)
     - Self-Explanation (Chapter 4: Transparency)
+
+    Tam yanıt girdi metnini (perception) ve etmen durumunu da içerir; istemciler view=compact
+    veya fields ile yalnızca ihtiyaç duydukları bölümleri alır.
     """
+    check_sections(view, fields, AGENT_SECTIONS)
+    set_user_id(user_id)
     # Chapter 4: Kullanıcı tercihlerini Memory System'den al
     user_preferences = {}
     if user_id:
@@ -186,37 +434,40 @@ async def agent_generate_quiz(
         if user_profile:
             user_preferences = user_profile.get("preferences", {})
     
-    # 1. Algılama (Perception) - Hafta 2
-    perceived_data = learning_agent.perceive({
-        "text": text,
-        "file_type": "text",
-        "preferences": user_preferences
-    })
+    with start_trace("agent.generate_quiz", force=include_trace, num_questions=num_questions, difficulty=difficulty) as trace:
+        # 1. Algılama (Perception) - Hafta 2
+        perceived_data = learning_agent.perceive({
+            "text": text,
+            "file_type": "text",
+            "preferences": user_preferences
+        })
     
-    # 2. Akıl Yürütme (Reasoning) - Hafta 3, Chapter 4: Self-Explanation
-    reasoning_result = learning_agent.reason(perceived_data, goal="generate_quiz")
+        # 2. Akıl Yürütme (Reasoning) - Hafta 3, Chapter 4: Self-Explanation
+        reasoning_result = learning_agent.reason(perceived_data, goal="generate_quiz")
     
-    # Planlama parametrelerini güncelle
-    reasoning_result["num_questions"] = num_questions
-    reasoning_result["difficulty"] = difficulty
+        # Planlama parametrelerini güncelle
+        reasoning_result["num_questions"] = num_questions
+        reasoning_result["difficulty"] = difficulty
     
-    # 3. Planlama (Planning) - Hafta 5
-    plan = learning_agent.plan("generate_quiz", reasoning_result)
+        # 3. Planlama (Planning) - Hafta 5
+        plan = learning_agent.plan("generate_quiz", reasoning_result)
     
-    # 4. Eylem (Action) - Hafta 2, 5: Araç Kullanımı
-    def external_function(**kwargs):
-        return call_tool("generate_quiz", {
-            "text": text,
-            "num_questions": kwargs.get("num_questions", num_questions),
-            "difficulty": kwargs.get("difficulty", difficulty)
-        }, None)
+        # 4. Eylem (Action) - Hafta 2, 5: Araç Kullanımı
+        def external_function(**kwargs):
+            return call_tool("generate_quiz", {
+                "text": text,
+                "num_questions": kwargs.get("num_questions", num_questions),
+                "difficulty": kwargs.get("difficulty", difficulty),
+                "bank_first": bank_first
+            }, None)
     
-    results = learning_agent.act(plan, external_function)
+        # Provider çağrısı event loop dışında çalışır; istemci kapanırsa (iptal belirteci) sonraki adımlar atlanır
+        results = await run_in_threadpool(learning_agent.act, plan, external_function)
     
     # Chapter 4: Self-Explanation ekle
     explanation = learning_agent.get_explanation()
     
-    return {
+    response = {
         "agent_state": learning_agent.get_state(),
         "perception": perceived_data,
         "reasoning": reasoning_result,
@@ -225,6 +476,10 @@ async def agent_generate_quiz(
         "explanation": explanation,  # Chapter 4: Self-Explanation
         "self_model": learning_agent.self_model  # Chapter 4: Self-Modeling
     }
+    if include_trace and trace is not None:
+        response["trace"] = trace.to_dict()
+    # Yanıt doğrudan döndürülür; FastAPI'nin jsonable_encoder geçişi atlanır
+    return FastJSONResponse(select_sections(response, view, fields, AGENT_COMPACT_SECTIONS))
 
 @app.get("/api/v1/tools", tags=["Agent"])
 def list_tools():
@@ -243,7 +498,10 @@ async def multi_agent_process(
     text: str = Form(...),
     goal: str = Form("generate_quiz"),
     num_questions: int = Form(5),
-    difficulty: str = Form("orta")
+    difficulty: str = Form("orta"),
+    include_trace: bool = Form(False),  # Coordinator -> Delegator -> Worker span'leri yanıta eklenir
+    view: str = Form("full"),  # compact: coordinator_state olmadan plan ve sonuçlar
+    fields: str = Form(None)  # Virgülle ayrılmış bölümler, örn. "results" (view'dan önceliklidir)
 ):
     """
     Çoklu etmen sistemi ile işlem - Hafta 6: CWD Modeli
@@ -253,6 +511,7 @@ async def multi_agent_process(
     - Delegator: Görev dağıtımı
     - Workers: Uzman etmenler (soru üretici, özet üretici, analizci, önerici)
     """
+    check_sections(view, fields, MULTI_AGENT_SECTIONS)
     input_data = {
         "text": text,
         "file_type": "text",
@@ -262,7 +521,8 @@ async def multi_agent_process(
         }
     }
     
-    result = multi_agent_system.process_request(goal, input_data)
+    with start_trace("multi_agent.process", force=include_trace, goal=goal) as trace:
+        result = await run_in_threadpool(multi_agent_system.process_request, goal, input_data)
     
     # Bellek sistemine kaydet - Hafta 7
     memory_system.store_context("episodic", "multi_agent_request", {
@@ -271,7 +531,22 @@ async def multi_agent_process(
         "result": result
     })
     
-    return result
+    if include_trace and trace is not None:
+        result["trace"] = trace.to_dict()
+    return FastJSONResponse(select_sections(result, view, fields, MULTI_AGENT_COMPACT_SECTIONS))
+
+@app.get("/api/v1/traces", tags=["Agent"])
+def list_traces(limit: int = Query(20, ge=1, le=200)):
+    """Son etmen izlerinin özetleri (yeniden eskiye)"""
+    return {"traces": recent_traces(limit)}
+
+@app.get("/api/v1/traces/{trace_id}", tags=["Agent"])
+def read_trace(trace_id: str):
+    """Bir izin span ağacı: süreler, özellikler ve adım başına provider çağrıları"""
+    trace = get_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="İz bulunamadı (halka tampondan çıkmış olabilir).")
+    return trace
 
 # --- BELLEK SİSTEMİ ENDPOINT'LERİ - Hafta 7 ---
 
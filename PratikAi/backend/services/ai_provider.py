@@ -4,14 +4,68 @@ Gemini çökerse otomatik olarak alternatif provider'a geçer
 """
 
 import os
-from typing import Dict, List, Any, Optional
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Dict, List, Any, Optional, Tuple
 from enum import Enum
 from abc import ABC, abstractmethod
 
+from services.usage_accounting import record_usage, check_budget, estimate_tokens, usage_from_response
+from services.prompt_preprocessor import prepare_prompt_text
+from services.metrics import PROVIDER_CALLS, PROVIDER_LATENCY, PROVIDER_WASTED
+from services.tracing import record_provider_call
+from services.scheduler import get_provider_scheduler
+from services.request_context import get_cancel_token, check_cancelled, get_request_class
+
+# --- GECİKME TABANLI YÖNLENDİRME AYARLARI ---
+# Kayan pencere: sağlayıcı başına son N çağrı, en fazla bu kadar saniye geriye
+ROUTING_WINDOW_SIZE = int(os.getenv("ROUTING_WINDOW_SIZE", "100"))
+ROUTING_WINDOW_SECONDS = float(os.getenv("ROUTING_WINDOW_SECONDS", "300"))
+# Karar vermek için gereken en az örnek sayısı
+ROUTING_MIN_SAMPLES = int(os.getenv("ROUTING_MIN_SAMPLES", "5"))
+# SLO: p95 gecikme (ms) ve en yüksek hata oranı
+PROVIDER_SLO_P95_MS = float(os.getenv("PROVIDER_SLO_P95_MS", "15000"))
+PROVIDER_MAX_ERROR_RATE = float(os.getenv("PROVIDER_MAX_ERROR_RATE", "0.5"))
+# Zamanlayıcıda bu kadar çağrı bekliyorsa aşırı yük kabul edilir: yeni çağrılar kuyruğa girmeden
+# yerel provider'larla (daha az soru) yanıtlanır (0 = kapalı)
+DEGRADE_QUEUE_DEPTH = int(os.getenv("DEGRADE_QUEUE_DEPTH", "16"))
+# Degrade modunda / failover sonrasında birincil sağlayıcının yeniden denenme aralığı
+DEGRADE_COOLDOWN_SECONDS = float(os.getenv("DEGRADE_COOLDOWN_SECONDS", "30"))
+# Degrade modunda üretilecek en fazla soru sayısı
+DEGRADED_MAX_QUESTIONS = int(os.getenv("DEGRADED_MAX_QUESTIONS", "5"))
+
+# Çoktan seçmeli soru çıktısı: "json" (şemalı yapısal çıktı) veya "text" (regex ile ayrıştırma)
+QUIZ_OUTPUT_MODE = os.getenv("QUIZ_OUTPUT_MODE", "json").lower()
+
+# Metin moduna kalıcı geçiş yalnızca bu alanlardan söz eden hatalarda yapılır
+# (geçersiz anahtar, çok uzun istem gibi diğer 400'ler fallback zincirine iletilir)
+_SCHEMA_ERROR_MARKERS = ("response_schema", "responseschema", "response_mime_type", "responsemimetype")
+
+# Ayrıştırılan soru sayısı istenenden azsa eksikler için yapılacak en fazla ek istek
+QUIZ_TOPUP_MAX_RETRIES = int(os.getenv("QUIZ_TOPUP_MAX_RETRIES", "2"))
+
+# Gemini API adresi; boşsa Google'ın varsayılanı. Yerel sahte sunucu (benchmarks/stub_gemini.py)
+# için örn. http://127.0.0.1:8089 verilir ve REST taşıyıcısı kullanılır.
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT", "")
+
+# Bu bağlamdaki son çağrının degrade nedeni (yanıtları işaretlemek için)
+_last_degraded_reason: ContextVar[Optional[str]] = ContextVar("last_degraded_reason", default=None)
+
+
+def _is_schema_unsupported(error: Exception) -> bool:
+    """Hata, modelin/SDK'nın response_schema veya response_mime_type desteklemediğini mi söylüyor?"""
+    message = str(error).lower()
+    return any(marker in message for marker in _SCHEMA_ERROR_MARKERS)
+
 
 class AIProvider(Enum):
     """Desteklenen AI Provider'lar"""
     GEMINI = "gemini"
+    EXTRACTIVE = "extractive"  # Çevrimdışı özetleme
+    CLOZE = "cloze"  # Çevrimdışı boşluk doldurma soruları
     MOCK = "mock"  # Offline test için
     # OPENAI ve CLAUDE gelecekte eklenebilir
 
@@ -19,6 +73,9 @@ class AIProvider(Enum):
 class BaseAIProvider(ABC):
     """AI Provider için temel arayüz"""
     
+    # Yerel (ağ ve kota gerektirmeyen) provider'lar degrade modunda kullanılır
+    is_local = False
+    
     @abstractmethod
     def generate_questions(self, text: str, num_questions: int, question_type: str, difficulty: str) -> Dict[str, Any]:
         """Soru üret"""
@@ -33,6 +90,30 @@ class BaseAIProvider(ABC):
     def is_available(self) -> bool:
         """Provider kullanılabilir mi?"""
         pass
+    
+    def extract_keywords(self, text: str, top_k: int) -> List[str]:
+        """Anahtar kelime çıkar (yalnızca LLM provider'ları destekler)"""
+        raise NotImplementedError(f"{self.__class__.__name__} anahtar kelime çıkarmaz")
+
+
+def configure_gemini(api_key: str):
+    """genai'yi anahtar ve (tanımlıysa) GEMINI_API_ENDPOINT adresiyle yapılandırır"""
+    import google.generativeai as genai
+    if GEMINI_API_ENDPOINT:
+        genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+    else:
+        genai.configure(api_key=api_key)
+    return genai
+
+
+def quiz_json_config():
+    """Soru üretimi için şemalı JSON üretim ayarı; genai yapılandırılmadan da oluşturulabilir (kaset replay)"""
+    import google.generativeai as genai
+    from services.structured_output import QUIZ_RESPONSE_SCHEMA
+    return genai.GenerationConfig(
+        response_mime_type="application/json",
+        response_schema=QUIZ_RESPONSE_SCHEMA
+    )
 
 
 class GeminiProvider(BaseAIProvider):
@@ -41,6 +122,17 @@ class GeminiProvider(BaseAIProvider):
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
         self.model = None
+        self.json_config = None
+        # Model/SDK şemayı desteklemezse ilk hatada kalıcı olarak metin moduna düşülür
+        self.structured_output = QUIZ_OUTPUT_MODE == "json"
+        # Mod başına ayrıştırma başarısı ve çıktı token sayıları (JSON ve metin modunu kıyaslamak için)
+        self.output_stats = {
+            mode: {"requests": 0, "requested_questions": 0, "parsed_questions": 0, "output_tokens": 0}
+            for mode in ("json", "text")
+        }
+        # İstem ön işlemesinin etkisi: ham / gönderilen metin token'ları
+        self.prompt_stats = {"requests": 0, "original_tokens": 0, "tokens": 0, "boilerplate_lines": 0}
+        self._stats_lock = threading.Lock()
         self._initialize()
     
     def _initialize(self):
@@ -48,8 +140,7 @@ class GeminiProvider(BaseAIProvider):
         try:
             if not self.api_key:
                 raise ValueError("Gemini API anahtarı bulunamadı")
-            import google.generativeai as genai
-            genai.configure(api_key=self.api_key)
+            genai = configure_gemini(self.api_key)
             # Güncel model adı: gemini-2.5-flash veya gemini-2.0-flash
             try:
                 self.model = genai.GenerativeModel('gemini-2.5-flash')
@@ -59,6 +150,7 @@ class GeminiProvider(BaseAIProvider):
                 except:
                     # Son çare
                     self.model = genai.GenerativeModel('gemini-pro')
+            self.json_config = quiz_json_config()
             print("✅ Gemini Provider başarıyla yapılandırıldı")
         except Exception as e:
             print(f"⚠️ Gemini Provider başlatılamadı: {e}")
@@ -68,14 +160,50 @@ class GeminiProvider(BaseAIProvider):
         """Gemini kullanılabilir mi?"""
         return self.model is not None
     
-    def generate_questions(self, text: str, num_questions: int, question_type: str, difficulty: str) -> Dict[str, Any]:
-        """Gemini ile soru üret"""
-        if not self.is_available():
-            raise Exception("Gemini kullanılamıyor")
-        
-        from services.gemini_service import parse_quiz_text, analyze_question_types, get_recommendations
-        
-        prompt = f"""
+    def _generate(self, prompt: str, **kwargs):
+        """
+        generate_content sarmalayıcısı; her çağrının token kullanımı istek sahibine yazılır.
+        İstek iptal edildiyse çağrı yapılmaz; isteğin kalan süresi SDK zaman aşımı olarak verilir.
+        """
+        token = get_cancel_token()
+        if token is not None:
+            token.check()
+            remaining = token.remaining()
+            if remaining is not None:
+                kwargs.setdefault("request_options", {"timeout": max(remaining, 1.0)})
+        response = self.model.generate_content(prompt, **kwargs)
+        record_usage(self.__class__.__name__, *usage_from_response(response))
+        return response
+    
+    def _prepare_text(self, text: str, num_questions: Optional[int] = None) -> str:
+        """Metni isteme girmeden önce küçültür (boşluk, şablon satırları, isteğe bağlı pasaj seçimi)"""
+        prepared, report = prepare_prompt_text(text, num_questions)
+        with self._stats_lock:
+            self.prompt_stats["requests"] += 1
+            for key in ("original_tokens", "tokens", "boilerplate_lines"):
+                self.prompt_stats[key] += report[key]
+        return prepared
+    
+    def _question_prompt(self, text: str, num_questions: int, question_type: str, difficulty: str,
+                         exclude: Optional[List[str]] = None, structured: bool = False) -> str:
+        """
+        Soru üretim istemi; exclude verilirse bu sorular tekrar edilmemesi için isteme eklenir.
+        structured modda biçim şemayla zorlandığı için örnek çıktı formatı gönderilmez.
+        """
+        exclusions = ""
+        if exclude:
+            listed = "\n".join(f"        - {q}" for q in exclude)
+            exclusions = f"""
+        Aşağıdaki sorular zaten hazırlandı. Bunları veya benzerlerini tekrar etme, yalnızca yeni sorular yaz:
+{listed}
+        """
+        if structured:
+            return f"""
+        Aşağıdaki metni analiz et ve bu metinden {num_questions} adet {difficulty} zorluk seviyesinde {question_type} soru oluştur.
+        Her soru için A, B, C, D şıklarını ve doğru şıkkın harfini ver.
+        Metin: "{text}"
+        {exclusions}"""
+        return f"""
         Aşağıdaki metni analiz et ve bu metinden {num_questions} adet {difficulty} zorluk seviyesinde {question_type} soru oluştur.
         Eğer soru tipi çoktan seçmeli ise 4 şık ve doğru cevabı belirt.
         Metin: "{text}"
@@ -86,22 +214,132 @@ class GeminiProvider(BaseAIProvider):
         C) Şık C
         D) Şık D
         **Doğru Cevap: B**
+        {exclusions}"""
+    
+    def _record_output(self, mode: str, requested: int, parsed: int, response):
+        """Mod istatistiklerini güncelle; token sayısı yanıtın usage_metadata alanından okunur"""
+        usage = getattr(response, "usage_metadata", None)
+        output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+        with self._stats_lock:
+            stats = self.output_stats[mode]
+            stats["requests"] += 1
+            stats["requested_questions"] += requested
+            stats["parsed_questions"] += min(parsed, requested)
+            stats["output_tokens"] += output_tokens
+    
+    def get_output_stats(self) -> Dict[str, Any]:
+        """JSON ve metin modunun ayrıştırma başarı oranı ve soru başına çıktı token'ı"""
+        with self._stats_lock:
+            report = {}
+            for mode, stats in self.output_stats.items():
+                report[mode] = dict(stats)
+                report[mode]["parse_success_rate"] = (
+                    round(stats["parsed_questions"] / stats["requested_questions"], 3) if stats["requested_questions"] else None
+                )
+                report[mode]["output_tokens_per_question"] = (
+                    round(stats["output_tokens"] / stats["parsed_questions"], 1) if stats["parsed_questions"] else None
+                )
+            report["active_mode"] = "json" if self.structured_output else "text"
+            report["prompt"] = dict(self.prompt_stats)
+            if self.prompt_stats["original_tokens"]:
+                report["prompt"]["reduction"] = round(1 - self.prompt_stats["tokens"] / self.prompt_stats["original_tokens"], 3)
+            return report
+    
+    def _request_questions(self, text: str, num_questions: int, question_type: str, difficulty: str,
+                           exclude: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
+        Tek istekle çoktan seçmeli soru üretip ayrıştırır.
+        JSON modunda yanıt şemayla üretilir ve derlenmiş doğrulayıcıdan geçer; şema desteklenmiyorsa
+        regex ile ayrıştırılan metin moduna geçilir.
+        """
+        from services.gemini_service import parse_quiz_text
         
+        if self.structured_output and self.json_config is not None:
+            from google.api_core import exceptions as google_exceptions
+            from services.structured_output import parse_quiz_json
+            
+            prompt = self._question_prompt(text, num_questions, question_type, difficulty, exclude, structured=True)
+            try:
+                response = self._generate(prompt, generation_config=self.json_config)
+            except (TypeError, ValueError, google_exceptions.InvalidArgument) as e:
+                if not _is_schema_unsupported(e):
+                    raise
+                print(f"⚠️ Yapısal çıktı desteklenmiyor, metin moduna geçiliyor: {e}")
+                self.structured_output = False
+            else:
+                questions, errors = parse_quiz_json(response.text)
+                if errors:
+                    print(f"⚠️ JSON doğrulama: {len(errors)} hata (ilk: {errors[0]})")
+                self._record_output("json", num_questions, len(questions), response)
+                return questions
+        
+        prompt = self._question_prompt(text, num_questions, question_type, difficulty, exclude)
+        response = self._generate(prompt)
+        questions = parse_quiz_text(response.text)
+        self._record_output("text", num_questions, len(questions), response)
+        return questions
+    
+    def _top_up_questions(self, text: str, questions: List[Dict[str, Any]], num_questions: int,
+                          question_type: str, difficulty: str) -> Dict[str, Any]:
+        """
+        Ayrıştırma bazı blokları düşürdüyse yalnızca eksik sorular için küçük ek istekler yapar.
+        Mevcut sorular istemde dışlanır; ek istek sayısı QUIZ_TOPUP_MAX_RETRIES ile sınırlıdır.
+        questions listesi yerinde genişletilir.
+        
+        Returns:
+            {"requested", "initial", "retries", "missing"} raporu
+        """
+        initial = len(questions)
+        seen = {q["question"].strip().lower() for q in questions}
+        retries = 0
+        while len(questions) < num_questions and retries < QUIZ_TOPUP_MAX_RETRIES:
+            missing = num_questions - len(questions)
+            retries += 1
+            print(f"🔄 {missing} soru eksik, tamamlama isteği gönderiliyor ({retries}/{QUIZ_TOPUP_MAX_RETRIES})")
+            try:
+                new_questions = self._request_questions(text, missing, question_type, difficulty,
+                                                        exclude=[q["question"] for q in questions])
+            except Exception as e:
+                # Tamamlama başarısızsa elde olan sorularla devam edilir
+                print(f"⚠️ Tamamlama isteği başarısız: {e}")
+                break
+            for question in new_questions:
+                key = question["question"].strip().lower()
+                if key in seen or len(questions) >= num_questions:
+                    continue
+                seen.add(key)
+                questions.append(question)
+        
+        return {
+            "requested": num_questions,
+            "initial": initial,
+            "retries": retries,
+            "missing": max(0, num_questions - len(questions))
+        }
+    
+    def generate_questions(self, text: str, num_questions: int, question_type: str, difficulty: str) -> Dict[str, Any]:
+        """Gemini ile soru üret; eksik ayrıştırılan sorular ek isteklerle tamamlanır"""
+        if not self.is_available():
+            raise Exception("Gemini kullanılamıyor")
+        
+        text = self._prepare_text(text, num_questions)
         try:
-            response = self.model.generate_content(prompt)
-            recommendations = get_recommendations(text)
+            # Tavsiyeler ve Bloom geri bildirimi generate_questions_from_gemini'de tüm provider'lar için bir kez eklenir
+            recommendations = []
             
             if question_type == "çoktan seçmeli":
-                parsed_questions = parse_quiz_text(response.text)
-                feedback = analyze_question_types(parsed_questions)
-                return {
+                parsed_questions = self._request_questions(text, num_questions, question_type, difficulty)
+                result = {
                     "questions": parsed_questions,
                     "recommendations": recommendations,
-                    "feedback": feedback,
+                    "feedback": None,
                     "provider": "gemini"
                 }
+                if len(parsed_questions) < num_questions:
+                    result["topup"] = self._top_up_questions(text, parsed_questions, num_questions, question_type, difficulty)
+                return result
             else:
+                response = self._generate(self._question_prompt(text, num_questions, question_type, difficulty))
                 return {
                     "questions": [{"raw_text": response.text}],
                     "recommendations": recommendations,
@@ -117,17 +355,31 @@ class GeminiProvider(BaseAIProvider):
         if not self.is_available():
             raise Exception("Gemini kullanılamıyor")
         
+        text = self._prepare_text(text)
         prompt = f"""
         Aşağıdaki metni analiz et ve ana fikirlerini içeren, yaklaşık 3-4 cümlelik kısa bir özet çıkar.
         Metin: "{text}"
         """
         
         try:
-            response = self.model.generate_content(prompt)
+            response = self._generate(prompt)
             return response.text
         except Exception as e:
             print(f"❌ Gemini API hatası: {e}")
             raise
+    
+    def extract_keywords(self, text: str, top_k: int) -> List[str]:
+        """Gemini'den virgülle ayrılmış anahtar kelimeler ister"""
+        if not self.is_available():
+            raise Exception("Gemini kullanılamıyor")
+        
+        prompt = f"""
+        Aşağıdaki metnin ana konusunu ve en önemli {top_k} anahtar kelimesini belirle. 
+        Cevabı sadece virgülle ayrılmış şekilde ver. Örnek: Biyoloji, Hücre Yapısı, Metabolizma
+        Metin: "{text}"
+        """
+        response = self._generate(prompt)
+        return [kw.strip() for kw in response.text.split(',') if kw.strip()][:top_k]
 
 
 class OpenAIProvider(BaseAIProvider):
@@ -173,9 +425,75 @@ class OpenAIProvider(BaseAIProvider):
         raise NotImplementedError("OpenAI provider henüz tam implement edilmedi")
 
 
+class ExtractiveSummaryProvider(BaseAIProvider):
+    """
+    Çevrimdışı Özet Provider - Gemini kullanılamadığında gerçek bir yedek katman
+    TF-IDF cümle vektörleri ve TextRank ile metinden en önemli cümleleri seçer.
+    Soru üretmez; soru istekleri zincirdeki bir sonraki provider'a geçer.
+    """
+    
+    is_local = True
+    
+    def __init__(self, num_sentences: int = 4):
+        self.num_sentences = num_sentences
+    
+    def is_available(self) -> bool:
+        """Yerel çalışır, her zaman kullanılabilir"""
+        return True
+    
+    def generate_questions(self, text: str, num_questions: int, question_type: str, difficulty: str) -> Dict[str, Any]:
+        """Bu provider soru üretmez"""
+        raise NotImplementedError("ExtractiveSummaryProvider soru üretmez")
+    
+    def generate_summary(self, text: str) -> str:
+        """Çıkarımsal (extractive) özet üret"""
+        from services.text_analysis import extractive_summary
+        print("⚠️ Çevrimdışı özetleme kullanılıyor - Gemini kullanılamıyor")
+        summary = extractive_summary(text, num_sentences=self.num_sentences)
+        if not summary:
+            raise Exception("Metinden özet çıkarılamadı")
+        return summary
+
+
+class ClozeQuestionProvider(BaseAIProvider):
+    """
+    Çevrimdışı Soru Provider - Kota/kesinti durumlarında sıfır maliyetli soru katmanı
+    Anahtar cümlelerdeki önemli terimleri (TF-IDF) boşluğa dönüştürür, çeldiricileri
+    aynı belgedeki benzer sıklıktaki terimlerden seçer. Özet üretmez.
+    """
+    
+    is_local = True
+    
+    def is_available(self) -> bool:
+        """Yerel çalışır, her zaman kullanılabilir"""
+        return True
+    
+    def generate_questions(self, text: str, num_questions: int, question_type: str, difficulty: str) -> Dict[str, Any]:
+        """Boşluk doldurma soruları üret"""
+        from services.text_analysis import generate_cloze_questions
+        print("⚠️ Çevrimdışı soru üretimi kullanılıyor - Gemini kullanılamıyor")
+        
+        questions = generate_cloze_questions(text, num_questions, question_type, difficulty)
+        if not questions:
+            raise Exception("Metinden boşluk doldurma sorusu üretilemedi")
+        
+        return {
+            "questions": questions,
+            "recommendations": [],
+            "feedback": None,  # Bloom geri bildirimi generate_questions_from_gemini'de eklenir
+            "provider": "cloze"
+        }
+    
+    def generate_summary(self, text: str) -> str:
+        """Bu provider özet üretmez"""
+        raise NotImplementedError("ClozeQuestionProvider özet üretmez")
+
+
 class MockProvider(BaseAIProvider):
     """Mock Provider - Offline Test İçin"""
     
+    is_local = True
+    
     def is_available(self) -> bool:
         """Mock her zaman kullanılabilir"""
         return True
@@ -211,22 +529,93 @@ class MockProvider(BaseAIProvider):
         return f"Mock Özet: Bu metin {len(text)} karakter uzunluğunda. Gerçek AI servisi şu anda kullanılamıyor."
 
 
+class ProviderStats:
+    """
+    Bir provider'ın kayan penceredeki gecikme ve hata istatistikleri.
+    Çağrılar thread havuzundan geldiği için kayıtlar kilitle korunur.
+    """
+    
+    def __init__(self, window_size: int = ROUTING_WINDOW_SIZE, window_seconds: float = ROUTING_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self._samples: deque = deque(maxlen=window_size)  # (zaman, gecikme_ms, başarılı)
+        self._lock = threading.Lock()
+    
+    def record(self, latency_ms: float, ok: bool):
+        """Bir çağrının sonucunu kaydet"""
+        with self._lock:
+            self._samples.append((time.monotonic(), latency_ms, ok))
+    
+    def reset(self):
+        """Pencereyi temizle (toparlanma sonrası eski kötü örnekler unutulur)"""
+        with self._lock:
+            self._samples.clear()
+    
+    def _recent(self) -> List[Tuple[float, float, bool]]:
+        cutoff = time.monotonic() - self.window_seconds
+        with self._lock:
+            return [sample for sample in self._samples if sample[0] >= cutoff]
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Örnek sayısı, hata oranı ve p50/p95/p99 gecikme (ms)"""
+        samples = self._recent()
+        latencies = sorted(latency for _, latency, _ in samples)
+        
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            # En yakın sıra (nearest-rank) yöntemi
+            rank = max(0, min(len(latencies) - 1, int(round(p / 100.0 * len(latencies) + 0.5)) - 1))
+            return round(latencies[rank], 1)
+        
+        errors = sum(1 for _, _, ok in samples if not ok)
+        return {
+            "samples": len(samples),
+            "error_rate": round(errors / len(samples), 3) if samples else 0.0,
+            "p50_ms": percentile(50),
+            "p95_ms": percentile(95),
+            "p99_ms": percentile(99)
+        }
+    
+    def is_healthy(self) -> bool:
+        """SLO içinde mi? Yeterli örnek yoksa sağlıklı kabul edilir."""
+        stats = self.snapshot()
+        if stats["samples"] < ROUTING_MIN_SAMPLES:
+            return True
+        return stats["p95_ms"] <= PROVIDER_SLO_P95_MS and stats["error_rate"] <= PROVIDER_MAX_ERROR_RATE
+
+
+def get_last_degraded_reason() -> Optional[str]:
+    """Bu bağlamdaki son AI çağrısı degrade yoldan geldiyse nedenini döndürür"""
+    return _last_degraded_reason.get()
+
+
 class AIProviderManager:
-    """AI Provider Yöneticisi - Fallback Mekanizması"""
+    """AI Provider Yöneticisi - Fallback Mekanizması ve Gecikme Tabanlı Yönlendirme"""
     
     def __init__(self):
         self.providers: List[BaseAIProvider] = []
         self.current_provider: Optional[BaseAIProvider] = None
+        self.stats: Dict[str, ProviderStats] = {}
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._switched_at: Optional[float] = None
+        self._degraded_since: Optional[float] = None
+        self._probe_in_flight = False
         self._initialize_providers()
     
     def _initialize_providers(self):
         """Tüm provider'ları başlat ve öncelik sırasına göre ekle"""
-        # Öncelik sırası: Gemini -> Mock
-        # OpenAI şu anda implement edilmedi, sadece Gemini ve Mock kullanıyoruz
+        # Öncelik sırası: Gemini -> Çevrimdışı Özet -> Çevrimdışı Soru -> Mock
+        # OpenAI şu anda implement edilmedi
+        # CASSETTE_MODE=record/replay: Gemini ham yanıtları (generate_content) kasete yazılır / kasetten oynatılır
+        from services.cassette import wrap_with_cassette
         self.providers = [
-            GeminiProvider(),
+            wrap_with_cassette(GeminiProvider()),
+            ExtractiveSummaryProvider(),  # Yalnızca özet
+            ClozeQuestionProvider(),  # Yalnızca soru
             MockProvider()  # Son çare - her zaman çalışır
         ]
+        self.stats = {provider.__class__.__name__: ProviderStats() for provider in self.providers}
         
         # İlk kullanılabilir provider'ı seç
         for provider in self.providers:
@@ -255,49 +644,235 @@ class AIProviderManager:
             if next_provider.is_available():
                 print(f"🔄 Provider değiştiriliyor: {self.current_provider.__class__.__name__} -> {next_provider.__class__.__name__}")
                 self.current_provider = next_provider
+                self._switched_at = time.monotonic()
                 return True
         
         return False
     
-    def generate_questions_with_fallback(self, text: str, num_questions: int, question_type: str, difficulty: str) -> Dict[str, Any]:
-        """Fallback mekanizması ile soru üret"""
-        if not self.current_provider:
-            raise Exception("Hiçbir AI provider kullanılamıyor")
-        
-        # İlk provider ile dene
-        try:
-            return self.current_provider.generate_questions(text, num_questions, question_type, difficulty)
-        except Exception as e:
-            print(f"❌ {self.current_provider.__class__.__name__} hatası: {e}")
+    def _primary_provider(self) -> Optional[BaseAIProvider]:
+        """Zincirdeki ilk kullanılabilir uzak (yerel olmayan) provider"""
+        for provider in self.providers:
+            if not provider.is_local and provider.is_available():
+                return provider
+        return None
+    
+    def _is_healthy(self, provider: BaseAIProvider) -> bool:
+        return self.stats[provider.__class__.__name__].is_healthy()
+    
+    def _maybe_recover(self, now: float):
+        """Failover'dan sonra bekleme süresi dolduysa en öncelikli provider'a geri dön"""
+        if self._switched_at is None or now - self._switched_at < DEGRADE_COOLDOWN_SECONDS:
+            return
+        for provider in self.providers:
+            if provider.is_available():
+                if provider is not self.current_provider:
+                    print(f"🔄 Provider yeniden deneniyor: {self.current_provider.__class__.__name__} -> {provider.__class__.__name__}")
+                    self.current_provider = provider
+                break
+        self._switched_at = None
+    
+    def _begin_request(self) -> Tuple[Optional[str], bool]:
+        """
+        İsteği sayar ve yönlendirme modunu belirler.
+        Returns: (degrade nedeni veya None, bu istek birincil provider için deneme mi)
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._inflight += 1
+            self._maybe_recover(now)
             
-            # Fallback: Bir sonraki provider'a geç
-            if self.switch_provider():
-                try:
-                    return self.current_provider.generate_questions(text, num_questions, question_type, difficulty)
-                except Exception as e2:
-                    print(f"❌ Fallback provider da hatası: {e2}")
-                    raise Exception(f"Tüm provider'lar başarısız. Son hata: {e2}")
+            primary = self._primary_provider()
+            if primary is None:
+                return None, False
+            
+            if self._degraded_since is None:
+                if self._is_healthy(primary):
+                    return None, False
+                self._degraded_since = now
+                print(f"⚠️ Degrade moduna geçildi: {primary.__class__.__name__} SLO dışında {self.stats[primary.__class__.__name__].snapshot()}")
+                return "slo", False
+            
+            # Bekleme süresi dolunca tek bir istek birincil provider'ı dener
+            if not self._probe_in_flight and now - self._degraded_since >= DEGRADE_COOLDOWN_SECONDS:
+                self._probe_in_flight = True
+                return None, True
+            return "slo", False
+    
+    def _end_request(self, probe: bool, probe_ok: bool):
+        """İstek sayacını düşürür; deneme isteğinin sonucuna göre degrade modundan çıkar"""
+        with self._lock:
+            self._inflight -= 1
+            if not probe:
+                return
+            self._probe_in_flight = False
+            primary = self._primary_provider()
+            if probe_ok and primary is not None:
+                # Eski kötü örnekler degrade moduna geri döndürmesin
+                self.stats[primary.__class__.__name__].reset()
+                self._degraded_since = None
+                print(f"✅ Degrade modundan çıkıldı: {primary.__class__.__name__} yeniden SLO içinde")
             else:
-                raise Exception(f"Fallback mümkün değil. Hata: {e}")
+                self._degraded_since = time.monotonic()
     
-    def generate_summary_with_fallback(self, text: str) -> str:
-        """Fallback mekanizması ile özet üret"""
-        if not self.current_provider:
+    @staticmethod
+    def _is_overloaded(scheduler) -> bool:
+        """Bu isteğin sınıfında zamanlayıcı kuyruğu DEGRADE_QUEUE_DEPTH'e ulaştı mı"""
+        return scheduler is not None and DEGRADE_QUEUE_DEPTH > 0 and \
+            scheduler.queue_depth(get_request_class()) >= DEGRADE_QUEUE_DEPTH
+    
+    def is_degraded(self) -> Optional[str]:
+        """Şu an degrade modundaysa nedenini ("overload" / "slo") döndürür"""
+        if self._is_overloaded(get_provider_scheduler()):
+            return "overload"
+        return "slo" if self._degraded_since is not None else None
+    
+    def get_routing_stats(self) -> Dict[str, Any]:
+        """Sağlayıcı başına gecikme/hata istatistikleri, degrade ve zamanlayıcı durumu"""
+        scheduler = get_provider_scheduler()
+        return {
+            "degraded": self.is_degraded(),
+            "inflight": self._inflight,
+            "providers": {name: stats.snapshot() for name, stats in self.stats.items()},
+            "output_modes": {
+                provider.__class__.__name__: provider.get_output_stats()
+                for provider in self.providers if hasattr(provider, "get_output_stats")
+            },
+            "cassettes": [
+                provider.model.get_cassette_stats()
+                for provider in self.providers if hasattr(getattr(provider, "model", None), "get_cassette_stats")
+            ],
+            "scheduler": scheduler.get_stats() if scheduler is not None else None
+        }
+    
+    def _call_with_fallback(self, method: str, *args, local_only: bool = False, start: Optional[BaseAIProvider] = None, probe: bool = False):
+        """
+        Mevcut provider'dan başlayarak zinciri sırayla dener.
+        SLO dışındaki provider'lar sağlıklı olanlardan sonraya bırakılır; local_only ile
+        (degrade modu) yalnızca yerel provider'lar kullanılır; probe ile sıralama değiştirilmez.
+        Hata veren mevcut provider kalıcı olarak bir sonrakine devredilir (failover);
+        ilgili yeteneği desteklemeyen provider'lar (NotImplementedError) atlanır.
+        İstek iptal edilince zincir durur (RequestCancelledError); o sırada biten çağrının süresi boşa giden
+        provider süresi olarak sayılır, hata sayılmaz ve failover tetiklemez.
+        Returns: (sonuç, yanıt veren provider)
+        """
+        start = start or self.current_provider
+        if not start:
             raise Exception("Hiçbir AI provider kullanılamıyor")
         
+        candidates = self.providers[self.providers.index(start):]
+        if local_only:
+            candidates = [p for p in candidates if p.is_local]
+        elif not probe:
+            # sorted kararlıdır: öncelik sırası sağlık grupları içinde korunur
+            candidates = sorted(candidates, key=lambda p: not self._is_healthy(p))
+        
+        last_error = None
+        for provider in candidates:
+            check_cancelled()
+            if not provider.is_available():
+                continue
+            name = provider.__class__.__name__
+            stats = self.stats[name]
+            started = time.perf_counter()
+            try:
+                result = getattr(provider, method)(*args)
+                elapsed = time.perf_counter() - started
+                stats.record(elapsed * 1000, True)
+                PROVIDER_LATENCY.observe(elapsed, name, method)
+                PROVIDER_CALLS.inc(name, method, "ok")
+                record_provider_call(name, method, elapsed * 1000, "ok")
+                if provider.is_local:
+                    # Yerel provider'ların kullanım bilgisi yok; metin uzunluğundan tahmin edilir
+                    record_usage(name, estimate_tokens(args[0] if args else None), estimate_tokens(result))
+                # Çağrı sürerken istek iptal edildiyse sonucu okuyacak kimse yok
+                check_cancelled()
+                return result, provider
+            except NotImplementedError:
+                PROVIDER_CALLS.inc(name, method, "unsupported")
+                continue
+            except Exception as e:
+                elapsed = time.perf_counter() - started
+                token = get_cancel_token()
+                if token is not None and token.cancelled:
+                    PROVIDER_WASTED.inc(name, method, token.reason, amount=elapsed)
+                    token.check()
+                stats.record(elapsed * 1000, False)
+                PROVIDER_LATENCY.observe(elapsed, name, method)
+                PROVIDER_CALLS.inc(name, method, "error")
+                record_provider_call(name, method, elapsed * 1000, "error")
+                print(f"❌ {name} hatası: {e}")
+                last_error = e
+                if provider is self.current_provider:
+                    self.switch_provider()
+        
+        if last_error is None:
+            raise Exception(f"Fallback mümkün değil: hiçbir provider '{method}' desteklemiyor")
+        raise Exception(f"Tüm provider'lar başarısız. Son hata: {last_error}")
+    
+    def _route(self, method: str, *args, degraded_args: Optional[tuple] = None):
+        """
+        Degrade durumuna göre çağrıyı yönlendirir.
+        degraded_args verilirse degrade modunda bu argümanlar kullanılır (örn. daha az soru).
+        Kullanıcının token bütçesi provider'a gönderilmeden önce kontrol edilir (BudgetExceededError);
+        ardından çağrı zamanlayıcıdan slot bekler (dolu kuyrukta SchedulerOverloadError).
+        Zamanlayıcı kuyruğu DEGRADE_QUEUE_DEPTH'e ulaşmışsa (aşırı yük) çağrı beklemeden ve atılmadan
+        yerel provider'larla yanıtlanır.
+        Returns: (sonuç, degrade nedeni veya None)
+        """
+        check_budget(estimate_tokens(args[0] if args else None))
+        scheduler = get_provider_scheduler()
+        if self._is_overloaded(scheduler):
+            if degraded_args is not None:
+                args = degraded_args
+            result, _ = self._call_with_fallback(method, *args, local_only=True)
+            _last_degraded_reason.set("overload")
+            return result, "overload"
+        with scheduler.slot() if scheduler is not None else nullcontext():
+            reason, probe = self._begin_request()
+            if reason and degraded_args is not None:
+                args = degraded_args
+            probe_ok = False
+            try:
+                if probe:
+                    primary = self._primary_provider()
+                    started = time.perf_counter()
+                    result, provider = self._call_with_fallback(method, *args, start=primary, probe=True)
+                    # Pencerede hâlâ eski kötü örnekler var; karar yalnızca bu denemeye göre verilir
+                    probe_ok = provider is primary and (time.perf_counter() - started) * 1000 <= PROVIDER_SLO_P95_MS
+                else:
+                    result, _ = self._call_with_fallback(method, *args, local_only=reason is not None)
+            finally:
+                self._end_request(probe, probe_ok)
+        _last_degraded_reason.set(reason)
+        return result, reason
+    
+    def generate_questions_with_fallback(self, text: str, num_questions: int, question_type: str, difficulty: str) -> Dict[str, Any]:
+        """Fallback mekanizması ile soru üret; degrade modunda daha az soru üretilir"""
+        result, reason = self._route(
+            "generate_questions", text, num_questions, question_type, difficulty,
+            degraded_args=(text, min(num_questions, DEGRADED_MAX_QUESTIONS), question_type, difficulty)
+        )
+        if reason:
+            result["degraded"] = True
+            result["degraded_reason"] = reason
+        return result
+    
+    def generate_summary_with_fallback(self, text: str) -> str:
+        """Fallback mekanizması ile özet üret (degrade durumu get_last_degraded_reason ile okunur)"""
+        result, _ = self._route("generate_summary", text)
+        return result
+    
+    def extract_keywords_with_fallback(self, text: str, top_k: int) -> List[str]:
+        """
+        Bütçe, zamanlayıcı ve iptal denetiminden geçerek anahtar kelime çıkarır.
+        Yardımcı bir çağrı olduğu için isteğin ana yanıtının degrade nedenini değiştirmez.
+        """
+        reason = _last_degraded_reason.get()
         try:
-            return self.current_provider.generate_summary(text)
-        except Exception as e:
-            print(f"❌ {self.current_provider.__class__.__name__} hatası: {e}")
-            
-            if self.switch_provider():
-                try:
-                    return self.current_provider.generate_summary(text)
-                except Exception as e2:
-                    print(f"❌ Fallback provider da hatası: {e2}")
-                    raise Exception(f"Tüm provider'lar başarısız. Son hata: {e2}")
-            else:
-                raise Exception(f"Fallback mümkün değil. Hata: {e}")
+            result, _ = self._route("extract_keywords", text, top_k)
+        finally:
+            _last_degraded_reason.set(reason)
+        return result
 
 
 # Global AI Provider Manager instance
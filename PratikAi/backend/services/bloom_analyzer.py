@@ -0,0 +1,260 @@
+"""
+Bloom Taksonomisi Analizcisi - Soruları bilişsel düzeylere göre sınıflandırır
+Altı düzey için Türkçe (ek alabilen kökler) ve İngilizce ipuçları önek ağacı (trie) biçiminde
+tek bir önceden derlenmiş regex'te birleştirilir; bir soru grubu tek geçişte taranır.
+
+Öncelik: açık bir yönerge (açıklayınız, karşılaştırın, "Design ...") varsa en yüksek yönerge düzeyi;
+yoksa soru kalıbındaki hatırlama ipucu (hangi, nedir, kaç); o da yoksa diğer ipuçlarının en yükseği.
+Uygulama ve üstü düzeylerin tek kelimelik kökleri gündelik fiil/adlardır (üretir, oluşturduğu,
+sonucunda); bunlar yalnızca yönerge biçiminde sayılır.
+"""
+
+import bisect
+import re
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
+
+from services.text_analysis import turkish_lower
+
+# Düzeyler düşükten yükseğe; aynı öncelikteki ipuçlarından en yüksek düzey seçilir
+BLOOM_LEVELS = ("hatirlama", "anlama", "uygulama", "analiz", "degerlendirme", "yaratma")
+
+BLOOM_LEVEL_NAMES = {
+    "hatirlama": "Hatırlama",
+    "anlama": "Anlama",
+    "uygulama": "Uygulama",
+    "analiz": "Analiz",
+    "degerlendirme": "Değerlendirme",
+    "yaratma": "Yaratma",
+}
+
+# "~" ile biten kökler ek alabilir (tanımla~ -> tanımlayınız, tanımlanır); diğerleri tam kelimedir.
+# Boşluklar herhangi bir boşluk dizisiyle eşleşir.
+_BLOOM_CUES = {
+    "hatirlama": [
+        "nedir", "nelerdir", "kimdir", "kimlerdir", "nerede~", "ne zaman", "hangi~", "kaç",
+        "tanımla~", "listele~", "sırala~", "adlandır~", "hatırla~", "ezberle~", "belirtiniz",
+        "adı ne~", "what is", "what are", "who", "when", "where", "which", "define~", "list~",
+        "name", "recall~", "identify~",
+    ],
+    "anlama": [
+        "neden", "niçin", "nasıl", "açıkla~", "yorumla~", "özetle~", "örnek ver~", "örneklendir~",
+        "ifade et~", "anlatı~", "anlat~", "sınıflandır~", "tahmin et~", "ne anlama gel~", "anlamı~",
+        "why", "how", "explain~", "describe~", "summari~", "interpret~", "classify~",
+    ],
+    "uygulama": [
+        "uygula~", "hesapla~", "çözü~", "çöz~", "kullanarak", "kullan~", "göster~", "bulunuz",
+        "bulun", "dönüştür~", "gerçekleştir~", "apply~", "calculat~", "solve~", "use~",
+        "comput~", "demonstrat~",
+    ],
+    "analiz": [
+        "karşılaştır~", "ayırt et~", "incele~", "analiz et~", "çözümle~", "ilişki~", "farkı~",
+        "farkla~", "benzerli~", "neden sonuç", "sonucu~", "etkile~", "ayrıştır~",
+        "compar~", "contrast~", "analy~", "distinguish~", "differ~", "relationship~",
+    ],
+    "degerlendirme": [
+        "değerlendir~", "eleştir~", "savun~", "yargıla~", "tartış~", "kanıtla~", "gerekçelendir~",
+        "hangisi daha", "en uygun~", "en doğru~", "sizce", "katılıyor mu~", "evaluat~", "justif~",
+        "assess~", "critiq~", "criticiz~", "argu~", "defend~",
+    ],
+    "yaratma": [
+        "tasarla~", "oluştur~", "geliştir~", "öner~", "planla~", "üret~", "yazınız", "yazın",
+        "kurgula~", "formüle et~", "icat et~", "design~", "creat~", "develop~", "propos~",
+        "compos~", "construct~", "formulat~",
+    ],
+}
+
+# Soru kalıbı olan hatırlama ipuçları ("Aşağıdakilerden hangisi ...", "... nedir?")
+_INTERROGATIVE_CUES = {
+    "nedir", "nelerdir", "kimdir", "kimlerdir", "nerede", "ne zaman", "hangi", "kaç",
+    "what is", "what are", "who", "when", "where", "which",
+}
+# Kendisi yönerge olan tam kelimeler
+_INSTRUCTION_WORDS = {"belirtiniz", "bulunuz", "bulun", "yazınız", "yazın"}
+# Bu düzeyden itibaren tek kelimelik kökler yalnızca yönerge biçiminde sayılır
+_RESTRICTED_FROM = "uygulama"
+# Yönerge ekleri: -ınız/-iniz/-unuz/-ünüz (kelime sonu) ve kökten hemen sonra gelen -(y)ın/-in/-un/-ün
+_PLURAL_IMPERATIVE_RE = re.compile(r"[ıiuü]n[ıiuü]z$")
+_SHORT_IMPERATIVE_RE = re.compile(r"y?[ıiuü]n")
+# Yalın kök yönerge sayılır ("Karşılaştır:", "Design an ...", "... bir deney tasarla.") yalnızca cümle/yan cümle başında veya sonunda
+_CLAUSE_MARKS = ".!?:;,\n"
+
+# İpucu türleri
+_INTERROGATIVE, _INSTRUCTION, _BARE, _RESTRICTED, _PLAIN = range(5)
+
+# Grup öğeleri birbirine bu karakterle eklenir; ne kelime ne boşluk olduğu için eşleşmeler taşmaz
+_SEPARATOR = "\x00"
+_SPACE_RE = re.compile(r"\s+")
+
+
+def _trie_to_regex(node: Dict[str, Any]) -> str:
+    """
+    Önek ağacını regex'e çevirir. Ortak önekler paylaşıldığı için her konumda
+    yüzlerce alternatif yerine yalnızca bir karakter dalı denenir.
+    Uzun eşleşme için önce çocuklar, sonra bitiş (terminal) denenir.
+    """
+    branches = []
+    for char in sorted(k for k in node if k not in ("stem", "exact")):
+        unit = r"\s+" if char == " " else re.escape(char)
+        branches.append(unit + _trie_to_regex(node[char]))
+    if "stem" in node:
+        branches.append(r"\w*")
+    elif "exact" in node:
+        branches.append(r"(?!\w)")
+    if len(branches) == 1:
+        return branches[0]
+    return "(?:" + "|".join(branches) + ")"
+
+
+def _compile_bloom_pattern():
+    """
+    Tüm düzeylerin ipuçlarını tek bir önek ağacı regex'inde birleştirir.
+    Returns: (derlenmiş desen, tam kelime -> düzey, kök -> düzey)
+    """
+    trie: Dict[str, Any] = {}
+    exact_levels: Dict[str, str] = {}
+    stem_levels: Dict[str, str] = {}
+    for level in BLOOM_LEVELS:  # Aynı ipucu iki düzeyde varsa yüksek olan kazanır
+        for cue in _BLOOM_CUES[level]:
+            is_stem = cue.endswith("~")
+            text = cue.rstrip("~")
+            node = trie
+            for char in text:
+                node = node.setdefault(char, {})
+            node["stem" if is_stem else "exact"] = True
+            (stem_levels if is_stem else exact_levels)[text] = level
+    pattern = re.compile(r"(?<!\w)" + _trie_to_regex(trie), re.UNICODE)
+    return pattern, exact_levels, stem_levels
+
+
+_BLOOM_PATTERN, _EXACT_LEVELS, _STEM_LEVELS = _compile_bloom_pattern()
+_LEVEL_RANK = {level: rank for rank, level in enumerate(BLOOM_LEVELS)}
+
+
+@lru_cache(maxsize=8192)
+def _cue_of(matched: str) -> Tuple[Optional[str], int]:
+    """
+    Eşleşen metnin düzeyi ve ipucu türü: önce tam kelime, sonra en uzun kök önekine bakılır.
+    Eşleşen kelime biçimleri (hesaplayınız, açıklayınız...) çok tekrar ettiği için önbelleklenir.
+    """
+    matched = _SPACE_RE.sub(" ", matched)
+    level = _EXACT_LEVELS.get(matched)
+    if level is not None:
+        if matched in _INTERROGATIVE_CUES:
+            return level, _INTERROGATIVE
+        return level, _INSTRUCTION if matched in _INSTRUCTION_WORDS else _PLAIN
+    for end in range(len(matched), 0, -1):
+        stem = matched[:end]
+        level = _STEM_LEVELS.get(stem)
+        if level is None:
+            continue
+        if stem in _INTERROGATIVE_CUES:
+            return level, _INTERROGATIVE
+        suffix = matched[end:]
+        if _PLURAL_IMPERATIVE_RE.search(matched) or _SHORT_IMPERATIVE_RE.fullmatch(suffix):
+            return level, _INSTRUCTION
+        if " " in stem:
+            # Çok kelimelik kalıplar (en uygun, neden sonuç, ayırt et) gündelik kullanımda nadirdir
+            return level, _PLAIN
+        if not suffix:
+            return level, _BARE
+        return level, _RESTRICTED if _LEVEL_RANK[level] >= _LEVEL_RANK[_RESTRICTED_FROM] else _PLAIN
+    return None, _PLAIN
+
+
+def _at_clause_edge(text: str, start: int, end: int) -> bool:
+    """Eşleşme cümle/yan cümle başında veya sonunda mı (öğe ayırıcısı da sınır sayılır)"""
+    i = start - 1
+    while i >= 0 and text[i] in " \t":
+        i -= 1
+    if i < 0 or text[i] in _CLAUSE_MARKS or text[i] == _SEPARATOR:
+        return True
+    j = end
+    while j < len(text) and text[j] in " \t":
+        j += 1
+    return j >= len(text) or text[j] in _CLAUSE_MARKS or text[j] == _SEPARATOR
+
+
+def _higher(current: Optional[str], level: str) -> str:
+    return level if current is None or _LEVEL_RANK[level] > _LEVEL_RANK[current] else current
+
+
+def _question_text(question: Any) -> str:
+    """Soru sözlüğü ({"question": ...}) veya düz metin kabul edilir."""
+    if isinstance(question, dict):
+        return question.get("question") or question.get("raw_text") or ""
+    return str(question or "")
+
+
+def classify_questions(questions: List[Any]) -> List[Optional[str]]:
+    """
+    Soruları tek geçişte sınıflandırır.
+
+    Returns:
+        Her soru için Bloom düzeyi (BLOOM_LEVELS öğesi) veya None
+    """
+    texts = [turkish_lower(_question_text(q)).replace(_SEPARATOR, " ") for q in questions]
+    if not texts:
+        return []
+
+    # Başlangıç konumları; eşleşmenin hangi soruya ait olduğu ikili aramayla bulunur
+    starts = []
+    offset = 0
+    for text in texts:
+        starts.append(offset)
+        offset += len(text) + 1
+    combined = _SEPARATOR.join(texts)
+
+    instructions: List[Optional[str]] = [None] * len(texts)
+    interrogative = [False] * len(texts)
+    others: List[Optional[str]] = [None] * len(texts)
+    for match in _BLOOM_PATTERN.finditer(combined):
+        level, kind = _cue_of(match.group(0))
+        if level is None or kind == _RESTRICTED:
+            continue
+        index = bisect.bisect_right(starts, match.start()) - 1
+        if kind == _BARE:
+            if _at_clause_edge(combined, match.start(), match.end()):
+                kind = _INSTRUCTION
+            elif _LEVEL_RANK[level] >= _LEVEL_RANK[_RESTRICTED_FROM]:
+                continue
+        if kind == _INTERROGATIVE:
+            interrogative[index] = True
+        elif kind == _INSTRUCTION:
+            instructions[index] = _higher(instructions[index], level)
+        else:
+            others[index] = _higher(others[index], level)
+
+    return [
+        instruction or ("hatirlama" if asks else other)
+        for instruction, asks, other in zip(instructions, interrogative, others)
+    ]
+
+
+def bloom_distribution(questions: List[Any]) -> Dict[str, Any]:
+    """
+    Soru grubunun Bloom düzeyi dağılımı.
+
+    Returns:
+        {"total", "counts": {düzey: adet}, "percentages": {düzey: yüzde}, "unclassified"}
+    """
+    return distribution_from_levels(classify_questions(questions))
+
+
+def distribution_from_levels(levels: List[Optional[str]]) -> Dict[str, Any]:
+    """classify_questions çıktısından dağılım; sorular zaten sınıflandırıldıysa yeniden taranmaz."""
+    counts = {level: 0 for level in BLOOM_LEVELS}
+    unclassified = 0
+    for level in levels:
+        if level is None:
+            unclassified += 1
+        else:
+            counts[level] += 1
+
+    total = len(levels)
+    return {
+        "total": total,
+        "counts": counts,
+        "percentages": {level: round(count * 100.0 / total, 1) if total else 0.0 for level, count in counts.items()},
+        "unclassified": unclassified,
+    }
@@ -0,0 +1,205 @@
+"""
+Kaset (Cassette) - Gemini yanıtlarını kaydedip yeniden oynatma
+Karşılaştırmalı performans ölçümlerinde her çalıştırmanın aynı model çıktısını alması için
+GeminiProvider'ın modeli (generate_content) sarmalanır:
+  - record: çağrılar gerçek modele gider; (istem -> yanıt metni ve token kullanımı, gecikme) kasete yazılır
+  - replay: yanıtlar kasetten döner, gerçek model hiç çağrılmaz (kota harcanmaz)
+Kayıt ham yanıt düzeyinde olduğu için replay'de de ayrıştırma (parse_quiz_text / parse_quiz_json),
+eksik soru tamamlama ve kullanım muhasebesi gerçek çalıştırmadaki gibi işler.
+Anahtar, istem metni + üretim ayarlarının (generation_config) SHA-256 özetidir (ilk 16 bayt);
+değerler zlib ile sıkıştırılmış JSON olarak tek bir SQLite dosyasında tutulur.
+
+Replay gecikmesi CASSETTE_LATENCY ile seçilir: "recorded" (kayıttaki süre), sabit ms ("250") veya "0".
+"""
+
+import dataclasses
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+from typing import Dict, Any, Optional, Tuple
+
+from services.usage_accounting import usage_from_response
+
+# off | record | replay
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off").lower()
+CASSETTE_PATH = os.getenv(
+    "CASSETTE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "cassette.db")
+)
+CASSETTE_LATENCY = os.getenv("CASSETTE_LATENCY", "recorded").lower()
+CASSETTE_MODES = ("off", "record", "replay")
+
+
+class CassetteMissError(Exception):
+    """Replay modunda kasette bulunmayan istek"""
+
+
+def cassette_key(prompt: str, kwargs: Dict[str, Any]) -> bytes:
+    """
+    İstem ve generate_content ayarlarından 16 baytlık anahtar.
+    request_options (isteğin kalan süresinden gelen zaman aşımı) yanıtı değiştirmediği için anahtara girmez.
+    """
+    settings = {
+        name: dataclasses.asdict(value) if dataclasses.is_dataclass(value) else value
+        for name, value in kwargs.items() if name != "request_options"
+    }
+    payload = json.dumps([prompt, settings], ensure_ascii=False, sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode("utf-8")).digest()[:16]
+
+
+class Cassette:
+    """
+    Kaset dosyası. Kayıtlar açılışta belleğe yüklenir (değerler sıkıştırılmış kalır);
+    yeni kayıtlar anında diske yazılır.
+    """
+
+    def __init__(self, path: str = CASSETTE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS generations (
+                key BLOB PRIMARY KEY,
+                latency_ms REAL NOT NULL,
+                value BLOB NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self._entries: Dict[bytes, Tuple[float, bytes]] = {
+            key: (latency_ms, value)
+            for key, latency_ms, value in self._conn.execute("SELECT key, latency_ms, value FROM generations")
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: bytes) -> Optional[Tuple[Any, float]]:
+        """(yanıt, kayıttaki gecikme ms) veya None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        latency_ms, value = entry
+        return json.loads(zlib.decompress(value)), latency_ms
+
+    def put(self, key: bytes, result: Any, latency_ms: float):
+        value = zlib.compress(json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+        with self._lock:
+            self._entries[key] = (latency_ms, value)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO generations (key, latency_ms, value) VALUES (?, ?, ?)",
+                (key, latency_ms, value)
+            )
+            self._conn.commit()
+
+    def size_bytes(self) -> int:
+        """Sıkıştırılmış değerlerin toplam boyutu"""
+        return sum(len(value) for _, value in self._entries.values())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _replay_delay(recorded_ms: float, latency: str) -> float:
+    """Replay'de beklenecek süre (sn)"""
+    if latency == "recorded":
+        return recorded_ms / 1000.0
+    try:
+        return max(0.0, float(latency)) / 1000.0
+    except ValueError:
+        return 0.0
+
+
+class CassetteResponse:
+    """Kasetten dönen yanıt; GeminiProvider'ın okuduğu text ve usage_metadata alanlarını taşır"""
+
+    def __init__(self, text: str, prompt_tokens: int, output_tokens: int):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=output_tokens)
+
+
+class CassetteModel:
+    """
+    Gemini modelini (generate_content) kayıt/oynatma için sarmalar.
+    Bilinmeyen öznitelikler sarmalanan modele iletilir.
+    Replay'de kasette olmayan istem CassetteMissError verir (sessizce gerçek modele gidilmez);
+    replay için gerçek model (API anahtarı) gerekmez.
+    """
+
+    def __init__(self, inner, mode: str = CASSETTE_MODE, cassette: Optional[Cassette] = None,
+                 latency: str = CASSETTE_LATENCY, name: str = "GeminiProvider"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Geçersiz kaset modu: {mode}")
+        self.inner = inner
+        self.mode = mode
+        self.cassette = cassette or Cassette()
+        self.latency = latency
+        self.name = name
+        self.hits = self.misses = self.recorded = 0
+
+    def __getattr__(self, name):
+        if name == "inner" or self.inner is None:
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    def generate_content(self, prompt: str, **kwargs):
+        key = cassette_key(prompt, kwargs)
+        if self.mode == "replay":
+            entry = self.cassette.get(key)
+            if entry is None:
+                self.misses += 1
+                raise CassetteMissError(f"Kasette kayıt yok: {self.name} ({key.hex()})")
+            recorded, recorded_ms = entry
+            self.hits += 1
+            delay = _replay_delay(recorded_ms, self.latency)
+            if delay:
+                time.sleep(delay)
+            return CassetteResponse(recorded["text"], *recorded["usage"])
+
+        started = time.perf_counter()
+        response = self.inner.generate_content(prompt, **kwargs)
+        latency_ms = round((time.perf_counter() - started) * 1000, 3)
+        # Engellenen yanıtlarda text hata verir; bu çağrılar kaydedilmez
+        self.cassette.put(key, {"text": response.text, "usage": list(usage_from_response(response))}, latency_ms)
+        self.recorded += 1
+        return response
+
+    def get_cassette_stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "provider": self.name,
+            "entries": len(self.cassette),
+            "compressed_bytes": self.cassette.size_bytes(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "recorded": self.recorded,
+        }
+
+
+def wrap_with_cassette(provider, mode: str = CASSETTE_MODE):
+    """
+    CASSETTE_MODE off değilse GeminiProvider'ın modelini kasetle sarmalar.
+    Replay'de API anahtarı olmasa da sağlayıcı kullanılabilir olur (JSON şeması ayarı yerel oluşturulur).
+    """
+    if mode == "off":
+        return provider
+    if mode not in CASSETTE_MODES:
+        print(f"⚠️ Geçersiz CASSETTE_MODE '{mode}', kaset kapalı")
+        return provider
+    if mode == "record" and provider.model is None:
+        print("⚠️ Kaset kaydı için Gemini kullanılamıyor, kaset kapalı")
+        return provider
+    if mode == "replay" and provider.json_config is None:
+        from services.ai_provider import quiz_json_config
+        provider.json_config = quiz_json_config()
+    provider.model = CassetteModel(provider.model, mode, name=provider.__class__.__name__)
+    print(f"✅ Kaset {mode} modunda: {provider.__class__.__name__} ({provider.model.cassette.path}, {len(provider.model.cassette)} kayıt)")
+    return provider
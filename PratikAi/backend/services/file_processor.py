@@ -1,7 +1,19 @@
 import fitz
 import os
-import shutil
-from fastapi import UploadFile
+import asyncio
+import contextvars
+import functools
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+from fastapi import UploadFile, HTTPException
+from fastapi.responses import JSONResponse
+from services.image_preprocessor import preprocess_image, pad_to_common_shape
+from services.prompt_preprocessor import PAGE_BREAK
+from services.metrics import STAGE_LATENCY, timed
+from services.request_context import get_cancel_token, check_cancelled
 
 # EasyOCR opsiyonel - yüklü değilse OCR özelliği çalışmayacak
 try:
@@ -14,37 +26,364 @@ except ImportError:
     reader = None
     print("UYARI: EasyOCR yüklü değil. Görsel OCR özelliği kullanılamayacak.")
 
+# Toplu OCR'da tek seferde tanıma modeline verilecek satır sayısı
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE", "8"))
+
+# --- YÜKLEME SINIRLARI ---
+
+_MB = 1024 * 1024
+
+# Dosya tipine göre maksimum boyut
+MAX_UPLOAD_SIZES = {
+    "pdf": int(os.getenv("UPLOAD_MAX_PDF_MB", "25")) * _MB,
+    "image": int(os.getenv("UPLOAD_MAX_IMAGE_MB", "15")) * _MB,
+}
+# Tek bir isteğin gövdesi için üst sınır (multipart başlıkları dahil)
+MAX_REQUEST_BODY_SIZE = int(os.getenv("UPLOAD_MAX_REQUEST_MB", "30")) * _MB
+# Çoklu dosya yüklemesi için istek ve dosya sayısı sınırları
+MAX_MULTI_REQUEST_BODY_SIZE = int(os.getenv("UPLOAD_MAX_MULTI_REQUEST_MB", "100")) * _MB
+MAX_FILES_PER_REQUEST = int(os.getenv("UPLOAD_MAX_FILES", "10"))
+# Kopyalama sırasında bellekte tutulan en büyük parça
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# Aynı anda çalışabilecek metin çıkarma işi; dolduğunda 503 döner
+MAX_CONCURRENT_EXTRACTIONS = int(os.getenv("MAX_CONCURRENT_EXTRACTIONS", "4"))
+EXTRACTION_RETRY_AFTER = int(os.getenv("EXTRACTION_RETRY_AFTER_SECONDS", "5"))
+
+# Dosya imzaları (magic bytes) - uzantıya güvenmek yerine içerik kontrol edilir
+_MAGIC_BYTES = [
+    (b"%PDF-", "pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image"),
+    (b"\xff\xd8\xff", "image"),  # JPEG
+    (b"GIF87a", "image"),
+    (b"GIF89a", "image"),
+    (b"BM", "image"),
+    (b"II*\x00", "image"),  # TIFF (little-endian)
+    (b"MM\x00*", "image"),  # TIFF (big-endian)
+]
+_MAGIC_HEADER_SIZE = 16
+
+# Metin çıkarma işleri event loop'u bloklamasın diye ayrı thread havuzlarında çalışır.
+# OCR modeli tek bir reader nesnesini paylaştığından OCR havuzu ayrı ve küçük tutulur.
+_extraction_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_EXTRACTIONS, thread_name_prefix="extract")
+_ocr_executor = ThreadPoolExecutor(max_workers=int(os.getenv("OCR_WORKERS", "1")), thread_name_prefix="ocr")
+_extraction_slots = threading.BoundedSemaphore(MAX_CONCURRENT_EXTRACTIONS)
+
+
+def detect_file_kind(header: bytes) -> Optional[str]:
+    """Dosyanın ilk baytlarından tipini ("pdf" / "image") belirler."""
+    for signature, kind in _MAGIC_BYTES:
+        if header.startswith(signature):
+            return kind
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image"
+    return None
+
+
+@contextmanager
+def extraction_slot():
+    """
+    Eşzamanlı metin çıkarma işlerini sınırlar.
+    Tüm slotlar doluysa beklemek yerine hemen 503 + Retry-After döner (backpressure).
+    """
+    if not _extraction_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail="Sunucu şu anda çok fazla dosya işliyor. Lütfen biraz sonra tekrar deneyin.",
+            headers={"Retry-After": str(EXTRACTION_RETRY_AFTER)},
+        )
+    try:
+        yield
+    finally:
+        _extraction_slots.release()
+
+
+async def save_upload_to_temp(file: UploadFile, directory: Optional[str] = None) -> tuple:
+    """
+    Yüklenen dosyayı sınırlı boyutlu parçalar halinde geçici bir dosyaya kopyalar.
+    Dosya imzası ve bilinen boyut kopyalamadan önce kontrol edilir; sınır aşılırsa
+    kopyalama yarıda kesilir. directory verilirse dosya orada oluşturulur (arka plan işleri).
+
+    Returns:
+        (geçici dosya yolu, dosya tipi)
+    """
+    header = await file.read(_MAGIC_HEADER_SIZE)
+    kind = detect_file_kind(header)
+    if kind is None:
+        raise HTTPException(status_code=415, detail="Desteklenmeyen dosya tipi. Lütfen PDF veya görsel yükleyin.")
+
+    max_size = MAX_UPLOAD_SIZES[kind]
+    if file.size is not None and file.size > max_size:
+        raise HTTPException(status_code=413, detail=f"Dosya çok büyük. {kind} için sınır {max_size // _MB} MB.")
+
+    suffix = ".pdf" if kind == "pdf" else ""
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd, file_path = tempfile.mkstemp(prefix="pratikai_", suffix=suffix, dir=directory)
+    total = len(header)
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            buffer.write(header)
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                total += len(chunk)
+                if total > max_size:
+                    raise HTTPException(status_code=413, detail=f"Dosya çok büyük. {kind} için sınır {max_size // _MB} MB.")
+                buffer.write(chunk)
+    except BaseException:
+        os.remove(file_path)
+        raise
+    return file_path, kind
+
+
+def extract_text_from_pdf(file_path: str) -> str:
+    """PDF dosyasındaki metni PyMuPDF ile okur; sayfalar PAGE_BREAK ile ayrılır (şablon tespiti için)."""
+    pages = []
+    with fitz.open(file_path) as doc:
+        for page in doc:
+            check_cancelled()
+            pages.append(page.get_text())
+    return PAGE_BREAK.join(pages)
+
+
+def extract_text_from_image(file_path: str) -> str:
+    """Tek bir görseli ön işleyip EasyOCR ile metnini çıkarır."""
+    if not (EASYOCR_AVAILABLE and reader):
+        raise ValueError("EasyOCR yüklü değil. Görsel OCR özelliği kullanılamıyor. Lütfen PDF dosyası yükleyin.")
+    image = preprocess_image(file_path)
+    check_cancelled()
+    result = reader.readtext(image, batch_size=OCR_BATCH_SIZE)
+    return " ".join([item[1] for item in result])
+
+
+def extract_text_from_images(file_paths: List[str]) -> List[str]:
+    """
+    Birden fazla görseli tek bir toplu readtext çağrısıyla işler.
+    Görseller ölçek bozulmasın diye yeniden boyutlandırılmaz, beyaz kenarla aynı boyuta getirilir.
+    Kütüphane toplu çağrıyı desteklemiyorsa tek tek işlenir.
+    İstek iptal edilirse sonraki görsele geçilmez.
+    """
+    if not (EASYOCR_AVAILABLE and reader):
+        raise ValueError("EasyOCR yüklü değil. Görsel OCR özelliği kullanılamıyor. Lütfen PDF dosyası yükleyin.")
+    if not file_paths:
+        return []
+
+    images = []
+    for path in file_paths:
+        check_cancelled()
+        images.append(preprocess_image(path))
+    if len(images) == 1 or not hasattr(reader, "readtext_batched"):
+        texts = []
+        for img in images:
+            check_cancelled()
+            texts.append(" ".join(item[1] for item in reader.readtext(img, batch_size=OCR_BATCH_SIZE)))
+        return texts
+
+    check_cancelled()
+    results = reader.readtext_batched(pad_to_common_shape(images), batch_size=OCR_BATCH_SIZE)
+    return [" ".join(item[1] for item in result) for result in results]
+
+
+async def run_extraction(executor: ThreadPoolExecutor, func, *args):
+    """
+    İşi havuzda istek bağlamıyla (iptal belirteci dahil) çalıştırır.
+    İstek iptal edilince sonuç beklenmez: henüz başlamamış iş kuyruktan düşer, çalışan iş
+    kendi kontrol noktasında (sayfa / görsel arası) durur.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    future = loop.run_in_executor(executor, functools.partial(context.run, func, *args))
+    token = get_cancel_token()
+    if token is None:
+        return await future
+
+    def on_cancel():
+        loop.call_soon_threadsafe(future.cancel)
+
+    token.add_callback(on_cancel)
+    try:
+        return await future
+    except asyncio.CancelledError:
+        token.check()
+        raise
+    finally:
+        token.remove_callback(on_cancel)
+
+
+async def extract_text_from_path(file_path: str, kind: str) -> str:
+    """Dosya tipine göre uygun thread havuzunda metin çıkarır."""
+    if kind == "pdf":
+        return await run_extraction(_extraction_executor, extract_text_from_pdf, file_path)
+    return await run_extraction(_ocr_executor, extract_text_from_image, file_path)
+
+
+def extract_text_from_saved_file(file_path: str, kind: str) -> str:
+    """
+    Kaydedilmiş dosyadan senkron metin çıkarır (arka plan işleri, işçi thread'inde).
+    OCR, paylaşılan reader nedeniyle yine OCR havuzunda sırayla çalışır.
+    """
+    if kind == "pdf":
+        return extract_text_from_pdf(file_path)
+    context = contextvars.copy_context()
+    return _ocr_executor.submit(context.run, extract_text_from_image, file_path).result()
+
+
+@timed(STAGE_LATENCY, "process_uploaded_file")
 async def process_uploaded_file(file: UploadFile) -> str:
     """
     Yüklenen bir dosyayı (PDF veya resim) işleyip metin içeriğini döndürür.
     Geçici bir dosya oluşturur ve işlem sonrası siler.
+    Boyut/tip ihlallerinde 413/415, kapasite dolduğunda 503 döner.
     """
-    # Dosya adında güvenlik için sadece temel karakterlere izin ver
-    safe_filename = "".join(c for c in file.filename if c.isalnum() or c in ('.', '_')).rstrip()
-    file_path = f"temp_{safe_filename}"
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    with extraction_slot():
+        file_path, kind = await save_upload_to_temp(file)
 
-    extracted_text = ""
-    try:
-        if file.filename.lower().endswith('.pdf'):
-            # PDF ise, PyMuPDF ile metni oku
-            with fitz.open(file_path) as doc:
-                for page in doc:
-                    extracted_text += page.get_text()
-        else:
-            # Resim ise, EasyOCR ile metni oku
-            if EASYOCR_AVAILABLE and reader:
-                result = reader.readtext(file_path)
-                extracted_text = " ".join([item[1] for item in result])
-            else:
-                raise ValueError("EasyOCR yüklü değil. Görsel OCR özelliği kullanılamıyor. Lütfen PDF dosyası yükleyin.")
-    except Exception as e:
-        print(f"Dosya işlenirken hata oluştu: {e}")
-    finally:
-        # Geçici dosyayı her durumda sil
-        if os.path.exists(file_path):
-            os.remove(file_path)
-    
-    return extracted_text
\ No newline at end of file
+        extracted_text = ""
+        try:
+            extracted_text = await extract_text_from_path(file_path, kind)
+        except Exception as e:
+            print(f"Dosya işlenirken hata oluştu: {e}")
+        finally:
+            # Geçici dosyayı her durumda sil
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    # İptal edilen çıkarma boş metinle devam etmez
+    check_cancelled()
+    return extracted_text
+
+
+@timed(STAGE_LATENCY, "process_uploaded_files")
+async def process_uploaded_files(files: List[UploadFile]) -> Dict[str, Any]:
+    """
+    Birden fazla dosyayı eşzamanlı işler ve metinlerini yükleme sırasına göre birleştirir.
+    PDF'ler ayrı ayrı paralel okunur, görseller OCR havuzunda tek bir toplu çağrıyla işlenir;
+    toplam süre dosya sürelerinin toplamına değil en yavaş dosyaya yakındır.
+
+    Returns:
+        {"text": birleştirilmiş metin, "sources": dosya bazında köken bilgisi}
+    """
+    if len(files) > MAX_FILES_PER_REQUEST:
+        raise HTTPException(status_code=413, detail=f"En fazla {MAX_FILES_PER_REQUEST} dosya yüklenebilir.")
+
+    # Tüm istek tek bir çıkarma işi sayılır
+    with extraction_slot():
+        saved = []
+        try:
+            for file in files:
+                saved.append(await save_upload_to_temp(file))
+
+            texts: List[Optional[str]] = [None] * len(saved)
+            errors: List[Optional[str]] = [None] * len(saved)
+
+            async def read_pdf(index: int, file_path: str):
+                try:
+                    texts[index] = await run_extraction(_extraction_executor, extract_text_from_pdf, file_path)
+                except Exception as e:
+                    errors[index] = str(e)
+
+            async def read_images(indices: List[int]):
+                try:
+                    paths = [saved[i][0] for i in indices]
+                    results = await run_extraction(_ocr_executor, extract_text_from_images, paths)
+                    for i, text in zip(indices, results):
+                        texts[i] = text
+                except Exception as e:
+                    for i in indices:
+                        errors[i] = str(e)
+
+            image_indices = [i for i, (_, kind) in enumerate(saved) if kind == "image"]
+            jobs = [read_pdf(i, path) for i, (path, kind) in enumerate(saved) if kind == "pdf"]
+            if image_indices:
+                jobs.append(read_images(image_indices))
+            await asyncio.gather(*jobs)
+        finally:
+            # Geçici dosyaları her durumda sil
+            for file_path, _ in saved:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+
+    check_cancelled()
+    parts = []
+    sources = []
+    for index, (file, (_, kind)) in enumerate(zip(files, saved), start=1):
+        text = (texts[index - 1] or "").strip()
+        source = {
+            "index": index,
+            "filename": file.filename,
+            "type": kind,
+            "characters": len(text),
+        }
+        if errors[index - 1]:
+            print(f"Dosya işlenirken hata oluştu ({file.filename}): {errors[index - 1]}")
+            source["error"] = errors[index - 1]
+        sources.append(source)
+        if text:
+            parts.append(f"[Kaynak {index}: {file.filename}]\n{text}")
+
+    return {"text": "\n\n".join(parts), "sources": sources}
+
+
+class UploadSizeLimitMiddleware:
+    """
+    İstek gövdesini multipart ayrıştırıcıya ulaşmadan önce sınırlar (ASGI middleware).
+    Content-Length başlığı sınırı aşıyorsa gövde hiç okunmadan 413 döner;
+    başlık yoksa (chunked) okunan bayt sayılır ve sınır aşıldığında istek kesilir.
+    """
+
+    def __init__(self, app, max_body_size: int = MAX_REQUEST_BODY_SIZE, path_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_body_size = max_body_size
+        # Belirli endpoint'ler için farklı sınırlar (örn. çoklu dosya yükleme)
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+
+        max_body_size = self.path_limits.get(scope.get("path"), self.max_body_size)
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_body_size:
+            await self._reject(scope, receive, send, max_body_size)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body_size:
+                    # FastAPI gövde ayrıştırırken HTTPException'ı olduğu gibi iletir
+                    raise HTTPException(status_code=413, detail=self._detail(max_body_size))
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except HTTPException as e:
+            if e.status_code != 413 or response_started:
+                raise
+            await self._reject(scope, receive, send, max_body_size)
+
+    async def _reject(self, scope, receive, send, max_body_size: int):
+        response = JSONResponse(
+            status_code=413,
+            content={"detail": self._detail(max_body_size)},
+        )
+        await response(scope, receive, send)
+
+    @staticmethod
+    def _detail(max_body_size: int) -> str:
+        return f"İstek çok büyük. Sınır {max_body_size // _MB} MB."
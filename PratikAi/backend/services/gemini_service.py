@@ -1,8 +1,10 @@
 import os
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import google.generativeai as genai
 
+from services.metrics import STAGE_LATENCY, timed
+
 # --- GLOBAL DEĞİŞKENLER VE MODEL YÜKLEME ---
 
 # Uygulama genelinde kullanılacak Gemini modelini başlangıçta None olarak tanımlıyoruz.
@@ -17,7 +19,9 @@ def init_gemini(api_key: str):
     try:
         if not api_key:
             raise ValueError("API anahtarı bulunamadı veya boş.")
-        genai.configure(api_key=api_key)
+        # GEMINI_API_ENDPOINT tanımlıysa (örn. yerel sahte sunucu) oraya yönlendirilir
+        from services.ai_provider import configure_gemini
+        configure_gemini(api_key)
         # Güncel model adı
         try:
             model = genai.GenerativeModel('gemini-2.5-flash')
@@ -33,6 +37,7 @@ def init_gemini(api_key: str):
 
 # --- YARDIMCI FONKSİYONLAR ---
 
+@timed(STAGE_LATENCY, "parse_quiz_text")
 def parse_quiz_text(raw_text: str) -> List[Dict[str, Any]]:
     """
     Gemini API'den gelen ham metin formatındaki sınavı, yapısal bir listeye dönüştürür.
@@ -68,31 +73,24 @@ def parse_quiz_text(raw_text: str) -> List[Dict[str, Any]]:
 
 def analyze_question_types(questions: List[Dict[str, Any]]) -> str:
     """
-    Üretilen soruları anahtar kelimelere göre analiz eder ve metnin kalitesi
+    Üretilen soruları Bloom düzeylerine göre analiz eder ve metnin kalitesi
     hakkında pedagojik bir geri bildirim oluşturur.
     """
     if not questions:
         return None
 
-    # Bloom Taksonomisine göre basit bir sınıflandırma
-    knowledge_keywords = ["nedir", "kimdir", "nerede", "ne zaman", "hangisidir", "tanımla"]
-    comprehension_keywords = ["neden", "nasıl", "açıkla", "karşılaştır", "yorumla", "örnek ver"]
-
-    knowledge_count = 0
-    comprehension_count = 0
+    # Bloom Taksonomisine göre sınıflandırma (tüm sorular tek geçişte)
+    from services.bloom_analyzer import bloom_distribution
+    return feedback_from_distribution(bloom_distribution(questions))
 
-    for q_data in questions:
-        question_text = q_data.get("question", "").lower()
-        if any(keyword in question_text for keyword in comprehension_keywords):
-            comprehension_count += 1
-        elif any(keyword in question_text for keyword in knowledge_keywords):
-            knowledge_count += 1
-    
-    total_questions = len(questions)
+def feedback_from_distribution(distribution: Dict[str, Any]) -> Optional[str]:
+    """Bloom dağılımından geri bildirim; sorular zaten sınıflandırıldıysa yeniden taranmaz."""
+    total_questions = distribution["total"]
     if total_questions == 0:
         return None
 
-    knowledge_percentage = (knowledge_count / total_questions) * 100
+    # Hatırlama düzeyi bilgi, üstündeki düzeyler kavrama ve ötesi sayılır
+    knowledge_percentage = distribution["percentages"]["hatirlama"]
     
     if knowledge_percentage > 70:
         return f"Üretilen soruların ~%{int(knowledge_percentage)}'i bilgi düzeyindedir. Metninize neden-sonuç ilişkileri ekleyerek kavrama düzeyindeki (neden, nasıl) soruları artırabilirsiniz."
@@ -103,31 +101,119 @@ def analyze_question_types(questions: List[Dict[str, Any]]) -> str:
 
 # --- ANA SERVİS FONKSİYONLARI ---
 
-def generate_questions_from_gemini(text: str, num_questions: int, question_type: str, difficulty: str) -> Dict[str, Any]:
+# Yerel/sahte provider'ların soruları bankaya yazılmaz (her istekte ücretsiz yeniden üretilebilir)
+_UNBANKED_PROVIDERS = {"mock", "cloze", "bank", "none"}
+
+def _classify_once(questions: List[Dict[str, Any]]) -> Dict[int, Optional[str]]:
+    """Yapısal soruların Bloom düzeyleri (soru nesnesinin id'si -> düzey); yanıt boyunca yeniden kullanılır."""
+    from services.bloom_analyzer import classify_questions
+    structured = [q for q in questions if "question" in q]
+    return dict(zip(map(id, structured), classify_questions(structured)))
+
+def _merge_with_bank(result: Dict[str, Any], bank, src: str, bank_questions: List[Dict[str, Any]],
+                     question_type: str, difficulty: str, levels: Dict[int, Optional[str]]) -> Dict[str, Any]:
+    """
+    Yeni üretilen soruları bankaya ekler ve bankadan gelen sorularla birleştirir.
+    Bankadan sunulan bir soruya çok benzeyen yeni sorular yanıttan çıkarılır.
+    """
+    new_questions = result.get("questions", [])
+    added = duplicates = 0
+    if result.get("provider") not in _UNBANKED_PROVIDERS:
+        outcome = bank.add_questions(src, new_questions, question_type, difficulty,
+                                     levels=[levels.get(id(q)) for q in new_questions])
+        added, duplicates = outcome["added"], outcome["duplicates"]
+        served_ids = {q["bank_id"] for q in bank_questions}
+        kept = []
+        for question, bank_id in zip(new_questions, outcome["bank_ids"]):
+            if bank_id is not None and bank_id in served_ids:
+                continue
+            if bank_id is not None:
+                question["bank_id"] = bank_id
+            kept.append(question)
+        new_questions = kept
+    
+    result["questions"] = bank_questions + new_questions
+    result["bank"] = {"served": len(bank_questions), "added": added, "duplicates": duplicates}
+    return result
+
+def generate_questions_from_gemini(text: str, num_questions: int, question_type: str, difficulty: str,
+                                   bank_first: bool = False) -> Dict[str, Any]:
     """
     Ana sınav üretme fonksiyonu. 
     Fallback mekanizması ile çalışır: Gemini -> OpenAI -> Mock
+    Üretilen çoktan seçmeli sorular soru bankasına eklenir; bank_first ile önce bankadaki
+    sorular sunulur ve provider'dan yalnızca eksik kalan kadar soru istenir.
     """
     if not text or len(text.strip()) < 20:
         return {"questions": [{"error": "Soru üretmek için yetersiz metin."}]}
     
     # Fallback mekanizması ile soru üret
     from services.ai_provider import get_ai_provider_manager
+    from services.question_bank import QUESTION_BANK_ENABLED
+    from services.usage_accounting import BudgetExceededError
+    from services.scheduler import SchedulerOverloadError
+    from services.request_context import RequestCancelledError
+    
+    bank = None
+    src = None
+    bank_questions = []
+    if QUESTION_BANK_ENABLED and question_type == "çoktan seçmeli":
+        from services.question_bank import get_question_bank, source_hash
+        try:
+            bank = get_question_bank()
+            src = source_hash(text)
+            if bank_first:
+                bank_questions = bank.find_questions(src, question_type, difficulty, num_questions)
+        except Exception as e:
+            print(f"⚠️ Soru bankası kullanılamıyor: {e}")
+            bank = None
     
     try:
-        manager = get_ai_provider_manager()
-        result = manager.generate_questions_with_fallback(text, num_questions, question_type, difficulty)
+        shortfall = num_questions - len(bank_questions)
+        if shortfall > 0:
+            manager = get_ai_provider_manager()
+            result = manager.generate_questions_with_fallback(text, shortfall, question_type, difficulty)
+        else:
+            result = {"questions": [], "recommendations": [], "feedback": None, "provider": "bank"}
+        
+        # Sorular bir kez sınıflandırılır; banka kaydı, dağılım ve geri bildirim aynı sonucu kullanır
+        levels = _classify_once(bank_questions + result.get("questions", []))
+        if bank is not None:
+            result = _merge_with_bank(result, bank, src, bank_questions, question_type, difficulty, levels)
         
-        # Recommendations ekle (Gemini'den bağımsız)
+        # Bloom düzeyi dağılımı (yalnızca yapısal sorular sınıflandırılabilir)
+        structured = [q for q in result.get("questions", []) if "question" in q]
+        if structured:
+            from services.bloom_analyzer import distribution_from_levels
+            result["bloom_distribution"] = distribution_from_levels([levels[id(q)] for q in structured])
+            # Sahte provider kendi açıklamasını taşır
+            if question_type == "çoktan seçmeli" and result.get("provider") != "mock":
+                result["feedback"] = feedback_from_distribution(result["bloom_distribution"])
+        
+        # Recommendations ekle (Gemini'den bağımsız); iptal ve bütçe aşımı yukarı iletilir
         try:
             recommendations = get_recommendations(text)
             result["recommendations"] = recommendations
-        except:
+        except (BudgetExceededError, RequestCancelledError):
+            raise
+        except Exception:
             result["recommendations"] = []
         
         return result
+    except (BudgetExceededError, SchedulerOverloadError, RequestCancelledError):
+        # Bütçe aşımı (429), yük atma (503) ve iptal (499/504) provider hatası değil; kullanıcıya iletilir
+        raise
     except Exception as e:
         print(f"❌ Tüm AI provider'lar başarısız: {e}")
+        if bank_questions:
+            # Bankada bulunanlar yine de sunulur
+            return {
+                "questions": bank_questions,
+                "recommendations": [],
+                "feedback": analyze_question_types(bank_questions),
+                "provider": "bank",
+                "bank": {"served": len(bank_questions), "added": 0, "duplicates": 0}
+            }
         return {
             "questions": [{"error": f"AI servisleri şu anda kullanılamıyor: {e}"}],
             "recommendations": [],
@@ -145,27 +231,69 @@ def generate_summary_from_gemini(text: str) -> str:
     
     # Fallback mekanizması ile özet üret
     from services.ai_provider import get_ai_provider_manager
+    from services.usage_accounting import BudgetExceededError
+    from services.scheduler import SchedulerOverloadError
+    from services.request_context import RequestCancelledError
     
     try:
         manager = get_ai_provider_manager()
         return manager.generate_summary_with_fallback(text)
+    except (BudgetExceededError, SchedulerOverloadError, RequestCancelledError):
+        raise
     except Exception as e:
         print(f"❌ Tüm AI provider'lar başarısız: {e}")
         return f"AI servisleri şu anda kullanılamıyor: {e}"
 
+# Anahtar kelime çıkarım yöntemi: "rake" (varsayılan, yerel), "tfidf" (yerel) veya "llm" (Gemini)
+KEYWORD_EXTRACTOR = os.getenv("KEYWORD_EXTRACTOR", "rake").lower()
+# tfidf yöntemi için önceden hesaplanmış belge frekansı tablosu (JSON, isteğe bağlı)
+KEYWORD_DF_PATH = os.getenv("KEYWORD_DF_PATH", "")
+_df_table = None
+_df_table_loaded = False
+
+def _get_df_table():
+    """Belge frekansı tablosunu ilk kullanımda bir kez yükler."""
+    global _df_table, _df_table_loaded
+    if not _df_table_loaded:
+        from services.text_analysis import load_document_frequency_table
+        _df_table = load_document_frequency_table(KEYWORD_DF_PATH) if KEYWORD_DF_PATH else None
+        _df_table_loaded = True
+    return _df_table
+
+def extract_keywords(text: str, top_k: int = 3) -> List[str]:
+    """
+    Seçili yöntemle anahtar kelimeleri çıkarır.
+    LLM çağrısı provider zincirinden (bütçe, zamanlayıcı, iptal) geçer. LLM yöntemi seçiliyken
+    model yoksa, sistem degrade modundaysa veya LLM hata verirse yerel RAKE'e düşülür;
+    iptal edilen veya bütçesi dolan istek ise durdurulur.
+    """
+    from services.text_analysis import extract_keywords_rake, extract_keywords_tfidf
+    from services.ai_provider import get_ai_provider_manager
+    from services.request_context import RequestCancelledError
+    from services.usage_accounting import BudgetExceededError
+    
+    manager = get_ai_provider_manager()
+    if KEYWORD_EXTRACTOR == "llm" and model and not manager.is_degraded():
+        try:
+            return manager.extract_keywords_with_fallback(text, top_k)
+        except (BudgetExceededError, RequestCancelledError):
+            raise
+        except Exception as e:
+            print(f"⚠️ LLM anahtar kelime çıkarımı başarısız, yerel yönteme geçiliyor: {e}")
+    if KEYWORD_EXTRACTOR == "tfidf":
+        return extract_keywords_tfidf(text, top_k, _get_df_table())
+    return extract_keywords_rake(text, top_k)
+
 def get_recommendations(text: str) -> List[Dict[str, str]]:
-    """Metinden anahtar kelimeler çıkarır ve arama linkleri oluşturur."""
-    if not model or not text or len(text.strip()) < 20:
+    """Metinden anahtar kelimeler çıkarır ve arama linkleri oluşturur (iptal ve bütçe aşımı yukarı iletilir)."""
+    from services.usage_accounting import BudgetExceededError
+    from services.request_context import RequestCancelledError
+    
+    if not text or len(text.strip()) < 20:
         return []
     
-    prompt = f"""
-    Aşağıdaki metnin ana konusunu ve en önemli 3 anahtar kelimesini belirle. 
-    Cevabı sadece virgülle ayrılmış şekilde ver. Örnek: Biyoloji, Hücre Yapısı, Metabolizma
-    Metin: "{text}"
-    """
     try:
-        response = model.generate_content(prompt)
-        keywords = [kw.strip() for kw in response.text.split(',') if kw.strip()]
+        keywords = extract_keywords(text)
         
         recommendations = []
         for kw in keywords:
@@ -180,6 +308,8 @@ def get_recommendations(text: str) -> List[Dict[str, str]]:
                 "url": f"https://www.youtube.com/results?search_query={encoded_kw}"
             })
         return recommendations
+    except (BudgetExceededError, RequestCancelledError):
+        raise
     except Exception as e:
         print(f"Tavsiye üretilirken hata: {e}")
         return []
\ No newline at end of file
@@ -0,0 +1,338 @@
+"""
+İş Kuyruğu - Uzun süren sınav/özet üretimi için arka plan işleri
+Büyük belgelerde üretim ters vekil (reverse proxy) zaman aşımını geçebildiği için istemci işi gönderir,
+hemen bir iş kimliği alır ve sonucu sorgulayarak (poll) veya olay akışıyla (SSE) bekler.
+
+- Sınırlı işçi havuzu: JOB_WORKERS thread; bekleyen iş sayısı JOB_MAX_PENDING'i aşarsa 503 + Retry-After
+- Kalıcılık: işler SQLite tablosunda tutulur; yeniden başlatmada bekleyen ve yarıda kalan işler kuyruğa döner
+- Sonuçlar JOB_RESULT_TTL_SECONDS sonra silinir
+- İdempotency anahtarı: aynı kullanıcı aynı anahtarla tekrar gönderirse mevcut iş döner
+- Dosyalı işler: yükleme JOB_UPLOAD_DIR'e kaydedilir, metin (PDF okuma / OCR) işçide çıkarılır; dosya iş bitince silinir
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Any, Optional, Tuple, Callable
+
+from fastapi import HTTPException
+
+from services.request_context import set_user_id, set_endpoint, set_request_class, set_cancel_token, CancellationToken, BATCH
+from services.usage_accounting import ANONYMOUS_USER
+
+JOB_DB_PATH = os.getenv(
+    "JOB_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "jobs.db")
+)
+# Dosyayla gönderilen işlerin yüklemeleri iş bitene kadar burada tutulur (yeniden başlatmada kaybolmaz)
+JOB_UPLOAD_DIR = os.getenv("JOB_UPLOAD_DIR", os.path.join(os.path.dirname(JOB_DB_PATH) or ".", "job_uploads"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "100"))
+JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+JOB_RETRY_AFTER = int(os.getenv("JOB_RETRY_AFTER_SECONDS", "10"))
+# Tek bir işin süre sınırı (sn, 0 = sınırsız); aşılınca iş 504 ile başarısız olur
+JOB_DEADLINE_SECONDS = float(os.getenv("JOB_DEADLINE_SECONDS", "600"))
+# Süresi dolan işlerin temizlenme aralığı
+JOB_PURGE_INTERVAL_SECONDS = 60
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+
+def _job_text(params: Dict[str, Any]) -> str:
+    """İşin metni; dosyayla gönderilen işlerde metin kaydedilen dosyadan işçide çıkarılır"""
+    if "file_path" not in params:
+        return params["text"]
+    from services.file_processor import extract_text_from_saved_file
+    try:
+        text = extract_text_from_saved_file(params["file_path"], params["file_kind"])
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Dosyadan metin çıkarılamadı: {e}")
+    if not text.strip():
+        raise HTTPException(status_code=422, detail="Dosyadan metin çıkarılamadı.")
+    return text
+
+
+def discard_job_upload(params: Dict[str, Any]):
+    """İşin kaydedilmiş yüklemesini (varsa) siler"""
+    file_path = params.get("file_path")
+    if file_path and os.path.exists(file_path):
+        os.remove(file_path)
+
+
+def _run_quiz(params: Dict[str, Any]) -> Dict[str, Any]:
+    from services.gemini_service import generate_questions_from_gemini
+    return generate_questions_from_gemini(
+        _job_text(params), params["num_questions"], params["question_type"], params["difficulty"], params["bank_first"]
+    )
+
+
+def _run_summary(params: Dict[str, Any]) -> Dict[str, Any]:
+    from services.gemini_service import generate_summary_from_gemini, get_recommendations
+    from services.ai_provider import get_last_degraded_reason
+    text = _job_text(params)
+    summary = generate_summary_from_gemini(text)
+    result = {"summary": summary, "recommendations": get_recommendations(text)}
+    degraded_reason = get_last_degraded_reason()
+    if degraded_reason:
+        result["degraded"] = True
+        result["degraded_reason"] = degraded_reason
+    return result
+
+
+# İş türü -> işleyici; işleyici parametre sözlüğünü alır, JSON'a çevrilebilir sonuç döndürür
+JOB_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "quiz": _run_quiz,
+    "summary": _run_summary,
+}
+
+
+class JobQueue:
+    """SQLite destekli kalıcı iş kuyruğu ve işçi havuzu"""
+
+    def __init__(self, path: str = JOB_DB_PATH, workers: int = JOB_WORKERS,
+                 max_pending: int = JOB_MAX_PENDING, ttl_seconds: float = JOB_RESULT_TTL_SECONDS):
+        self.path = path
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                endpoint TEXT,
+                idempotency_key TEXT,
+                params BLOB NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                expires_at REAL
+            )
+        """)
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS jobs_idempotency ON jobs (user_id, idempotency_key) "
+            "WHERE idempotency_key IS NOT NULL"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+        # Yarıda kalan işler baştan çalıştırılır; bekleyenler gönderilme sırasıyla kuyruğa döner
+        self._conn.execute("UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?", (QUEUED, RUNNING))
+        self._conn.commit()
+        recovered = [row[0] for row in self._conn.execute(
+            "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+        )]
+        for job_id in recovered:
+            self._queue.put(job_id)
+        self._pending = len(recovered)
+        if recovered:
+            print(f"🔄 {len(recovered)} bekleyen iş kuyruğa geri alındı")
+
+        self._workers = [
+            threading.Thread(target=self._work, daemon=True, name=f"job-worker-{i + 1}") for i in range(max(1, workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+        atexit.register(self.close)
+
+    # --- GÖNDERME / SORGULAMA ---
+
+    def submit(self, kind: str, params: Dict[str, Any], user_id: Optional[str] = None,
+               endpoint: Optional[str] = None, idempotency_key: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """
+        İşi kuyruğa ekler.
+        Returns: (iş durumu, yeni oluşturuldu mu) - idempotency anahtarı eşleşirse mevcut iş döner
+        """
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Bilinmeyen iş türü: {kind}")
+        user_id = user_id or ANONYMOUS_USER
+        now = time.time()
+        with self._lock:
+            if idempotency_key:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE user_id = ? AND idempotency_key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                    (user_id, idempotency_key, now)
+                ).fetchone()
+                if row is not None:
+                    return self._status(row[0]), False
+                # Süresi dolmuş eski kayıt anahtarı serbest bırakır
+                self._conn.execute(
+                    "DELETE FROM jobs WHERE user_id = ? AND idempotency_key = ?", (user_id, idempotency_key)
+                )
+
+            if self._pending >= self.max_pending:
+                raise HTTPException(
+                    status_code=503,
+                    detail="İş kuyruğu dolu. Lütfen biraz sonra tekrar deneyin.",
+                    headers={"Retry-After": str(JOB_RETRY_AFTER)}
+                )
+
+            job_id = os.urandom(12).hex()
+            payload = zlib.compress(json.dumps(params, ensure_ascii=False).encode("utf-8"))
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, user_id, endpoint, idempotency_key, params, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, user_id, endpoint, idempotency_key, payload, now)
+            )
+            self._conn.commit()
+            self._pending += 1
+            status = self._status(job_id)
+        self._queue.put(job_id)
+        return status, True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """İşin durumu ve (bittiyse) sonucu; bulunamazsa veya süresi dolduysa None"""
+        with self._lock:
+            return self._status(job_id)
+
+    def _status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            "SELECT kind, status, result, error, created_at, started_at, finished_at, expires_at FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        kind, status, result, error, created_at, started_at, finished_at, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            return None
+        job = {
+            "job_id": job_id,
+            "kind": kind,
+            "status": status,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "expires_at": expires_at,
+        }
+        if status == QUEUED:
+            job["queued_ahead"] = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < ?", (QUEUED, created_at)
+            ).fetchone()[0]
+        elif status == SUCCEEDED:
+            job["result"] = json.loads(result)
+        elif status == FAILED:
+            job["error"] = json.loads(error)
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {"pending": self._pending, "max_pending": self.max_pending, "workers": len(self._workers), "jobs": counts}
+
+    # --- İŞÇİLER ---
+
+    def _work(self):
+        while True:
+            try:
+                job_id = self._queue.get(timeout=JOB_PURGE_INTERVAL_SECONDS)
+            except queue.Empty:
+                self._purge_expired()
+                continue
+            if job_id is None:
+                return
+            try:
+                self._execute(job_id)
+            except Exception as e:
+                print(f"❌ İş {job_id} işlenemedi: {e}")
+            finally:
+                with self._lock:
+                    self._pending -= 1
+            self._purge_expired()
+
+    def _execute(self, job_id: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT kind, user_id, endpoint, params FROM jobs WHERE id = ? AND status = ?", (job_id, QUEUED)
+            ).fetchone()
+            if row is None:
+                return
+            self._conn.execute("UPDATE jobs SET status = ?, started_at = ? WHERE id = ?", (RUNNING, time.time(), job_id))
+            self._conn.commit()
+        kind, user_id, endpoint, payload = row
+        params = json.loads(zlib.decompress(payload))
+
+        # Her iş temiz bir bağlamda çalışır; kullanım muhasebesi işi gönderen kullanıcıya yazılır
+        context = contextvars.Context()
+        try:
+            result = context.run(self._run_handler, kind, params, user_id, endpoint)
+            status, result_json, error_json = SUCCEEDED, json.dumps(result, ensure_ascii=False, default=str), None
+        except HTTPException as e:
+            status, result_json, error_json = FAILED, None, json.dumps({"status_code": e.status_code, "detail": e.detail}, ensure_ascii=False)
+        except Exception as e:
+            print(f"❌ İş {job_id} başarısız: {e}")
+            status, result_json, error_json = FAILED, None, json.dumps({"status_code": 500, "detail": str(e)}, ensure_ascii=False)
+        discard_job_upload(params)
+
+        finished = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, expires_at = ? WHERE id = ?",
+                (status, result_json, error_json, finished, finished + self.ttl_seconds, job_id)
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def _run_handler(kind: str, params: Dict[str, Any], user_id: str, endpoint: Optional[str]):
+        if user_id != ANONYMOUS_USER:
+            set_user_id(user_id)
+        set_endpoint(endpoint)
+        # Arka plan işleri zamanlayıcıda etkileşimli isteklerin arkasında sıralanır
+        set_request_class(BATCH)
+        set_cancel_token(CancellationToken(JOB_DEADLINE_SECONDS))
+        return JOB_HANDLERS[kind](params)
+
+    def _purge_expired(self):
+        now = time.time()
+        if now - self._last_purge < JOB_PURGE_INTERVAL_SECONDS:
+            return
+        with self._lock:
+            self._last_purge = now
+            deleted = self._conn.execute("DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)).rowcount
+            self._conn.commit()
+        if deleted:
+            print(f"🔄 Süresi dolan {deleted} iş silindi")
+
+    def close(self):
+        """İşçileri durdurur (çalışan iş bitene kadar beklenmez) ve bağlantıyı kapatır"""
+        for _ in self._workers:
+            self._queue.put(None)
+        with self._lock:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+
+
+# Global iş kuyruğu instance
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """İş kuyruğunu al veya oluştur (işçiler ilk çağrıda başlar)"""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue()
+    return _job_queue
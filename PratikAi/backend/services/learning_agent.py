@@ -6,6 +6,9 @@ Bu modül, dersin temel etmen kavramlarını gösterir.
 from typing import Dict, List, Any, Optional
 from enum import Enum
 
+from services.tracing import traced, span
+from services.request_context import check_cancelled
+
 
 class AgentState(Enum):
     """Etmen durumları - Hafta 2: Otonomi ve Durum Yönetimi"""
@@ -66,6 +69,7 @@ class LearningAgent:
         # Chapter 4: Meta-Reasoning için feedback geçmişi
         self.feedback_history = []
         
+    @traced("perceive")
     def perceive(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Algılama (Perception) - Hafta 2: Tepkisellik (Reactivity)
@@ -86,6 +90,7 @@ class LearningAgent:
         self.state = AgentState.IDLE
         return perceived_data
     
+    @traced("reason")
     def reason(self, perceived_data: Dict[str, Any], goal: str) -> Dict[str, Any]:
         """
         Akıl Yürütme (Reasoning) - Hafta 3: Akıl Yürütme Mekanizmaları
@@ -145,6 +150,7 @@ class LearningAgent:
         self.state = AgentState.IDLE
         return reasoning_result
     
+    @traced("plan")
     def plan(self, goal: str, reasoning_result: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Planlama (Planning) - Hafta 5: Planlama Algoritmaları
@@ -183,23 +189,27 @@ class LearningAgent:
         
         return plan
     
+    @traced("act")
     def act(self, plan: List[Dict[str, Any]], external_function) -> Dict[str, Any]:
         """
         Eylem (Action) - Hafta 2: Eylem Alma
-        Planı adım adım uygular.
+        Planı adım adım uygular; istek iptal edildiyse (istemci kapandı / süre doldu) sonraki adıma geçilmez.
         """
         self.state = AgentState.ACTING
         
         results = {}
         for step in plan:
             task = step["task"]
+            check_cancelled()
             
-            if task == "soru_uretim":
-                # Dış fonksiyonu çağır - Hafta 5: Araç Kullanımı
-                params = step.get("parameters", {})
-                results[task] = external_function(**params)
-            else:
-                results[task] = {"status": "completed", "step": step["step"]}
+            # Her adım ayrı span: o adımda yapılan provider çağrıları adıma yazılır
+            with span("act.step", step=step["step"], task=task):
+                if task == "soru_uretim":
+                    # Dış fonksiyonu çağır - Hafta 5: Araç Kullanımı
+                    params = step.get("parameters", {})
+                    results[task] = external_function(**params)
+                else:
+                    results[task] = {"status": "completed", "step": step["step"]}
         
         # Epizodik belleğe kaydet - Hafta 7: Epizodik Bellek
         self.memory.append({
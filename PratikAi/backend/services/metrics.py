@@ -0,0 +1,270 @@
+"""
+Metrikler - Sayaçlar, sabit kovalı histogramlar ve göstergeler, Prometheus metin formatında dışa aktarım
+Sıcak yolda kilit yoktur: her thread kendi parçasına (shard) yazar, kilit yalnızca bir thread
+bir metriğe ilk kez yazdığında parçayı kaydetmek için alınır. /metrics okunurken parçalar toplanır.
+asyncio görevleri aynı thread'i paylaştığı için ek bir önlem gerekmez.
+"""
+
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Tuple, Callable
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Saniye cinsinden varsayılan gecikme kovaları (ms düzeyinden dakika düzeyine)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Bayt cinsinden yanıt boyutu kovaları (256 B - 4 MB)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_registry: List["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    """Thread başına parçalı metrik tabanı"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[Tuple[str, ...], Any]] = []
+        self._shard_lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _shard(self) -> Dict[Tuple[str, ...], Any]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shard_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshot_shards(self) -> List[Dict[Tuple[str, ...], Any]]:
+        with self._shard_lock:
+            return list(self._shards)
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Yalnızca artan sayaç; etiket değerleri konumsal verilir: counter.inc("gemini", "ok")"""
+
+    type_name = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        totals: Dict[Tuple[str, ...], float] = {}
+        for shard in self._snapshot_shards():
+            for labels, value in list(shard.items()):
+                totals[labels] = totals.get(labels, 0.0) + value
+        return totals
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}_total{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(self.values().items())
+        ]
+
+
+class Histogram(_Metric):
+    """Sabit kovalı histogram; parça başına [kova sayıları..., +Inf sayısı, toplam]"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str):
+        shard = self._shard()
+        cells = shard.get(labels)
+        if cells is None:
+            cells = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        # Değerin düştüğü ilk kova; toplama (kümülatif) dışa aktarımda yapılır
+        cells[bisect.bisect_left(self.buckets, value)] += 1
+        cells[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        """with blok süresini (hata olsa da) gözlemler"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def values(self) -> Dict[Tuple[str, ...], List[float]]:
+        totals: Dict[Tuple[str, ...], List[float]] = {}
+        for shard in self._snapshot_shards():
+            for labels, cells in list(shard.items()):
+                merged = totals.get(labels)
+                if merged is None:
+                    totals[labels] = list(cells)
+                else:
+                    for i, value in enumerate(cells):
+                        merged[i] += value
+        return totals
+
+    def render(self) -> List[str]:
+        lines = []
+        for labels, cells in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), cells):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(cells[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Anlık değer; değerler /metrics okunurken set_function ile verilen fonksiyondan alınır"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+
+    def set_function(self, function: Callable[[], Dict[Tuple[str, ...], float]]):
+        self._function = function
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        return dict(self._function()) if self._function is not None else {}
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(self.values().items())
+        ]
+
+
+def render_metrics() -> str:
+    """Kayıtlı tüm metrikleri Prometheus metin formatında döndürür"""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type_name}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def timed(histogram: Histogram, *labels: str):
+    """Fonksiyon süresini ölçen dekoratör; async fonksiyonlarda await süresi ölçülür"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with histogram.time(*labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time(*labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- UYGULAMA METRİKLERİ ---
+
+HTTP_REQUESTS = Counter(
+    "pratikai_http_requests", "Endpoint başına HTTP istek sayısı", ("method", "endpoint", "status")
+)
+HTTP_LATENCY = Histogram(
+    "pratikai_http_request_duration_seconds", "Endpoint başına HTTP istek süresi", ("method", "endpoint")
+)
+HTTP_RESPONSE_BYTES = Histogram(
+    "pratikai_http_response_bytes", "Endpoint başına yanıt gövdesi boyutu (bayt)", ("method", "endpoint"), buckets=SIZE_BUCKETS
+)
+STAGE_LATENCY = Histogram(
+    "pratikai_stage_duration_seconds", "İşlem aşaması süresi (metin çıkarma, ayrıştırma, PDF)", ("stage",)
+)
+PROVIDER_CALLS = Counter(
+    "pratikai_provider_calls", "AI provider çağrı sayısı (outcome: ok, error, unsupported)", ("provider", "method", "outcome")
+)
+PROVIDER_LATENCY = Histogram(
+    "pratikai_provider_duration_seconds", "AI provider çağrı süresi", ("provider", "method")
+)
+PROVIDER_WASTED = Counter(
+    "pratikai_provider_wasted_seconds",
+    "İptal edilen (istemci kapandı / süre doldu) isteklerde sonucu kullanılmayan provider süresi", ("provider", "method", "reason")
+)
+SCHEDULER_WAIT = Histogram(
+    "pratikai_scheduler_wait_seconds", "Provider çağrısının zamanlayıcı kuyruğunda bekleme süresi", ("class",)
+)
+SCHEDULER_REJECTED = Counter(
+    "pratikai_scheduler_rejected", "Zamanlayıcının reddettiği çağrılar (reason: queue_full, timeout)", ("class", "reason")
+)
+SCHEDULER_QUEUE = Gauge(
+    "pratikai_scheduler_requests", "Zamanlayıcıdaki çağrı sayısı (state: queued, running)", ("class", "state")
+)
+
+
+class MetricsMiddleware:
+    """
+    Her HTTP isteğinin süresini, yanıt boyutunu ve durum kodunu endpoint şablonuyla (örn. /task-context/{task_id})
+    kaydeder (ASGI middleware). Eşleşmeyen yollar tek bir "unmatched" etiketinde toplanır.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        body_bytes = 0
+        started = time.perf_counter()
+
+        async def recording_send(message):
+            nonlocal status, body_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                body_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, recording_send)
+        finally:
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            HTTP_LATENCY.observe(time.perf_counter() - started, scope["method"], endpoint)
+            HTTP_RESPONSE_BYTES.observe(body_bytes, scope["method"], endpoint)
+            HTTP_REQUESTS.inc(scope["method"], endpoint, str(status))
@@ -6,6 +6,24 @@ CWD (Coordinator-Worker-Delegator) Modeli
 from typing import Dict, List, Any, Optional
 from enum import Enum
 from services.learning_agent import LearningAgent
+from services.tracing import traced, set_span_attribute
+from services.request_context import check_cancelled
+
+# Görev türü -> görevi yürüten çalışanın uzmanlığı
+TASK_SPECIALIZATIONS = {
+    "generate_questions": "question_generator",
+    "generate_summary": "summary_generator",
+    "analyze": "analyzer",
+    "recommend": "recommender"
+}
+
+# Koordinatör plan adımı (LearningAgent.plan) -> çalışan görev türü
+PLAN_TASK_TYPES = {
+    "metin_analizi": "generate_summary",
+    "soru_uretim": "generate_questions",
+    "analiz": "analyze",
+    "tavsiye_olustur": "recommend"
+}
 
 
 class AgentRole(Enum):
@@ -44,6 +62,7 @@ class WorkerAgent(LearningAgent):
         }
         return backstories.get(specialization, "Genel amaçlı çalışan etmen")
     
+    @traced("worker.execute_task")
     def execute_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """
         Görev yürütme - Hafta 6: Çalışan Etmen Davranışı
@@ -51,6 +70,8 @@ class WorkerAgent(LearningAgent):
         Uzmanlık alanına göre görevi yerine getirir
         """
         task_type = task.get("type", "")
+        set_span_attribute("specialization", self.specialization)
+        set_span_attribute("task_type", task_type)
         
         result = {}
         explanation = f"{self.specialization} uzmanı olarak görevi yerine getiriyorum: {task_type}"
@@ -94,11 +115,11 @@ class WorkerAgent(LearningAgent):
         }, None)
     
     def _analyze(self, task: Dict[str, Any]) -> Dict[str, Any]:
-        """Analiz görevi"""
-        from services.gemini_service import analyze_question_types
-        questions = task.get("questions", [])
-        feedback = analyze_question_types(questions)
-        return {"feedback": feedback}
+        """Analiz görevi; soru üretiminde hesaplanmış Bloom dağılımı varsa yeniden sınıflandırılmaz"""
+        from services.gemini_service import feedback_from_distribution
+        from services.bloom_analyzer import bloom_distribution
+        distribution = task.get("bloom_distribution") or bloom_distribution(task.get("questions", []))
+        return {"feedback": feedback_from_distribution(distribution), "bloom_distribution": distribution}
     
     def _recommend(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """Öneri görevi"""
@@ -123,6 +144,7 @@ class DelegatorAgent(LearningAgent):
         """Çalışan etmen kaydet - Hafta 6: İşbirliği"""
         self.worker_agents.append(worker)
     
+    @traced("delegator.delegate_task")
     def delegate_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """
         Görev delege etme - Hafta 6: Delegasyon
@@ -131,10 +153,10 @@ class DelegatorAgent(LearningAgent):
         task_type = task.get("type", "")
         
         # Uygun çalışanı bul - Hafta 6: Koordinasyon
+        specialization = TASK_SPECIALIZATIONS.get(task_type)
         suitable_worker = None
         for worker in self.worker_agents:
-            if worker.specialization == task_type.split("_")[0] + "_generator" or \
-               worker.specialization == task_type.split("_")[0]:
+            if worker.specialization == specialization:
                 suitable_worker = worker
                 break
         
@@ -143,6 +165,7 @@ class DelegatorAgent(LearningAgent):
             suitable_worker = self.worker_agents[0] if self.worker_agents else None
         
         if suitable_worker:
+            set_span_attribute("worker", suitable_worker.agent_id)
             return suitable_worker.execute_task(task)
         else:
             return {"error": "Uygun çalışan bulunamadı"}
@@ -151,10 +174,18 @@ class DelegatorAgent(LearningAgent):
         """
         Çalışanları koordine etme - Hafta 6: Koordinasyon
         Birden fazla görevi paralel veya sıralı olarak dağıtır
+        Üretilen sorular (ve Bloom dağılımı) sonraki analiz görevine aktarılır
+        İstek iptal edildiyse (istemci kapandı / süre doldu) kalan görevler başlatılmaz
         """
         results = []
+        quiz: Optional[Dict[str, Any]] = None
         for task in tasks:
+            check_cancelled()
+            if task.get("type") == "analyze" and quiz is not None and "questions" not in task:
+                task = {**task, "questions": quiz.get("questions", []), "bloom_distribution": quiz.get("bloom_distribution")}
             result = self.delegate_task(task)
+            if task.get("type") == "generate_questions" and isinstance(result, dict):
+                quiz = result.get("result")
             results.append(result)
         return results
 
@@ -174,6 +205,7 @@ class CoordinatorAgent(LearningAgent):
         """Delege eden etmeni ayarla - Hafta 6: Hiyerarşik Organizasyon"""
         self.delegator = delegator
     
+    @traced("coordinator.manage_process")
     def manage_process(self, goal: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Süreç yönetimi - Hafta 6: Koordinasyon
@@ -192,11 +224,13 @@ class CoordinatorAgent(LearningAgent):
         if self.delegator:
             tasks = []
             for step in plan:
-                task_type = step["task"].replace("_", "")
+                parameters = step.get("parameters", {})
                 tasks.append({
-                    "type": task_type,
+                    "type": PLAN_TASK_TYPES.get(step["task"], step["task"]),
                     "text": perceived_data.get("text", ""),
-                    "parameters": step.get("parameters", {})
+                    "parameters": parameters,
+                    # Çalışanlar soru sayısı ve zorluğu görevin üst düzeyinden okur
+                    **parameters
                 })
             
             # Delegatör görevleri çalışanlara dağıtır
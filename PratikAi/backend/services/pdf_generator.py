@@ -1,23 +1,150 @@
+import asyncio
+import copy
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import threading
+import zipfile
+from collections import OrderedDict, deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from fpdf import FPDF
-from typing import List, Dict, Any
+from fpdf.fonts import TTFFont
+from fontTools import ttLib
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Deque
 
-def create_quiz_pdf(quiz_data: List[Dict[str, Any]]) -> str:
+from services.metrics import STAGE_LATENCY, timed
+
+# Türkçe karakterler için font - backend klasöründeki DejaVuSans.ttf
+FONT_PATH = os.getenv(
+    "PDF_FONT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "DejaVuSans.ttf")
+)
+FONT_FAMILY = "DejaVu"
+
+# Öğrenci kopyası cevapsız, öğretmen kopyası cevap anahtarlıdır
+PDF_VARIANTS = ("student", "teacher")
+
+# Font dosyasının varlığı süreç başına bir kez denetlenir; eksikse her PDF'te yeniden denenmez
+_font_available: Optional[bool] = None
+
+# Font süreç başına bir kez okunur ve ayrıştırılır (karakter genişlikleri, glif kimlikleri).
+# Belgeler şablonun fpdf2'nin kendi kopyalama kuralıyla (TTFFont.__deepcopy__) alınmış kopyasını
+# kullanır; fpdf alt küme çıkarırken fontTools tablosunu değiştirdiği için her belge bu tabloyu
+# bellekteki dosyadan ayrıca açar.
+_font_lock = threading.RLock()
+_font_files: Dict[str, bytes] = {}
+_font_templates: Dict[Tuple[str, str], Optional[TTFFont]] = {}
+
+
+def _font_is_available() -> bool:
+    """Font dosyası okunabiliyorsa True; eksikse uyarı bir kez basılır."""
+    global _font_available
+    if _font_available is None:
+        _font_available = os.path.isfile(FONT_PATH)
+        if not _font_available:
+            print(f"HATA: {FONT_PATH} font dosyası bulunamadı. Lütfen backend klasörüne ekleyin.")
+    return _font_available
+
+
+def _open_ttfont(path: str) -> ttLib.TTFont:
+    """Font dosyasını süreç başına bir kez okunan baytlarından, fpdf2'nin seçenekleriyle açar."""
+    with _font_lock:
+        data = _font_files.get(path)
+        if data is None:
+            with open(path, "rb") as f:
+                data = _font_files[path] = f.read()
+    return ttLib.TTFont(io.BytesIO(data), recalcTimestamp=False, fontNumber=0, lazy=True)
+
+
+def _get_font_template(path: str, fontkey: str) -> Optional[TTFFont]:
     """
-    Verilen sınav verisinden bir PDF dosyası oluşturur ve dosya yolunu döndürür.
+    Ayrıştırılmış font şablonunu döndürür, ilk çağrıda yükler.
+    .notdef glifi olmayan fontlarda fpdf2 tabloya yedek glif çizer; yeniden açılan tablo bunu
+    taşımayacağı için bu fontlar önbelleğe alınmaz (None).
     """
-    pdf = FPDF()
+    key = (path, fontkey)
+    with _font_lock:
+        if key not in _font_templates:
+            raw = _open_ttfont(path)
+            cacheable = "glyf" not in raw or ".notdef" in raw["glyf"]
+            _font_templates[key] = TTFFont(FPDF(), path, fontkey, "") if cacheable else None
+        return _font_templates[key]
+
+
+def _font_copy_memo(fonts) -> Dict[int, Any]:
+    """
+    deepcopy için ön bellek: genişlik ve glif kimliği tabloları yalnızca tamsayı içerdiğinden
+    yüzeysel kopyaları yeterlidir (derin kopyadan ~15 kat hızlı).
+    """
+    memo: Dict[int, Any] = {}
+    for font in fonts:
+        if isinstance(font, TTFFont):
+            memo[id(font.cw)] = copy.copy(font.cw)
+            memo[id(font.glyph_ids)] = dict(font.glyph_ids)
+    return memo
+
+
+class QuizPDF(FPDF):
+    """
+    Ayrıştırılmış fontu süreç önbelleğinden alan FPDF.
+    fork() o ana kadarki düzenin bağımsız bir kopyasını verir; öğretmen kopyası öğrenci kopyasının
+    düzenini yeniden yapmadan cevap anahtarını ekler.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.forkable = True
+
+    def add_cached_font(self, family: str, path: str) -> None:
+        """add_font gibidir (normal stil), fakat fontu her belgede yeniden ayrıştırmaz."""
+        fontkey = family.lower()
+        if fontkey in self.fonts:
+            return
+        template = _get_font_template(path, fontkey)
+        if template is None:
+            self.add_font(family, "", path)
+            self.forkable = False
+            return
+        font = copy.deepcopy(template, _font_copy_memo([template]))
+        font.i = len(self.fonts) + 1
+        font.ttfont = _open_ttfont(path)
+        self.fonts[fontkey] = font
+
+    def fork(self) -> Optional["QuizPDF"]:
+        """Belgenin kopyası (fpdf2'nin FPDFRecorder'da yaptığı gibi durumun derin kopyası); kopyalanamıyorsa None."""
+        if not self.forkable:
+            return None
+        clone = copy.deepcopy(self, _font_copy_memo(self.fonts.values()))
+        for font in clone.fonts.values():
+            if isinstance(font, TTFFont):
+                font.ttfont = _open_ttfont(str(font.ttffile))
+        return clone
+
+
+def _set_document_font(pdf: QuizPDF) -> None:
+    """Türkçe karakterler için DejaVu fontunu ekler; yüklenemezse Arial'a düşer."""
+    if _font_is_available():
+        try:
+            pdf.add_cached_font(FONT_FAMILY, FONT_PATH)
+            pdf.set_font(FONT_FAMILY, '', 12)
+            return
+        except Exception as e:
+            print(f"HATA: {FONT_PATH} font dosyası yüklenemedi ({e}).")
+    pdf.set_font('Arial', '', 12)  # Hata durumunda varsayılan font
+
+
+def _layout_questions(quiz_data: List[Dict[str, Any]]) -> QuizPDF:
+    """Başlık ve soruları (cevaplar hariç) yerleştirir; öğrenci ve öğretmen kopyaları bunu paylaşır."""
+    pdf = QuizPDF()
     pdf.add_page()
-    
-    # Türkçe karakterler için fontu ekliyoruz.
-    # Bu dosyanın ana 'backend' klasöründe olduğundan emin ol.
-    try:
-        pdf.add_font('DejaVu', '', 'DejaVuSans.ttf', uni=True)
-        pdf.set_font('DejaVu', '', 12)
-    except RuntimeError:
-        print("HATA: DejaVuSans.ttf font dosyası bulunamadı. Lütfen backend klasörüne ekleyin.")
-        pdf.set_font('Arial', '', 12) # Hata durumunda varsayılan font
-    
-    pdf.cell(0, 10, 'PratikAi Sınavı', ln=True, align='C')
+
+    _set_document_font(pdf)
+
+    pdf.cell(0, 10, 'PratikAi Sınavı', new_x="LMARGIN", new_y="NEXT", align='C')
     pdf.ln(10)
 
     for i, q in enumerate(quiz_data):
@@ -26,19 +153,226 @@ def create_quiz_pdf(quiz_data: List[Dict[str, Any]]) -> str:
             pdf.multi_cell(0, 8, f"{i+1}. {q.get('raw_text')}", new_x="LMARGIN", new_y="NEXT")
             pdf.ln(10)
             continue
-        
+
         # Çoktan seçmeli soru ve şıklarını yazdır
         pdf.multi_cell(0, 8, f"{i+1}. {q.get('question', '')}", new_x="LMARGIN", new_y="NEXT")
         pdf.ln(3)
         options = q.get('options', {})
         for key, value in options.items():
             pdf.multi_cell(0, 8, f"  {key}) {value}", new_x="LMARGIN", new_y="NEXT")
-        
-        # Cevap Anahtarını ekle
-        pdf.ln(5)
-        pdf.multi_cell(0, 8, f"--> Doğru Cevap: {q.get('correct_answer', '')}", new_x="LMARGIN", new_y="NEXT")
         pdf.ln(10)
 
-    pdf_file_path = "temp_quiz.pdf"
-    pdf.output(pdf_file_path)
-    return pdf_file_path
\ No newline at end of file
+    return pdf
+
+
+def _add_answer_key(pdf: QuizPDF, quiz_data: List[Dict[str, Any]]) -> None:
+    """Öğretmen kopyası için cevap anahtarı sayfasını ekler."""
+    pdf.add_page()
+    pdf.cell(0, 10, 'Cevap Anahtarı', new_x="LMARGIN", new_y="NEXT", align='C')
+    pdf.ln(5)
+    for i, q in enumerate(quiz_data):
+        if q.get('raw_text'):
+            continue
+        pdf.multi_cell(0, 8, f"{i+1}. {q.get('correct_answer', '')}", new_x="LMARGIN", new_y="NEXT")
+
+
+def render_quiz_variants(quiz_data: List[Dict[str, Any]], variants: Tuple[str, ...] = PDF_VARIANTS) -> Dict[str, bytes]:
+    """
+    İstenen kopyaları ("student": cevapsız, "teacher": sonda cevap anahtarı sayfalı) üretir.
+    Sorular bir kez yerleştirilir; iki kopya isteniyorsa öğretmen kopyası bu düzenin kopyasına
+    cevap anahtarını ekler.
+    """
+    body = _layout_questions(quiz_data)
+    documents = {}
+    for variant in variants:
+        pdf = body if len(documents) == len(variants) - 1 else body.fork()
+        if pdf is None:
+            pdf = _layout_questions(quiz_data)
+        if variant == "teacher":
+            _add_answer_key(pdf, quiz_data)
+        documents[variant] = pdf
+    return {variant: bytes(pdf.output()) for variant, pdf in documents.items()}
+
+
+@timed(STAGE_LATENCY, "create_quiz_pdf")
+def create_quiz_pdf(quiz_data: List[Dict[str, Any]], include_answers: bool = True) -> bytes:
+    """
+    Verilen sınav verisinden bellekte bir PDF oluşturur ve baytlarını döndürür.
+    Diske yazmadığı için eşzamanlı isteklerde güvenlidir.
+    include_answers=True ise sona cevap anahtarı eklenir (öğretmen kopyası).
+    """
+    variant = "teacher" if include_answers else "student"
+    return render_quiz_variants(quiz_data, (variant,))[variant]
+
+
+# --- ÖNBELLEK VE TOPLU DIŞA AKTARMA ---
+
+def quiz_cache_key(quiz_data: List[Dict[str, Any]]) -> str:
+    """Sınav verisinin kanonik JSON gösteriminden SHA-256 anahtarı üretir (anahtar sırası önemsiz)."""
+    canonical = json.dumps(quiz_data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class RenderedPDFCache:
+    """
+    Üretilmiş PDF'ler için bayt sınırlı LRU önbellek.
+    Anahtar: (sınav verisi hash'i, kopya tipi)
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[bytes]:
+        with self._lock:
+            data = self._items.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: Tuple[str, str], data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._items[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"items": len(self._items), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+
+_pdf_cache = RenderedPDFCache(int(os.getenv("PDF_CACHE_MAX_MB", "64")) * 1024 * 1024)
+
+# Render CPU yoğun saf Python işidir; GIL'e takılmamak için ayrı süreçlerde çalışır.
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_pool_lock = threading.Lock()
+
+
+def _get_render_pool() -> ProcessPoolExecutor:
+    """Render süreç havuzunu al veya oluştur"""
+    global _render_pool
+    if _render_pool is None:
+        with _render_pool_lock:
+            if _render_pool is None:
+                # spawn: çok thread'li sunucu sürecini fork etmekten kaçın
+                _render_pool = ProcessPoolExecutor(
+                    max_workers=PDF_RENDER_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _render_pool
+
+
+def _reset_render_pool() -> None:
+    """Çökmüş render havuzunu bırak"""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown(wait=False, cancel_futures=True)
+        _render_pool = None
+
+
+def get_pdf_cache() -> RenderedPDFCache:
+    """PDF önbelleğini döndür"""
+    return _pdf_cache
+
+
+@timed(STAGE_LATENCY, "get_quiz_pdfs")
+async def get_quiz_pdfs(quiz_data: List[Dict[str, Any]], variants: Tuple[str, ...] = PDF_VARIANTS) -> Dict[str, bytes]:
+    """
+    İstenen kopyaları önce önbellekten alır, eksik olanları render havuzunda tek seferde üretir.
+    """
+    key = quiz_cache_key(quiz_data)
+    rendered = {}
+    missing = []
+    for variant in variants:
+        data = _pdf_cache.get((key, variant))
+        if data is None:
+            missing.append(variant)
+        else:
+            rendered[variant] = data
+
+    if missing:
+        loop = asyncio.get_running_loop()
+        try:
+            fresh = await loop.run_in_executor(_get_render_pool(), render_quiz_variants, quiz_data, tuple(missing))
+        except BrokenProcessPool as e:
+            # Çöken havuz bir sonraki istekte yeniden kurulur; bu istek thread'de tamamlanır
+            print(f"⚠️ PDF render havuzu çöktü, yeniden başlatılacak: {e}")
+            _reset_render_pool()
+            fresh = await loop.run_in_executor(None, render_quiz_variants, quiz_data, tuple(missing))
+        for variant, data in fresh.items():
+            _pdf_cache.put((key, variant), data)
+        rendered.update(fresh)
+
+    return {variant: rendered[variant] for variant in variants}
+
+
+class _ZipStreamBuffer(io.RawIOBase):
+    """ZipFile'ın yazdığı baytları biriktirip parça parça dışarı veren, geri sarılamayan tampon."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def stream_quiz_zip(quizzes: List[List[Dict[str, Any]]], variants: Tuple[str, ...] = PDF_VARIANTS) -> AsyncIterator[bytes]:
+    """
+    Sınavları render havuzunda paralel üretir ve ZIP arşivini sırayla, her PDF hazır oldukça
+    parça parça akıtır. Tüm arşiv hiçbir zaman bellekte tutulmaz.
+    """
+    variant_names = {"student": "ogrenci", "teacher": "ogretmen"}
+    # Bellekte bekleyen PDF sayısını sınırlamak için kayan pencere; ZIP'e sırayla yazılır
+    window = max(1, PDF_RENDER_WORKERS * 2)
+    queued = iter(enumerate(quizzes, start=1))
+    pending: Deque[Tuple[int, asyncio.Future]] = deque()
+
+    def schedule():
+        for index, quiz in islice(queued, window - len(pending)):
+            pending.append((index, asyncio.ensure_future(get_quiz_pdfs(quiz, variants))))
+
+    buffer = _ZipStreamBuffer()
+    try:
+        schedule()
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+            while pending:
+                index, task = pending.popleft()
+                pdfs = await task
+                schedule()
+                for variant in variants:
+                    archive.writestr(f"sinav_{index:03d}_{variant_names[variant]}.pdf", pdfs[variant])
+                yield buffer.drain()
+        yield buffer.drain()
+    finally:
+        for _, task in pending:
+            task.cancel()
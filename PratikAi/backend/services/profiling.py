@@ -0,0 +1,231 @@
+"""
+İstek Profilleme - Üretimde tek bir yavaş isteğin profilini çıkarmak için isteğe bağlı middleware
+Profil iki yolla tetiklenir:
+  1. İmzalı başlık: X-Profile-Token: <son geçerlilik (unix)>:<HMAC-SHA256(PROFILE_SECRET, son geçerlilik)>
+  2. Örnekleme: isteklerin PROFILE_SAMPLE_RATE oranı (varsayılan 0)
+Tetiklenmeyen isteklerde profilleyici hiç çalışmaz; maliyet bir başlık araması ve bir rastgele sayıdır.
+
+İki mod vardır (X-Profile-Mode başlığı veya PROFILE_MODE):
+  - "sample" (varsayılan): arka plan thread'i PROFILE_INTERVAL_MS aralıkla olay döngüsü ve meşgul
+    thread havuzu thread'lerinin yığınlarını örnekler; senkron endpoint'ler de yakalanır.
+    Çıktı: katlanmış yığınlar (flamegraph formatı) + en çok zaman alan fonksiyonlar (JSON).
+    Aynı anda çalışan başka istekler de örneklere karışabilir; düşük trafikte en nettir.
+  - "cprofile": olay döngüsü thread'inde deterministik cProfile; yalnızca async kod yakalanır.
+    Çıktı: pstats dosyası (snakeviz / python -m pstats ile açılır).
+Profil dosyaları PROFILE_DIR'e yazılır, en yeni PROFILE_MAX_FILES dosya tutulur;
+profil kimliği yanıtın X-Profile-Id başlığında döner.
+"""
+
+import cProfile
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+PROFILE_SECRET = os.getenv("PROFILE_SECRET", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sample").lower()
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "profiles")
+)
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+
+TOKEN_HEADER = b"x-profile-token"
+MODE_HEADER = b"x-profile-mode"
+PROFILE_MODES = ("sample", "cprofile")
+
+# Bu dosyalardaki yaprak çerçeveler bekleme sayılır (boştaki thread'ler örneklenmez)
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+_TOP_FUNCTIONS = 25
+
+
+def make_profile_token(secret: str = PROFILE_SECRET, ttl_seconds: int = 600) -> str:
+    """Geçerlilik süresi sınırlı imzalı profil başlığı üretir (destek ekibinin kullanması için)"""
+    expires = str(int(time.time()) + ttl_seconds)
+    signature = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return f"{expires}:{signature}"
+
+
+def verify_profile_token(token: str, secret: str = PROFILE_SECRET) -> bool:
+    """İmzayı ve süreyi doğrular; PROFILE_SECRET tanımlı değilse başlık hiçbir zaman geçerli değildir"""
+    if not secret or ":" not in token:
+        return False
+    expires, signature = token.split(":", 1)
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def _frame_label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}"
+
+
+class StackSampler:
+    """
+    sys._current_frames() ile periyodik yığın örnekleyici.
+    Yaprak çerçevesi bekleme kodunda (select, kuyruk, kilit) olan thread'ler atlanır;
+    böylece yalnızca iş yapan olay döngüsü ve havuz thread'leri sayılır.
+    """
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000.0
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="profile-sampler")
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                key = ";".join(reversed(labels))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+                self.samples += 1
+
+    def top_functions(self, limit: int = _TOP_FUNCTIONS) -> List[Dict[str, Any]]:
+        """Fonksiyon başına öz (self) ve toplam örnek sayısı, toplam örneğe göre sıralı"""
+        own: Dict[str, int] = {}
+        total: Dict[str, int] = {}
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] = own.get(frames[-1], 0) + count
+            for label in set(frames):
+                total[label] = total.get(label, 0) + count
+        ranked = sorted(total, key=lambda label: (-total[label], -own.get(label, 0)))[:limit]
+        return [{"function": label, "self": own.get(label, 0), "total": total[label]} for label in ranked]
+
+
+def _rotate(directory: str, keep: int):
+    """En yeni keep dosya dışındakileri siler"""
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+    entries.sort(reverse=True)
+    for _, path in entries[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class ProfilingMiddleware:
+    """
+    Tetiklenen istekleri profilleyen ASGI middleware.
+    Aynı anda yalnızca bir istek profillenir; meşgulken gelen tetikler profilsiz çalışır.
+    """
+
+    def __init__(self, app, directory: str = PROFILE_DIR, sample_rate: float = PROFILE_SAMPLE_RATE,
+                 secret: str = PROFILE_SECRET, max_files: int = PROFILE_MAX_FILES):
+        self.app = app
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.secret = secret
+        self.max_files = max_files
+        self._busy = threading.Lock()
+
+    def _should_profile(self, scope) -> Tuple[bool, Optional[str]]:
+        headers = dict(scope.get("headers") or [])
+        token = headers.get(TOKEN_HEADER)
+        if token is not None:
+            if verify_profile_token(token.decode("latin-1"), self.secret):
+                mode = headers.get(MODE_HEADER, b"").decode("latin-1").lower() or PROFILE_MODE
+                return True, mode if mode in PROFILE_MODES else PROFILE_MODE
+            print(f"⚠️ Geçersiz profil imzası: {scope.get('path')}")
+            return False, None
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return True, PROFILE_MODE
+        return False, None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        triggered, mode = self._should_profile(scope)
+        if not triggered or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.urandom(3).hex()}"
+        status = 500
+
+        async def tagged_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        sampler = profiler = None
+        started = time.perf_counter()
+        try:
+            if mode == "cprofile":
+                profiler = cProfile.Profile()
+                profiler.enable()
+            else:
+                sampler = StackSampler()
+                sampler.start()
+            await self.app(scope, receive, tagged_send)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            if sampler is not None:
+                sampler.stop()
+            duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            try:
+                self._write(profile_id, mode, scope, status, duration_ms, sampler, profiler)
+            except Exception as e:
+                print(f"⚠️ Profil yazılamadı: {e}")
+            finally:
+                self._busy.release()
+
+    def _write(self, profile_id: str, mode: str, scope, status: int, duration_ms: float,
+               sampler: Optional[StackSampler], profiler: Optional[cProfile.Profile]):
+        os.makedirs(self.directory, exist_ok=True)
+        if profiler is not None:
+            path = os.path.join(self.directory, f"{profile_id}.prof")
+            profiler.dump_stats(path)
+        else:
+            path = os.path.join(self.directory, f"{profile_id}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "profile_id": profile_id,
+                    "mode": mode,
+                    "method": scope.get("method"),
+                    "path": scope.get("path"),
+                    "status": status,
+                    "duration_ms": duration_ms,
+                    "interval_ms": PROFILE_INTERVAL_MS,
+                    "samples": sampler.samples,
+                    "top_functions": sampler.top_functions(),
+                    # "yığın;yığın;yaprak sayı" satırları flamegraph.pl / speedscope ile açılır
+                    "folded": [f"{stack} {count}" for stack, count in sorted(sampler.stacks.items(), key=lambda kv: -kv[1])],
+                }, f, ensure_ascii=False)
+        _rotate(self.directory, self.max_files)
+        print(f"🔄 Profil yazıldı: {path} ({scope.get('method')} {scope.get('path')}, {duration_ms} ms)")
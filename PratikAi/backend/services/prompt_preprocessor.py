@@ -0,0 +1,239 @@
+"""
+İstem Ön İşleme - Gemini'ye gönderilen metnin küçültülmesi
+1. Boşluk normalizasyonu: satır sonu tirelemeleri birleştirilir, yumuşak satır kırılımları
+   boşluğa çevrilir, boşluk dizileri teke indirilir.
+2. Şablon (boilerplate) temizliği: sayfaların üst/alt kenarında tekrar eden sayfa başlıkları,
+   slayt altbilgileri ve sayfa numaraları silinir. Sayfa yapısı olmayan metne dokunulmaz.
+3. İsteğe bağlı pasaj seçimi: metin token bütçesini aşıyorsa belge merkezine en yakın
+   (en bilgilendirici) pasajlar bütçe dolana kadar seçilir; bütçe soru sayısıyla ölçeklenir.
+"""
+
+import math
+import os
+import re
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from services.text_analysis import split_sentences, tokenize, tfidf_matrix, centroid_scores
+from services.usage_accounting import estimate_tokens
+
+# PDF sayfaları bu karakterle birleştirilir (file_processor); şablon tespiti sayfa bazında yapılır
+PAGE_BREAK = "\f"
+
+PROMPT_PREPROCESS_ENABLED = os.getenv("PROMPT_PREPROCESS_ENABLED", "true").lower() == "true"
+# Pasaj seçimi varsayılan olarak kapalı; açıkken metin bütçeyi aşarsa uygulanır
+PROMPT_PASSAGE_SELECTION = os.getenv("PROMPT_PASSAGE_SELECTION", "false").lower() == "true"
+# Soru istemi bütçesi = taban + soru başına pay (token), üst sınırla
+PROMPT_BASE_TOKENS = int(os.getenv("PROMPT_BASE_TOKENS", "1500"))
+PROMPT_TOKENS_PER_QUESTION = int(os.getenv("PROMPT_TOKENS_PER_QUESTION", "600"))
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "30000"))
+# Özet isteminin bütçesi (soru sayısı yok)
+PROMPT_SUMMARY_TOKENS = int(os.getenv("PROMPT_SUMMARY_TOKENS", "8000"))
+
+# Şablon satırı: en fazla bu kadar kelime, en az bu kadar kez ve sayfaların bu oranında tekrar eder
+BOILERPLATE_MAX_WORDS = 12
+BOILERPLATE_MIN_REPEATS = 3
+BOILERPLATE_MIN_PAGE_RATIO = 0.3
+# Başlık/altbilgi yalnızca sayfanın ilk ve son bu kadar dolu satırında aranır
+BOILERPLATE_EDGE_LINES = 3
+# Pasajlar ardışık cümlelerden yaklaşık bu uzunlukta oluşturulur
+PASSAGE_WORDS = 120
+# Seçilmiş bir pasaja bundan daha benzer pasajlar tekrar sayılır
+PASSAGE_REDUNDANCY = 0.9
+
+_HYPHENATION_RE = re.compile(r"(\w)-\n(?=[a-zçğıöşü])")
+_INLINE_SPACE_RE = re.compile(r"[ \t\r\v\u00a0\u200b]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n")
+_DIGITS_RE = re.compile(r"\d+")
+_PAGE_NUMBER_RE = re.compile(r"^(?:sayfa|page|s\.)?\s*\d+(?:\s*(?:/|of|-)\s*\d+)?$", re.IGNORECASE)
+_SENTENCE_END = (".", "!", "?", ":", "…")
+
+
+def prompt_token_budget(num_questions: Optional[int] = None) -> int:
+    """Soru sayısına göre ölçeklenen metin bütçesi (token); None ise özet bütçesi"""
+    if num_questions is None:
+        return PROMPT_SUMMARY_TOKENS
+    return min(PROMPT_MAX_TOKENS, PROMPT_BASE_TOKENS + PROMPT_TOKENS_PER_QUESTION * max(1, num_questions))
+
+
+def _line_key(line: str) -> str:
+    """Sayfa numarası farkları yok sayılır ("Sayfa 3" ile "Sayfa 4" aynı şablondur)"""
+    return _DIGITS_RE.sub("#", line.lower())
+
+
+def _is_repeat_candidate(line: str) -> bool:
+    """Tekrar kuralına yalnızca harf içeren kısa satırlar girer (sayı satırları tablo içeriği olabilir)"""
+    return len(line.split()) <= BOILERPLATE_MAX_WORDS and any(ch.isalpha() for ch in line)
+
+
+def _edge_lines(lines: List[str], count: int) -> List[int]:
+    """Sayfanın ilk ve son count dolu satırının indeksleri"""
+    filled = [i for i, line in enumerate(lines) if line]
+    return sorted(set(filled[:count] + filled[-count:]))
+
+
+def remove_boilerplate(pages: List[List[str]]) -> Tuple[List[List[str]], int]:
+    """
+    Sayfaların kenarında tekrar eden kısa satırları (başlık/altbilgi) ve sayfanın ilk/son satırı olan
+    sayfa numaralarını siler. Sayfa içindeki satırlara ve sayfa yapısı olmayan (tek sayfalı) metne
+    dokunulmaz; "Soru 1", "Evet" gibi tekrar eden içerik satırları korunur.
+    Boş satırlar (paragraf sınırları) sayılmaz ve korunur.
+
+    Args:
+        pages: Sayfa başına boşlukları temizlenmiş satırlar
+    Returns:
+        (temizlenmiş sayfalar, silinen satır sayısı)
+    """
+    if len(pages) < 2:
+        return pages, 0
+
+    page_counts: Dict[str, int] = {}
+    for lines in pages:
+        seen = set()
+        for i in _edge_lines(lines, BOILERPLATE_EDGE_LINES):
+            if not _is_repeat_candidate(lines[i]):
+                continue
+            key = _line_key(lines[i])
+            if key not in seen:
+                seen.add(key)
+                page_counts[key] = page_counts.get(key, 0) + 1
+
+    min_pages = max(BOILERPLATE_MIN_REPEATS, math.ceil(len(pages) * BOILERPLATE_MIN_PAGE_RATIO))
+    boilerplate = {key for key, count in page_counts.items() if count >= min_pages}
+
+    removed = 0
+    cleaned = []
+    for lines in pages:
+        drop = {
+            i for i in _edge_lines(lines, BOILERPLATE_EDGE_LINES)
+            if _is_repeat_candidate(lines[i]) and _line_key(lines[i]) in boilerplate
+        }
+        # Tek başına sayı satırı yalnızca sayfanın ilk veya son satırıysa sayfa numarası sayılır
+        drop.update(i for i in _edge_lines(lines, 1) if _PAGE_NUMBER_RE.match(lines[i]))
+        removed += len(drop)
+        cleaned.append([line for i, line in enumerate(lines) if i not in drop])
+    return cleaned, removed
+
+
+def _split_lines(page: str) -> List[str]:
+    """Sayfayı satırlara böler; paragraf araları boş satır ("") olarak korunur"""
+    page = _HYPHENATION_RE.sub(r"\1", page)
+    page = _BLANK_LINES_RE.sub("\n\n", page)
+    return [_INLINE_SPACE_RE.sub(" ", line).strip() for line in page.split("\n")]
+
+
+def _join_lines(lines: List[str]) -> List[str]:
+    """Yumuşak satır kırılımlarını birleştirerek paragrafları döndürür"""
+    paragraphs = []
+    current: List[str] = []
+    for line in lines:
+        if not line:
+            if current:
+                paragraphs.append(" ".join(current))
+                current = []
+            continue
+        current.append(line)
+        # Noktalama ile bitmeyen kısa satırlar (başlıklar) kendi paragrafıdır
+        if len(current) == 1 and len(line.split()) <= 6 and not line.endswith(_SENTENCE_END) and line[:1].isupper():
+            paragraphs.append(line)
+            current = []
+    if current:
+        paragraphs.append(" ".join(current))
+    return paragraphs
+
+
+def clean_text(text: str) -> Tuple[str, int]:
+    """
+    Boşluk normalizasyonu ve şablon temizliği.
+    Returns: (paragrafları boş satırla ayrılmış metin, silinen şablon satırı sayısı)
+    """
+    pages, removed = remove_boilerplate([_split_lines(page) for page in text.split(PAGE_BREAK)])
+    paragraphs = []
+    for lines in pages:
+        paragraphs.extend(_join_lines(lines))
+    return "\n\n".join(paragraphs), removed
+
+
+def _passages(paragraphs: List[str]) -> List[str]:
+    """Paragrafları en fazla PASSAGE_WORDS kelimelik ardışık cümle gruplarına böler"""
+    passages = []
+    for paragraph in paragraphs:
+        chunk: List[str] = []
+        words = 0
+        for sentence in split_sentences(paragraph) or [paragraph]:
+            length = len(sentence.split())
+            if chunk and words + length > PASSAGE_WORDS:
+                passages.append(" ".join(chunk))
+                chunk, words = [], 0
+            chunk.append(sentence)
+            words += length
+        if chunk:
+            passages.append(" ".join(chunk))
+    return passages
+
+
+def select_passages(text: str, token_budget: int) -> Tuple[str, Dict[str, int]]:
+    """
+    Bütçeyi aşan metinden en bilgilendirici pasajları seçer (orijinal sırayla).
+    Pasajlar TF-IDF uzayında belge merkezine benzerliğe göre sıralanır; seçilmiş bir
+    pasajın neredeyse aynısı olan pasajlar atlanır.
+
+    Returns:
+        (seçilen metin, {"passages", "selected"})
+    """
+    passages = _passages([p for p in text.split("\n\n") if p.strip()])
+    tokens = [tokenize(p) for p in passages]
+    candidates = [i for i, t in enumerate(tokens) if t]
+    if not candidates:
+        return text, {"passages": len(passages), "selected": len(passages)}
+
+    vectors, _ = tfidf_matrix([tokens[i] for i in candidates])
+    scores = centroid_scores(vectors)
+
+    chosen: List[int] = []
+    used = 0
+    for rank in np.argsort(-scores, kind="stable"):
+        cost = estimate_tokens(passages[candidates[rank]])
+        if used + cost > token_budget:
+            continue
+        if chosen and float(np.max(vectors[chosen] @ vectors[rank])) > PASSAGE_REDUNDANCY:
+            continue
+        chosen.append(int(rank))
+        used += cost
+        if used >= token_budget:
+            break
+
+    selected = sorted(candidates[i] for i in chosen)
+    return "\n\n".join(passages[i] for i in selected), {"passages": len(passages), "selected": len(selected)}
+
+
+def prepare_prompt_text(text: str, num_questions: Optional[int] = None,
+                        select: Optional[bool] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    İsteme girecek metni hazırlar.
+
+    Args:
+        text: Ham metin (PDF sayfaları PAGE_BREAK ile ayrılmış olabilir)
+        num_questions: Soru sayısı (bütçe için); None ise özet bütçesi kullanılır
+        select: Pasaj seçimi; None ise PROMPT_PASSAGE_SELECTION
+    Returns:
+        (hazırlanmış metin, {"original_tokens", "tokens", "boilerplate_lines", "budget", "passages", "selected"})
+    """
+    original_tokens = estimate_tokens(text)
+    report: Dict[str, Any] = {"original_tokens": original_tokens, "tokens": original_tokens, "boilerplate_lines": 0}
+    if not PROMPT_PREPROCESS_ENABLED or not text:
+        return text, report
+
+    cleaned, removed = clean_text(text)
+    report["boilerplate_lines"] = removed
+
+    if PROMPT_PASSAGE_SELECTION if select is None else select:
+        budget = prompt_token_budget(num_questions)
+        report["budget"] = budget
+        if estimate_tokens(cleaned) > budget:
+            cleaned, selection = select_passages(cleaned, budget)
+            report.update(selection)
+
+    report["tokens"] = estimate_tokens(cleaned)
+    return cleaned, report
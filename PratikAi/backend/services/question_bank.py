@@ -0,0 +1,308 @@
+"""
+Soru Bankası - Üretilen soruların kalıcı saklanması ve yeniden kullanımı
+Sorular kaynak belge özeti (hash), soru tipi, zorluk ve Bloom düzeyine göre indekslenir.
+Eklemede MinHash/LSH ile neredeyse aynı (near-duplicate) sorular elenir; kopya başka bir
+kaynağa aitse mevcut kayıt bu kaynağa da bağlanır (bank_first aramasında bulunur).
+
+Kalıcılık SQLite ile sağlanır; aramalar bellekteki indeks üzerinden yapılır.
+"""
+
+import gc
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from services.text_analysis import turkish_lower
+
+QUESTION_BANK_ENABLED = os.getenv("QUESTION_BANK_ENABLED", "true").lower() == "true"
+QUESTION_BANK_PATH = os.getenv(
+    "QUESTION_BANK_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "question_bank.db")
+)
+# Tahmini Jaccard benzerliği bu eşiğin üzerindeyse soru kopya sayılır
+DUPLICATE_THRESHOLD = float(os.getenv("QUESTION_BANK_DUPLICATE_THRESHOLD", "0.7"))
+
+# MinHash imzası: 64 permütasyon, LSH için 16 bant x 4 satır (~0.5 benzerlikte aday üretir)
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+_LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Sabit tohum: imzalar yeniden başlatmalar arasında karşılaştırılabilir kalmalı
+_rng = np.random.RandomState(20240601)
+_HASH_A = _rng.randint(1, (1 << 61) - 1, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_HASH_B = _rng.randint(0, (1 << 61) - 1, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+_NORMALIZE_RE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def _normalize(text: str) -> str:
+    """Küçük harf, noktalama yerine tek boşluk"""
+    return _NORMALIZE_RE.sub(" ", turkish_lower(text)).strip()
+
+
+def source_hash(text: str) -> str:
+    """Kaynak belgenin biçimden bağımsız özeti (boşluk/noktalama/harf farkları yok sayılır)"""
+    return hashlib.sha256(_normalize(text).encode("utf-8")).hexdigest()
+
+
+def _question_signature_text(question: Dict[str, Any]) -> str:
+    """Kopya tespitinde soru metni ve şıklar birlikte karşılaştırılır"""
+    options = question.get("options") or {}
+    return _normalize(question.get("question", "") + " " + " ".join(str(v) for v in options.values()))
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """
+    Kelime ve kelime ikililerinin (bigram) MinHash imzası (uint64, MINHASH_PERMUTATIONS uzunluğunda).
+    Tek kelimesi değişen bir soru (şıklarıyla birlikte) ~0.7-0.9 benzerlikte kalır; ilgisiz iki soru ~0'dır.
+    """
+    words = text.split() or [""]
+    shingles = set(words)
+    shingles.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # ((a * x + b) mod p) & (2^32 - 1); uint64 taşması kasıtlıdır, permütasyonları karıştırır
+    with np.errstate(over="ignore"):
+        permuted = ((_HASH_A[:, None] * hashes[None, :] + _HASH_B[:, None]) % _MERSENNE_PRIME) & _MAX_HASH
+    return permuted.min(axis=1)
+
+
+def _band_keys(signatures: np.ndarray) -> np.ndarray:
+    """
+    İmza(lar)ı LSH bant anahtarlarına böler: [..., LSH_BANDS] boyutlu bytes dizisi.
+    Her bant tek bir sabit uzunluklu bytes görünümüdür; satır satır kopyalama yapılmaz.
+    """
+    shaped = np.ascontiguousarray(signatures).reshape(signatures.shape[:-1] + (LSH_BANDS, _LSH_ROWS))
+    return shaped.view(f"S{_LSH_ROWS * 8}")[..., 0]
+
+
+class QuestionBank:
+    """
+    Kalıcı soru bankası.
+    Tüm kayıtlar açılışta belleğe yüklenir; (kaynak, tip, zorluk) ve (kaynak, tip, zorluk, Bloom düzeyi)
+    indeksleri ile LSH bantları sözlüklerde tutulur, SQLite yalnızca kalıcılık içindir.
+    """
+
+    def __init__(self, path: str = QUESTION_BANK_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._records: Dict[int, Dict[str, Any]] = {}
+        # İmzalar tek matriste tutulur (satır = kayıt); adaylar tek numpy işlemiyle karşılaştırılır
+        self._signatures = np.zeros((1024, MINHASH_PERMUTATIONS), dtype=np.uint64)
+        self._row_ids: List[int] = []
+        self._index: Dict[Tuple[str, str, str], List[int]] = {}
+        # Bloom düzeyine göre alt indeks: düzey filtreli aramalar tüm grubu taramaz
+        self._level_index: Dict[Tuple[str, str, str, Optional[str]], List[int]] = {}
+        # Bant başına bir sözlük: bant anahtarı -> imza matrisi satırları
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(LSH_BANDS)]
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL: her istekteki commit tüm dosyayı senkronlamaz
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS questions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source_hash TEXT NOT NULL,
+                question_type TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                bloom_level TEXT,
+                payload TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_questions_lookup ON questions (source_hash, question_type, difficulty)"
+        )
+        # Başka bir kaynakta kopyası bulunan sorular için ek (kaynak, tip, zorluk) bağlantıları
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS question_sources (
+                question_id INTEGER NOT NULL,
+                source_hash TEXT NOT NULL,
+                question_type TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                PRIMARY KEY (source_hash, question_type, difficulty, question_id)
+            )
+        """)
+        self._conn.commit()
+        self._load()
+
+    def _load(self):
+        """Kayıtları ve imzaları belleğe yükle (imzalar ve bant anahtarları toplu hesaplanır)"""
+        rows = self._conn.execute(
+            "SELECT id, source_hash, question_type, difficulty, bloom_level, payload, signature FROM questions ORDER BY id"
+        ).fetchall()
+        if not rows:
+            return
+        signatures = np.frombuffer(b"".join(row[6] for row in rows), dtype=np.uint64).reshape(len(rows), MINHASH_PERMUTATIONS)
+        self._signatures = np.concatenate([signatures, np.zeros((1024, MINHASH_PERMUTATIONS), dtype=np.uint64)])
+        band_keys = _band_keys(signatures).tolist()
+        # Yüz binlerce küçük liste/sözlük oluşturulurken çöp toplayıcı yükleme süresini ikiye katlar
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for row, (row_id, src, qtype, difficulty, bloom_level, payload, _) in enumerate(rows):
+                self._index_record(row, row_id, src, qtype, difficulty, bloom_level, json.loads(payload), band_keys[row])
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        for question_id, src, qtype, difficulty in self._conn.execute(
+            "SELECT question_id, source_hash, question_type, difficulty FROM question_sources ORDER BY rowid"
+        ):
+            if question_id in self._records:
+                self._add_to_index((src, qtype, difficulty), question_id)
+        print(f"✅ Soru bankası yüklendi: {len(self._records)} soru")
+
+    def _index_record(self, row: int, row_id: int, src: str, qtype: str, difficulty: str,
+                      bloom_level: Optional[str], question: Dict[str, Any], band_keys: List[bytes]):
+        self._row_ids.append(row_id)
+        self._records[row_id] = {"id": row_id, "source_hash": src, "bloom_level": bloom_level, "question": question}
+        self._add_to_index((src, qtype, difficulty), row_id)
+        for buckets, key in zip(self._buckets, band_keys):
+            buckets.setdefault(key, []).append(row)
+
+    def _add_to_index(self, key: Tuple[str, str, str], row_id: int):
+        """Kaydı grup indeksine ve kaydın Bloom düzeyiyle alt indekse ekler"""
+        self._index.setdefault(key, []).append(row_id)
+        self._level_index.setdefault(key + (self._records[row_id]["bloom_level"],), []).append(row_id)
+
+    def _remember(self, row_id: int, src: str, qtype: str, difficulty: str, bloom_level: Optional[str],
+                  question: Dict[str, Any], signature: np.ndarray):
+        row = len(self._row_ids)
+        if row == len(self._signatures):
+            self._signatures = np.concatenate([self._signatures, np.zeros_like(self._signatures)])
+        self._signatures[row] = signature
+        self._index_record(row, row_id, src, qtype, difficulty, bloom_level, question, _band_keys(signature).tolist())
+
+    def find_duplicate(self, signature: np.ndarray) -> Optional[int]:
+        """LSH adayları arasında tahmini benzerliği eşiği aşan en benzer kaydın id'si"""
+        candidates = set()
+        for buckets, key in zip(self._buckets, _band_keys(signature).tolist()):
+            candidates.update(buckets.get(key, ()))
+        if not candidates:
+            return None
+        rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarity = (self._signatures[rows] == signature).mean(axis=1)
+        best = int(np.argmax(similarity))
+        if similarity[best] >= DUPLICATE_THRESHOLD:
+            return self._row_ids[rows[best]]
+        return None
+
+    def _link(self, row_id: int, src: str, question_type: str, difficulty: str):
+        """Mevcut kaydı bu kaynağın aramalarına ekler (kayıt zaten bu kaynaktaysa bir şey yapmaz)"""
+        key = (src, question_type, difficulty)
+        if row_id in self._index.get(key, ()):
+            return
+        self._add_to_index(key, row_id)
+        self._conn.execute(
+            "INSERT OR IGNORE INTO question_sources (question_id, source_hash, question_type, difficulty) VALUES (?, ?, ?, ?)",
+            (row_id, src, question_type, difficulty)
+        )
+
+    def add_questions(self, src: str, questions: List[Dict[str, Any]], question_type: str, difficulty: str,
+                      levels: Optional[List[Optional[str]]] = None) -> Dict[str, Any]:
+        """
+        Soruları bankaya ekler; bankadaki (veya aynı gruptaki) bir soruya çok benzeyenler atlanır.
+
+        Args:
+            src: source_hash() ile üretilmiş kaynak belge özeti
+            levels: Sorularla hizalı Bloom düzeyleri (zaten sınıflandırıldıysa); verilmezse burada sınıflandırılır
+
+        Returns:
+            {"added": eklenen, "duplicates": atlanan,
+             "bank_ids": her soru için eklenen ya da benzediği kaydın id'si (yapısal değilse None)}
+        """
+        structured = [i for i, q in enumerate(questions) if q.get("question") and q.get("options")]
+        if levels is None:
+            from services.bloom_analyzer import classify_questions
+            levels = classify_questions([questions[i] for i in structured])
+        else:
+            levels = [levels[i] for i in structured]
+        bank_ids: List[Optional[int]] = [None] * len(questions)
+        added = duplicates = 0
+        now = datetime.now().isoformat()
+        with self._lock:
+            for index, level in zip(structured, levels):
+                question = questions[index]
+                signature = minhash_signature(_question_signature_text(question))
+                duplicate_id = self.find_duplicate(signature)
+                if duplicate_id is not None:
+                    self._link(duplicate_id, src, question_type, difficulty)
+                    bank_ids[index] = duplicate_id
+                    duplicates += 1
+                    continue
+                payload = {k: question[k] for k in ("question", "options", "correct_answer") if k in question}
+                cursor = self._conn.execute(
+                    "INSERT INTO questions (source_hash, question_type, difficulty, bloom_level, payload, signature, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (src, question_type, difficulty, level, json.dumps(payload, ensure_ascii=False),
+                     signature.tobytes(), now)
+                )
+                self._remember(cursor.lastrowid, src, question_type, difficulty, level, payload, signature)
+                bank_ids[index] = cursor.lastrowid
+                added += 1
+            self._conn.commit()
+        return {"added": added, "duplicates": duplicates, "bank_ids": bank_ids}
+
+    def find_questions(
+        self,
+        src: str,
+        question_type: str,
+        difficulty: str,
+        limit: int,
+        bloom_level: Optional[str] = None,
+        exclude_ids: Optional[set] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Kaynak/tip/zorluk için bankadaki soruları döndürür (ekleme sırasıyla).
+        Her soru "bank_id" alanını taşır; sonuçlar kopyadır, değiştirmek bankayı etkilemez.
+        bloom_level verilirse yalnızca o düzeyin alt indeksi taranır.
+        """
+        key = (src, question_type, difficulty)
+        row_ids = self._level_index.get(key + (bloom_level,), ()) if bloom_level else self._index.get(key, ())
+        results = []
+        for row_id in row_ids:
+            if len(results) >= limit:
+                break
+            if exclude_ids and row_id in exclude_ids:
+                continue
+            question = dict(self._records[row_id]["question"])
+            question["bank_id"] = row_id
+            results.append(question)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Banka boyutu ve Bloom düzeyi dağılımı"""
+        levels: Dict[str, int] = {}
+        for record in self._records.values():
+            level = record["bloom_level"] or "belirsiz"
+            levels[level] = levels.get(level, 0) + 1
+        return {"questions": len(self._records), "sources": len({r["source_hash"] for r in self._records.values()}),
+                "bloom_levels": levels}
+
+
+# Global soru bankası instance
+_question_bank: Optional[QuestionBank] = None
+_question_bank_lock = threading.Lock()
+
+
+def get_question_bank() -> QuestionBank:
+    """Soru bankasını al veya oluştur (eşzamanlı ilk istekler tek bir banka yükler)"""
+    global _question_bank
+    if _question_bank is None:
+        with _question_bank_lock:
+            if _question_bank is None:
+                _question_bank = QuestionBank()
+    return _question_bank
@@ -0,0 +1,253 @@
+"""
+İstek Bağlamı - Her HTTP isteğinin kullanıcı ve endpoint bilgisini çağrı zinciri boyunca taşır
+Değerler contextvars ile tutulur; thread havuzuna (run_in_threadpool) geçen çağrılar da aynı
+bağlamı görür. Servis fonksiyonlarının imzalarını değiştirmeden provider katmanına ulaşır.
+
+Bağlam ayrıca bir iptal belirteci (CancellationToken) taşır: istemci bağlantıyı kapatınca veya
+endpoint'in süre sınırı dolunca belirteç iptal edilir; provider çağrıları, OCR işleri ve etmen
+adımları başlamadan önce check_cancelled() ile durur.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+# Form alanı verilmemişse kullanıcı bu başlıktan okunur
+USER_ID_HEADER = b"x-user-id"
+# Provider zamanlayıcısındaki öncelik sınıfı; toplu istemciler "batch" gönderir
+REQUEST_CLASS_HEADER = b"x-request-class"
+INTERACTIVE, BATCH = "interactive", "batch"
+
+# İstek süre sınırı (sn, 0 = sınırsız); ENDPOINT_DEADLINES ile endpoint'e özel değer verilir
+# Örnek: ENDPOINT_DEADLINES='{"/api/v1/generate-quiz-from-files": 300, "/metrics": 0}'
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "120"))
+try:
+    ENDPOINT_DEADLINES: Dict[str, float] = {str(k): float(v) for k, v in json.loads(os.getenv("ENDPOINT_DEADLINES", "{}")).items()}
+except (ValueError, AttributeError) as e:
+    print(f"⚠️ ENDPOINT_DEADLINES okunamadı, yok sayılıyor: {e}")
+    ENDPOINT_DEADLINES = {}
+
+# İptal nedenleri
+CLIENT_DISCONNECTED = "client_disconnected"
+DEADLINE_EXCEEDED = "deadline_exceeded"
+
+_user_id: ContextVar[Optional[str]] = ContextVar("request_user_id", default=None)
+_client_address: ContextVar[Optional[str]] = ContextVar("request_client_address", default=None)
+_endpoint: ContextVar[Optional[str]] = ContextVar("request_endpoint", default=None)
+_request_class: ContextVar[str] = ContextVar("request_class", default=INTERACTIVE)
+_cancel_token: ContextVar[Optional["CancellationToken"]] = ContextVar("request_cancel_token", default=None)
+
+
+class RequestCancelledError(HTTPException):
+    """İstemci bağlantıyı kapattı (499) veya istek süresi doldu (504)"""
+
+    def __init__(self, reason: str):
+        if reason == DEADLINE_EXCEEDED:
+            super().__init__(status_code=504, detail="İstek süre sınırını aştı.")
+        else:
+            # 499: istemci kapattı (nginx geleneği); yanıtı okuyan olmaz, metriklerde ayrışır
+            super().__init__(status_code=499, detail="İstemci bağlantıyı kapattı.")
+        self.reason = reason
+
+
+class CancellationToken:
+    """
+    Bir isteğin iptal durumu ve son tarihi; thread'ler arasında paylaşılır.
+    Son tarih her kontrolde ayrıca denetlenir, böylece zamanlayıcısı olmayan thread'lerde de geçerlidir.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.reason: Optional[str] = None
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    def cancel(self, reason: str):
+        """İlk iptal nedeni kalıcıdır; kayıtlı geri çağrılar bir kez çalışır"""
+        with self._lock:
+            if self.reason is not None:
+                return
+            self.reason = reason
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    @property
+    def cancelled(self) -> bool:
+        if self.reason is None and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel(DEADLINE_EXCEEDED)
+        return self.reason is not None
+
+    def remaining(self) -> Optional[float]:
+        """Son tarihe kalan süre (sn); son tarih yoksa None"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        """İptal edildiyse RequestCancelledError atar"""
+        if self.cancelled:
+            raise RequestCancelledError(self.reason)
+
+    def add_callback(self, callback: Callable[[], None]):
+        """İptalde çağrılır; zaten iptal edildiyse hemen çağrılır"""
+        with self._lock:
+            if self.reason is None:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+def get_user_id() -> Optional[str]:
+    """Bu isteğin kullanıcısı (tanımsızsa None)"""
+    return _user_id.get()
+
+
+def set_user_id(user_id: Optional[str]):
+    """Endpoint'ler user_id form alanını aldığında bağlama yazar"""
+    if user_id:
+        _user_id.set(user_id)
+
+
+def get_client_address() -> Optional[str]:
+    """İstemcinin adresi (vekil sunucu arkasında uvicorn --proxy-headers ile gerçek adres); HTTP isteği dışında None"""
+    return _client_address.get()
+
+
+def get_endpoint() -> Optional[str]:
+    """Bu isteğin endpoint yolu (HTTP isteği dışında None)"""
+    return _endpoint.get()
+
+
+def set_endpoint(endpoint: Optional[str]):
+    """HTTP isteği dışında çalışan işler (arka plan kuyruğu) için endpoint bilgisini bağlama yazar"""
+    if endpoint:
+        _endpoint.set(endpoint)
+
+
+def get_request_class() -> str:
+    """Bu isteğin öncelik sınıfı ("interactive" veya "batch")"""
+    return _request_class.get()
+
+
+def set_request_class(request_class: str):
+    """Arka plan işleri toplu sınıfta çalışır"""
+    _request_class.set(BATCH if request_class == BATCH else INTERACTIVE)
+
+
+def get_cancel_token() -> Optional[CancellationToken]:
+    """Bu isteğin iptal belirteci (HTTP isteği veya arka plan işi dışında None)"""
+    return _cancel_token.get()
+
+
+def set_cancel_token(token: Optional[CancellationToken]):
+    """Arka plan işleri kendi süre sınırlarıyla çalışır"""
+    _cancel_token.set(token)
+
+
+def check_cancelled():
+    """İstek iptal edildiyse veya süresi dolduysa RequestCancelledError atar"""
+    token = _cancel_token.get()
+    if token is not None:
+        token.check()
+
+
+def _has_body(headers: Dict[bytes, bytes]) -> bool:
+    return headers.get(b"content-length", b"0") not in (b"", b"0") or b"transfer-encoding" in headers
+
+
+class RequestContextMiddleware:
+    """
+    Her HTTP isteği için endpoint yolunu, istemci adresini, X-User-Id ve X-Request-Class başlıklarını bağlama yazar (ASGI middleware).
+    İsteğe endpoint'in süre sınırıyla bir iptal belirteci verilir; gövde okunduktan sonra gelen
+    http.disconnect mesajı (istemci sekmeyi kapattı) belirteci iptal eder. İzleyici başladıktan sonra
+    receive'i yalnızca o okur ve mesajları uygulamaya kuyrukla iletir (gövdesiz isteğin boş
+    http.request mesajı da uygulamaya ulaşır).
+    Bağlam istek bitince eski hâline döner.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        user_id = headers.get(USER_ID_HEADER, b"").decode("latin-1").strip() or None
+        request_class = BATCH if headers.get(REQUEST_CLASS_HEADER, b"").strip().lower() == BATCH.encode() else INTERACTIVE
+        path = scope.get("path")
+        timeout = ENDPOINT_DEADLINES.get(path, REQUEST_DEADLINE_SECONDS)
+        token = CancellationToken(timeout)
+        loop = asyncio.get_running_loop()
+        # Son tarih, kontrol noktasına gelinmese de bekleyen işleri (OCR kuyruğu) uyandırır
+        deadline_timer = loop.call_later(timeout, token.cancel, DEADLINE_EXCEEDED) if timeout else None
+        response_complete = False
+        watcher: Optional[asyncio.Task] = None
+        # İzleyicinin okuduğu mesajlar uygulamaya buradan verilir
+        forwarded: asyncio.Queue = asyncio.Queue()
+
+        async def watch_disconnect():
+            while True:
+                message = await receive()
+                await forwarded.put(message)
+                if message["type"] == "http.disconnect":
+                    if not response_complete:
+                        token.cancel(CLIENT_DISCONNECTED)
+                    return
+
+        def start_watcher():
+            nonlocal watcher
+            if watcher is None:
+                watcher = loop.create_task(watch_disconnect())
+
+        async def watching_receive():
+            if watcher is not None:
+                if forwarded.empty() and watcher.done():
+                    return {"type": "http.disconnect"}
+                return await forwarded.get()
+            message = await receive()
+            if message["type"] == "http.request" and not message.get("more_body", False):
+                start_watcher()
+            elif message["type"] == "http.disconnect" and not response_complete:
+                token.cancel(CLIENT_DISCONNECTED)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        client = scope.get("client")
+        endpoint_token = _endpoint.set(path)
+        address_token = _client_address.set(client[0] if client else None)
+        user_token = _user_id.set(user_id)
+        class_token = _request_class.set(request_class)
+        cancel_token = _cancel_token.set(token)
+        if not _has_body(headers):
+            start_watcher()
+        try:
+            await self.app(scope, watching_receive, tracking_send)
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            if deadline_timer is not None:
+                deadline_timer.cancel()
+            _cancel_token.reset(cancel_token)
+            _request_class.reset(class_token)
+            _user_id.reset(user_token)
+            _client_address.reset(address_token)
+            _endpoint.reset(endpoint_token)
@@ -0,0 +1,75 @@
+"""
+Yanıt Biçimi - Hızlı JSON yanıt sınıfı ve etmen yanıtları için bölüm seçimi
+Etmen endpoint'lerinin tam yanıtı (girdi metnini içeren algılama, etmen durumu, öz model, plan)
+çoğu zaman sınavın kendisinden birkaç kat büyüktür. İstemci view=compact veya fields=... ile
+yalnızca ihtiyaç duyduğu bölümleri alır. Seçim, provider veya etmen işi başlamadan check_sections ile
+doğrulanır; geçersiz istek boşuna üretim yapmadan 422 alır.
+
+orjson yüklüyse yanıtlar orjson ile serileştirilir; yüklü değilse standart json kullanılır.
+"""
+
+from typing import Any, Dict, Iterable, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# orjson opsiyonel - yüklü değilse standart json ile devam edilir
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+RESPONSE_VIEWS = ("full", "compact")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    orjson ile serileştiren JSON yanıtı (uygulamanın varsayılan yanıt sınıfı).
+    orjson'ın doğrudan desteklemediği değerler (küme, pydantic modeli...) jsonable_encoder ile çevrilir;
+    str olmayan sözlük anahtarları ve numpy dizileri desteklenir.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _requested_fields(fields: str) -> set:
+    return {field.strip() for field in fields.split(",") if field.strip()}
+
+
+def check_sections(view: str = "full", fields: Optional[str] = None, sections: Iterable[str] = ()) -> None:
+    """
+    Görünümü ve istenen bölümleri iş yapılmadan önce doğrular.
+    sections, endpoint'in yanıtında bulunabilecek bölümlerdir; bilinmeyen bölüm veya görünüm 422 verir.
+    """
+    if fields:
+        sections = list(sections)
+        unknown = _requested_fields(fields) - set(sections)
+        if unknown:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Bilinmeyen bölüm: {', '.join(sorted(unknown))}. Seçenekler: {', '.join(sections)}"
+            )
+    elif view not in RESPONSE_VIEWS:
+        raise HTTPException(status_code=422, detail=f"view parametresi {' veya '.join(RESPONSE_VIEWS)} olmalıdır.")
+
+
+def select_sections(response: Dict[str, Any], view: str = "full", fields: Optional[str] = None,
+                    compact_sections: Iterable[str] = ()) -> Dict[str, Any]:
+    """
+    Yanıttan istenen üst düzey bölümleri seçer (istek önceden check_sections ile doğrulanır).
+    fields (virgülle ayrılmış) verilirse yalnızca o bölümler, view=compact ise compact_sections döner;
+    yanıtta olmayan bölümler atlanır.
+    """
+    if fields:
+        wanted = _requested_fields(fields)
+    elif view == "compact":
+        wanted = set(compact_sections)
+    else:
+        return response
+    return {key: value for key, value in response.items() if key in wanted}
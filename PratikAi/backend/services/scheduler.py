@@ -0,0 +1,301 @@
+"""
+Provider Zamanlayıcısı - AI provider çağrıları için adil sıralama ve kabul denetimi
+Çağrılar AIProviderManager'a sınırsız eşzamanlılıkla ve geliş sırasıyla ulaşınca tek bir kullanıcının
+toplu işi (örn. sınıf geneli dışa aktarma) diğer kullanıcıların etkileşimli isteklerini bekletir.
+Her çağrı provider'a gönderilmeden önce zamanlayıcıdan bir slot alır:
+
+- Eşzamanlılık: toplamda SCHEDULER_MAX_CONCURRENCY, kullanıcı başına SCHEDULER_PER_USER_CONCURRENCY
+- Ağırlıklı adil sıralama (self-clocked WFQ): her (sınıf, kullanıcı) akışı kendi sanal bitiş etiketini taşır,
+  slot boşalınca etiketi en küçük bekleyen çağrı başlar. Etkileşimli sınıf SCHEDULER_INTERACTIVE_WEIGHT,
+  toplu sınıf SCHEDULER_BATCH_WEIGHT hızıyla ilerler; uzun bir kuyruk diğer kullanıcıların önüne geçemez,
+  toplu işler de tamamen aç kalmaz
+- Yük atma: sınıfın kuyruk sınırı doluysa veya çağrı SCHEDULER_MAX_WAIT_SECONDS'tan uzun beklerse
+  503 + Retry-After döner (toplu sınıfın sınırı daha düşüktür, önce o atılır). Sınıf sınırına yalnızca
+  çalışabilecek bekleyenler sayılır; kendi kullanıcı sınırına takılan çağrılar o kullanıcının
+  SCHEDULER_PER_USER_MAX_QUEUE sınırlı kuyruğunda bekler, tek kullanıcının birikmesi başkalarını atmaz
+- İstemci bağlantıyı kapatır veya isteğin süre sınırı dolarsa bekleyen çağrı kuyruktan çıkarılır
+- Slot bekleyen çağrı thread'ini bırakmaz: uygulama açılışında anyio thread havuzu çalışan + bekleyebilecek
+  çağrı sayısı ve SCHEDULER_THREAD_HEADROOM kadar büyütülür; böylece kuyruk sınırı (queue_full) thread
+  havuzundan önce dolar ve diğer senkron endpoint'ler aç kalmaz
+
+Kimliği bilinmeyen çağrılar istemci adresine göre anonim kovada (usage_accounting.accounting_user) sayılır;
+kullanıcı sınırı ve adil sıralama onlara da uygulanır.
+"""
+
+import itertools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Tuple
+
+from fastapi import HTTPException
+
+from services.metrics import SCHEDULER_WAIT, SCHEDULER_REJECTED, SCHEDULER_QUEUE
+from services.request_context import get_request_class, get_cancel_token, INTERACTIVE, BATCH
+from services.usage_accounting import accounting_user
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+SCHEDULER_MAX_CONCURRENCY = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "16"))
+SCHEDULER_PER_USER_CONCURRENCY = int(os.getenv("SCHEDULER_PER_USER_CONCURRENCY", "4"))
+SCHEDULER_INTERACTIVE_WEIGHT = float(os.getenv("SCHEDULER_INTERACTIVE_WEIGHT", "4"))
+SCHEDULER_BATCH_WEIGHT = float(os.getenv("SCHEDULER_BATCH_WEIGHT", "1"))
+# Sınıf başına en fazla bekleyen çağrı; aşılınca 503
+SCHEDULER_MAX_QUEUE = int(os.getenv("SCHEDULER_MAX_QUEUE", "64"))
+SCHEDULER_BATCH_MAX_QUEUE = int(os.getenv("SCHEDULER_BATCH_MAX_QUEUE", "16"))
+# Kendi kullanıcı sınırına takılmış bir kullanıcının en fazla bekleyen çağrısı; aşılınca 503
+SCHEDULER_PER_USER_MAX_QUEUE = int(os.getenv("SCHEDULER_PER_USER_MAX_QUEUE", "8"))
+SCHEDULER_MAX_WAIT_SECONDS = float(os.getenv("SCHEDULER_MAX_WAIT_SECONDS", "30"))
+# Zamanlayıcı dışında thread havuzunu kullanan senkron endpoint'ler için ayrılan thread sayısı
+SCHEDULER_THREAD_HEADROOM = int(os.getenv("SCHEDULER_THREAD_HEADROOM", "16"))
+# Ortalama çağrı süresi henüz bilinmiyorsa kullanılan Retry-After
+SCHEDULER_RETRY_AFTER_SECONDS = int(os.getenv("SCHEDULER_RETRY_AFTER_SECONDS", "5"))
+
+REQUEST_CLASSES = (INTERACTIVE, BATCH)
+# Bitmiş akışların sanal etiketleri bu sayıyı aşınca temizlenir
+_FLOW_PRUNE_THRESHOLD = 1024
+
+
+class SchedulerOverloadError(HTTPException):
+    """Zamanlayıcı kuyruğu dolu veya bekleme süresi aşıldı (503)"""
+
+    def __init__(self, request_class: str, reason: str, retry_after: int):
+        super().__init__(
+            status_code=503,
+            detail="AI servisleri şu anda yoğun. Lütfen biraz sonra tekrar deneyin.",
+            headers={"Retry-After": str(retry_after)}
+        )
+        self.request_class = request_class
+        self.reason = reason
+
+
+class _Waiter:
+    __slots__ = ("user_id", "request_class", "finish", "seq", "granted")
+
+    def __init__(self, user_id: str, request_class: str, finish: float, seq: int):
+        self.user_id = user_id
+        self.request_class = request_class
+        self.finish = finish
+        self.seq = seq
+        self.granted = False
+
+
+class ProviderScheduler:
+    """Thread tabanlı slot dağıtıcısı; provider çağrıları thread havuzunda senkron çalışır"""
+
+    def __init__(self, max_concurrency: int = SCHEDULER_MAX_CONCURRENCY,
+                 per_user_concurrency: int = SCHEDULER_PER_USER_CONCURRENCY,
+                 max_wait_seconds: float = SCHEDULER_MAX_WAIT_SECONDS,
+                 per_user_max_queue: int = SCHEDULER_PER_USER_MAX_QUEUE):
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_user_concurrency = max(1, per_user_concurrency)
+        self.per_user_max_queue = per_user_max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.weights = {INTERACTIVE: SCHEDULER_INTERACTIVE_WEIGHT, BATCH: SCHEDULER_BATCH_WEIGHT}
+        self.max_queue = {INTERACTIVE: SCHEDULER_MAX_QUEUE, BATCH: SCHEDULER_BATCH_MAX_QUEUE}
+        self._cond = threading.Condition()
+        self._waiters: List[_Waiter] = []
+        self._running = {request_class: 0 for request_class in REQUEST_CLASSES}
+        self._running_by_user: Dict[str, int] = {}
+        self._virtual_time = 0.0
+        self._last_finish: Dict[Tuple[str, str], float] = {}
+        self._seq = itertools.count()
+        self._service_seconds: Optional[float] = None
+        self.admitted = {request_class: 0 for request_class in REQUEST_CLASSES}
+        self.rejected = {request_class: 0 for request_class in REQUEST_CLASSES}
+
+    @contextmanager
+    def slot(self, user_id: Optional[str] = None, request_class: Optional[str] = None):
+        """
+        Provider çağrısı için slot alır; kullanıcı ve sınıf verilmezse istek bağlamından okunur.
+        Slot alınamazsa SchedulerOverloadError (503), beklerken istek iptal edilirse RequestCancelledError atar.
+        """
+        user_id = user_id or accounting_user()
+        request_class = request_class or get_request_class()
+        waited = self._acquire(user_id, request_class)
+        SCHEDULER_WAIT.observe(waited, request_class)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(user_id, request_class, time.monotonic() - started)
+
+    def _acquire(self, user_id: str, request_class: str) -> float:
+        """Slot verilene kadar bekler; beklenen süreyi (sn) döndürür"""
+        started = time.monotonic()
+        token = get_cancel_token()
+        if token is not None:
+            token.check()
+        with self._cond:
+            if self._at_user_limit(user_id):
+                # Kullanıcının kendi birikmesi yalnızca kendi kuyruğunu doldurur
+                if sum(1 for w in self._waiters if w.user_id == user_id) >= self.per_user_max_queue:
+                    self._reject(request_class, "user_queue_full")
+            elif self._runnable_waiters(request_class) >= self.max_queue[request_class]:
+                self._reject(request_class, "queue_full")
+
+            # Akışın yeni bitiş etiketi: sanal zamandan veya akışın önceki etiketinden sonra
+            cost = 1.0 / self.weights[request_class]
+            flow = (request_class, user_id)
+            start = max(self._virtual_time, self._last_finish.get(flow, 0.0))
+            waiter = _Waiter(user_id, request_class, start + cost, next(self._seq))
+            self._last_finish[flow] = waiter.finish
+            self._waiters.append(waiter)
+            self._dispatch()
+
+            if waiter.granted:
+                return time.monotonic() - started
+            deadline = started + self.max_wait_seconds
+            if token is not None:
+                token.add_callback(self._wake)
+            try:
+                while not waiter.granted:
+                    if token is not None and token.cancelled:
+                        self._waiters.remove(waiter)
+                        token.check()
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._waiters.remove(waiter)
+                        self._reject(request_class, "timeout")
+                    token_remaining = token.remaining() if token is not None else None
+                    self._cond.wait(remaining if token_remaining is None else min(remaining, token_remaining))
+            finally:
+                if token is not None:
+                    token.remove_callback(self._wake)
+        return time.monotonic() - started
+
+    def _wake(self):
+        """İptal edilen isteğin bekleyen çağrısını uyandırır"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def _runnable_waiters(self, request_class: str) -> int:
+        """Sınıfın kullanıcı sınırına takılmayan bekleyen çağrıları (kilit alınmış olmalı)"""
+        return sum(1 for w in self._waiters if w.request_class == request_class and not self._at_user_limit(w.user_id))
+
+    def queue_depth(self, request_class: str) -> int:
+        """Sınıfın slot bekleyen (kullanıcı sınırına takılmayan) çağrı sayısı; aşırı yük degradesi buna bakar"""
+        with self._cond:
+            return self._runnable_waiters(request_class)
+
+    def _at_user_limit(self, user_id: str) -> bool:
+        """Kullanıcının çalışan çağrıları sınırında mı (kilit alınmış olmalı)"""
+        return self._running_by_user.get(user_id, 0) >= self.per_user_concurrency
+
+    def _release(self, user_id: str, request_class: str, elapsed: float):
+        with self._cond:
+            self._running[request_class] -= 1
+            remaining = self._running_by_user[user_id] - 1
+            if remaining:
+                self._running_by_user[user_id] = remaining
+            else:
+                del self._running_by_user[user_id]
+            # Retry-After tahmini için ortalama çağrı süresi (üstel hareketli ortalama)
+            self._service_seconds = elapsed if self._service_seconds is None else 0.9 * self._service_seconds + 0.1 * elapsed
+            self._dispatch()
+
+    def _dispatch(self):
+        """Boş slotları bitiş etiketi en küçük, kullanıcı sınırına takılmayan bekleyenlere verir (kilit alınmış olmalı)"""
+        granted = False
+        while self._waiters and sum(self._running.values()) < self.max_concurrency:
+            eligible = [w for w in self._waiters if not self._at_user_limit(w.user_id)]
+            if not eligible:
+                break
+            waiter = min(eligible, key=lambda w: (w.finish, w.seq))
+            self._waiters.remove(waiter)
+            waiter.granted = granted = True
+            self._virtual_time = max(self._virtual_time, waiter.finish - 1.0 / self.weights[waiter.request_class])
+            self._running[waiter.request_class] += 1
+            self.admitted[waiter.request_class] += 1
+            self._running_by_user[waiter.user_id] = self._running_by_user.get(waiter.user_id, 0) + 1
+        if granted:
+            self._cond.notify_all()
+        if len(self._last_finish) > _FLOW_PRUNE_THRESHOLD:
+            # Sanal zamanın gerisinde kalan etiketler yeni gelen çağrıyı etkilemez
+            self._last_finish = {flow: finish for flow, finish in self._last_finish.items() if finish > self._virtual_time}
+
+    def _reject(self, request_class: str, reason: str):
+        """Kilit alınmışken çağrılır"""
+        self.rejected[request_class] += 1
+        SCHEDULER_REJECTED.inc(request_class, reason)
+        raise SchedulerOverloadError(request_class, reason, self._retry_after())
+
+    def _retry_after(self) -> int:
+        """Kuyruğun boşalması için tahmini süre (sn)"""
+        if self._service_seconds is None:
+            return SCHEDULER_RETRY_AFTER_SECONDS
+        estimate = (len(self._waiters) + 1) * self._service_seconds / self.max_concurrency
+        return max(1, min(int(self.max_wait_seconds), math.ceil(estimate)))
+
+    def max_threads(self) -> int:
+        """
+        Çalışan ve slot bekleyen çağrıların aynı anda tutabileceği en fazla thread.
+        Kullanıcı sınırında aynı anda en fazla max_concurrency // per_user_concurrency kullanıcı olabilir.
+        """
+        users_at_limit = self.max_concurrency // self.per_user_concurrency
+        return self.max_concurrency + sum(self.max_queue.values()) + users_at_limit * self.per_user_max_queue
+
+    def gauge_values(self) -> Dict[Tuple[str, ...], float]:
+        with self._cond:
+            values = {(request_class, "running"): float(count) for request_class, count in self._running.items()}
+            for request_class in REQUEST_CLASSES:
+                values[(request_class, "queued")] = float(sum(1 for w in self._waiters if w.request_class == request_class))
+        return values
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "running": dict(self._running),
+                "queued": {
+                    request_class: sum(1 for w in self._waiters if w.request_class == request_class)
+                    for request_class in REQUEST_CLASSES
+                },
+                "users_running": len(self._running_by_user),
+                "admitted": dict(self.admitted),
+                "rejected": dict(self.rejected),
+                "avg_call_ms": round(self._service_seconds * 1000, 1) if self._service_seconds is not None else None,
+                "limits": {
+                    "max_concurrency": self.max_concurrency,
+                    "per_user_concurrency": self.per_user_concurrency,
+                    "per_user_max_queue": self.per_user_max_queue,
+                    "max_queue": dict(self.max_queue),
+                    "weights": dict(self.weights),
+                    "max_wait_seconds": self.max_wait_seconds,
+                    "max_threads": self.max_threads(),
+                },
+            }
+
+
+# Global zamanlayıcı instance
+_scheduler: Optional[ProviderScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_provider_scheduler() -> Optional[ProviderScheduler]:
+    """Zamanlayıcıyı al veya oluştur (SCHEDULER_ENABLED=false ise None)"""
+    global _scheduler
+    if not SCHEDULER_ENABLED:
+        return None
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = ProviderScheduler()
+                SCHEDULER_QUEUE.set_function(_scheduler.gauge_values)
+    return _scheduler
+
+def size_thread_limiter() -> Optional[int]:
+    """
+    anyio'nun varsayılan thread sınırını zamanlayıcının tutabileceği thread sayısına göre büyütür
+    (event loop içinde, uygulama açılışında çağrılır). Sınır küçük kalırsa fazla istekler kuyruğa
+    değil thread havuzuna takılır: queue_full hiç tetiklenmez ve senkron endpoint'ler aç kalır.
+    Returns: yeni thread sınırı (zamanlayıcı kapalıysa None)
+    """
+    import anyio.to_thread
+
+    scheduler = get_provider_scheduler()
+    if scheduler is None:
+        return None
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = max(limiter.total_tokens, scheduler.max_threads() + SCHEDULER_THREAD_HEADROOM)
+    return limiter.total_tokens
@@ -0,0 +1,122 @@
+"""
+Yapısal Çıktı - Gemini'nin JSON şemalı yanıt modu için şema ve doğrulayıcı
+Şema hem SDK'ya (response_schema) verilir hem de yanıtı doğrulayan fonksiyona bir kez derlenir.
+Harici bir jsonschema bağımlılığı yoktur; şemanın kullandığımız alt kümesi desteklenir
+(object/array/string, properties, required, enum).
+"""
+
+import json
+from typing import Dict, List, Any, Callable, Tuple
+
+from services.metrics import STAGE_LATENCY, timed
+
+OPTION_KEYS = ("A", "B", "C", "D")
+
+# SDK'nın kabul ettiği OpenAPI alt kümesi biçiminde soru şeması
+QUIZ_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "questions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "question": {"type": "string"},
+                    "options": {
+                        "type": "object",
+                        "properties": {key: {"type": "string"} for key in OPTION_KEYS},
+                        "required": list(OPTION_KEYS),
+                    },
+                    "correct_answer": {"type": "string", "format": "enum", "enum": list(OPTION_KEYS)},
+                },
+                "required": ["question", "options", "correct_answer"],
+            },
+        }
+    },
+    "required": ["questions"],
+}
+
+Validator = Callable[[Any, str], List[str]]
+
+
+def compile_validator(schema: Dict[str, Any]) -> Validator:
+    """
+    Şemayı iç içe kapanışlardan (closure) oluşan bir doğrulayıcıya derler.
+    Şema her çağrıda yeniden yorumlanmaz; dönen fonksiyon (değer, yol) -> hata listesi verir.
+    """
+    schema_type = schema.get("type")
+
+    if schema_type == "object":
+        properties = {name: compile_validator(sub) for name, sub in schema.get("properties", {}).items()}
+        required = tuple(schema.get("required", ()))
+
+        def validate_object(value: Any, path: str) -> List[str]:
+            if not isinstance(value, dict):
+                return [f"{path}: nesne bekleniyordu"]
+            errors = [f"{path}.{name}: zorunlu alan eksik" for name in required if name not in value]
+            for name, validator in properties.items():
+                if name in value:
+                    errors.extend(validator(value[name], f"{path}.{name}"))
+            return errors
+        return validate_object
+
+    if schema_type == "array":
+        validate_item = compile_validator(schema.get("items", {}))
+
+        def validate_array(value: Any, path: str) -> List[str]:
+            if not isinstance(value, list):
+                return [f"{path}: dizi bekleniyordu"]
+            errors = []
+            for index, item in enumerate(value):
+                errors.extend(validate_item(item, f"{path}[{index}]"))
+            return errors
+        return validate_array
+
+    if schema_type == "string":
+        allowed = frozenset(schema["enum"]) if "enum" in schema else None
+
+        def validate_string(value: Any, path: str) -> List[str]:
+            if not isinstance(value, str) or not value.strip():
+                return [f"{path}: boş olmayan metin bekleniyordu"]
+            if allowed is not None and value.strip() not in allowed:
+                return [f"{path}: '{value}' izin verilen değerlerden biri değil"]
+            return []
+        return validate_string
+
+    return lambda value, path: []
+
+
+_validate_question = compile_validator(QUIZ_RESPONSE_SCHEMA["properties"]["questions"]["items"])
+
+
+@timed(STAGE_LATENCY, "parse_quiz_json")
+def parse_quiz_json(raw_text: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    JSON modundaki Gemini yanıtını soru listesine dönüştürür.
+    Şemaya uymayan sorular parse_quiz_text'teki gibi atlanır; diğerleri korunur.
+
+    Returns:
+        (parse_quiz_text ile aynı biçimde sorular, doğrulama hataları)
+    """
+    try:
+        payload = json.loads(raw_text)
+    except (TypeError, ValueError) as e:
+        return [], [f"Geçersiz JSON: {e}"]
+
+    items = payload.get("questions") if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        return [], ["$.questions: dizi bekleniyordu"]
+
+    questions = []
+    errors = []
+    for index, item in enumerate(items):
+        item_errors = _validate_question(item, f"$.questions[{index}]")
+        if item_errors:
+            errors.extend(item_errors)
+            continue
+        questions.append({
+            "question": item["question"].strip(),
+            "options": {key: item["options"][key].strip() for key in OPTION_KEYS},
+            "correct_answer": item["correct_answer"].strip()
+        })
+    return questions, errors
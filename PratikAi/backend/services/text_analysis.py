@@ -0,0 +1,470 @@
+"""
+Yerel Metin Analizi - Çevrimdışı (LLM'siz) NLP yardımcıları
+Türkçe duyarlı cümle bölme, TF-IDF cümle vektörleri ve TextRank/merkez tabanlı
+cümle sıralaması. Tüm hesaplamalar NumPy matris işlemleriyle yapılır.
+"""
+
+import json
+import math
+import random
+import re
+import zlib
+from typing import List, Tuple, Dict, Optional, Any
+
+import numpy as np
+
+# --- DURAK KELİMELER (STOPWORDS) ---
+
+STOPWORDS_TR = frozenset("""
+acaba ama ancak artık aslında az bana bazen bazı bazıları belki ben beni benim beri bile bir
+biraz birçok biri birkaç birşey biz bize bizi bizim bu buna bunda bundan bunlar bunları bunların
+bunu bunun burada böyle böylece da daha dahi de defa değil diye diğer diğeri doğru dolayı dolayısıyla
+edecek eden ederek edilen edilmesi ediyor en fakat gibi göre hem hep hepsi her herhangi hiç için
+ile ilgili ise işte kadar karşın kendi kendine kez ki kim kimse mi mı mu mü nasıl ne neden nedir
+nerede nereye niye o olan olarak oldu olduğu olduğunu olduklarını olmadı olmak olması olmayan olmaz
+olsa olsun olup olur olursa oluyor ona onlar onları onların onu onun orada öyle oysa pek rağmen
+sadece sanki siz şey şöyle şu şuna şunda şundan şunlar şunu tarafından tüm üzere var vardır ve veya
+ya yani yapılan yapılması yapmak yaptı yerine yine yoksa zaten çok çünkü özel olarak olan ilk son
+""".split())
+
+STOPWORDS_EN = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just me more most
+my myself no nor not now of off on once only or other our ours ourselves out over own same she
+should so some such than that the their theirs them themselves then there these they this those
+through to too under until up very was we were what when where which while who whom why will with
+would you your yours yourself yourselves also may might must shall one two
+""".split())
+
+STOPWORDS = STOPWORDS_TR | STOPWORDS_EN
+
+# Cümle sonu sayılmaması gereken kısaltmalar (küçük harfle, noktasız)
+_ABBREVIATIONS = frozenset("""
+dr prof doç yrd öğr gör av sn bkz örn vb vs vd müh uzm st no nr sf s yy mr mrs ms vs etc e.g i.e fig
+""".split())
+
+_WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+_SENTENCE_BOUNDARY_RE = re.compile(r"(?<=[.!?…])[\"'”’)]*\s+(?=[\"'“‘(]*[A-ZÇĞİÖŞÜ0-9])")
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_WHITESPACE_RE = re.compile(r"\s+")
+_ORDINAL_END_RE = re.compile(r"(?:^|\s)\d{1,3}\.$")
+# RAKE aday ifadelerini bölen noktalama ve rakamlar
+_PHRASE_DELIMITER_RE = re.compile(r"[^\w\s]|\d|_", re.UNICODE)
+
+
+def turkish_lower(text: str) -> str:
+    """Türkçe büyük/küçük harf kurallarıyla küçültür (I -> ı, İ -> i)."""
+    return text.replace("I", "ı").replace("İ", "i").lower()
+
+
+def turkish_title(text: str) -> str:
+    """Her kelimenin ilk harfini Türkçe kurallarıyla büyütür (i -> İ)."""
+    return " ".join(w[:1].replace("i", "İ").upper() + w[1:] for w in text.split())
+
+
+def tokenize(text: str, remove_stopwords: bool = True, min_length: int = 2) -> List[str]:
+    """Metni küçük harfli kelimelere ayırır (rakam ve noktalama atılır)."""
+    words = _WORD_RE.findall(turkish_lower(text))
+    if remove_stopwords:
+        return [w for w in words if len(w) >= min_length and w not in STOPWORDS]
+    return [w for w in words if len(w) >= min_length]
+
+
+def _is_false_boundary(piece: str) -> bool:
+    """Parça bir kısaltma veya sıra sayısıyla (örn. '1.') bitiyorsa cümle sonu değildir."""
+    if _ORDINAL_END_RE.search(piece):
+        return True
+    last_word = piece.rsplit(None, 1)[-1].rstrip(".").lower() if piece.strip() else ""
+    return last_word in _ABBREVIATIONS or (len(last_word) == 1 and last_word.isalpha())
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Metni cümlelere ayırır.
+    PDF'lerden gelen satır sonları birleştirilir, paragraf boşlukları cümle sınırı sayılır.
+    Kısaltmalar (Prof., vb.) ve Türkçe sıra sayıları (1. Dünya Savaşı) cümleyi bölmez.
+    """
+    sentences = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = _WHITESPACE_RE.sub(" ", paragraph).strip()
+        if not paragraph:
+            continue
+        buffer = ""
+        for piece in _SENTENCE_BOUNDARY_RE.split(paragraph):
+            buffer = f"{buffer} {piece}" if buffer else piece
+            if not _is_false_boundary(buffer):
+                sentences.append(buffer.strip())
+                buffer = ""
+        if buffer:
+            sentences.append(buffer.strip())
+    return sentences
+
+
+def tfidf_matrix(
+    documents: List[List[str]],
+    max_features: int = 4000,
+    vocabulary: Optional[Dict[str, int]] = None,
+) -> Tuple[np.ndarray, Dict[str, int]]:
+    """
+    Belirteçlenmiş belgelerden (burada cümlelerden) L2 normalize TF-IDF matrisi üretir.
+
+    Args:
+        documents: Her biri kelime listesi olan belgeler
+        max_features: En sık geçen bu kadar kelime tutulur (bellek sınırı)
+        vocabulary: Verilirse bu sözlük kullanılır
+
+    Returns:
+        (float32 matris [belge x kelime], kelime -> sütun sözlüğü)
+    """
+    if vocabulary is None:
+        doc_freq: Dict[str, int] = {}
+        for tokens in documents:
+            for token in set(tokens):
+                doc_freq[token] = doc_freq.get(token, 0) + 1
+        kept = sorted(doc_freq, key=lambda t: (-doc_freq[t], t))[:max_features]
+        vocabulary = {token: i for i, token in enumerate(kept)}
+
+    n_docs = len(documents)
+    matrix = np.zeros((n_docs, max(len(vocabulary), 1)), dtype=np.float32)
+    if not vocabulary or n_docs == 0:
+        return matrix, vocabulary
+
+    # Tüm (satır, sütun) çiftleri tek seferde toplanır
+    rows = []
+    cols = []
+    for row, tokens in enumerate(documents):
+        ids = [vocabulary[t] for t in tokens if t in vocabulary]
+        rows.extend([row] * len(ids))
+        cols.extend(ids)
+    if rows:
+        np.add.at(matrix, (np.asarray(rows), np.asarray(cols)), 1.0)
+
+    df = np.count_nonzero(matrix, axis=0).astype(np.float32)
+    idf = np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+    matrix *= idf
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix, vocabulary
+
+
+def textrank_scores(vectors: np.ndarray, damping: float = 0.85, iterations: int = 50, tol: float = 1e-6) -> np.ndarray:
+    """
+    Kosinüs benzerlik grafiği üzerinde TextRank (PageRank) skorları.
+    Satırları normalize benzerlik matrisiyle kuvvet yinelemesi (power iteration) yapılır.
+    """
+    n = vectors.shape[0]
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, 0.0)
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    # Hiç bağlantısı olmayan cümleler tüm düğümlere eşit dağıtır
+    transition = np.where(row_sums > 0, similarity / np.where(row_sums > 0, row_sums, 1.0), 1.0 / n)
+
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    teleport = (1.0 - damping) / n
+    for _ in range(iterations):
+        updated = teleport + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < tol:
+            scores = updated
+            break
+        scores = updated
+    return scores
+
+
+def centroid_scores(vectors: np.ndarray) -> np.ndarray:
+    """Her cümlenin belge merkezine (ortalama vektör) kosinüs benzerliği."""
+    if vectors.shape[0] == 0:
+        return np.zeros(0, dtype=np.float32)
+    centroid = vectors.mean(axis=0)
+    norm = np.linalg.norm(centroid)
+    if norm == 0:
+        return np.zeros(vectors.shape[0], dtype=np.float32)
+    return vectors @ (centroid / norm)
+
+
+def extractive_summary(
+    text: str,
+    num_sentences: int = 4,
+    method: str = "textrank",
+    min_words: int = 5,
+    max_words: int = 60,
+    max_candidates: int = 1500,
+) -> str:
+    """
+    Metinden en temsil edici cümleleri seçerek özet üretir (orijinal sırayla).
+
+    Args:
+        text: Özetlenecek metin
+        num_sentences: Özetteki cümle sayısı
+        method: "textrank" veya "centroid"
+        min_words / max_words: Aday cümle uzunluk sınırları (başlık ve paragraf yığınlarını eler)
+        max_candidates: TextRank matrisinin boyut sınırı; uzun belgelerde önce merkez skoru ile elenir
+    """
+    sentences = split_sentences(text)
+    if len(sentences) <= num_sentences:
+        return " ".join(sentences)
+
+    tokens = [tokenize(s) for s in sentences]
+    candidates = [i for i, s in enumerate(sentences) if min_words <= len(s.split()) <= max_words and tokens[i]]
+    if len(candidates) < num_sentences:
+        candidates = [i for i in range(len(sentences)) if tokens[i]] or list(range(len(sentences)))
+
+    vectors, _ = tfidf_matrix([tokens[i] for i in candidates])
+
+    if method == "centroid":
+        scores = centroid_scores(vectors)
+    else:
+        if len(candidates) > max_candidates:
+            # Benzerlik matrisi n^2 büyür; merkeze en yakın adaylarla sınırla
+            keep = np.sort(np.argsort(-centroid_scores(vectors), kind="stable")[:max_candidates])
+            candidates = [candidates[i] for i in keep]
+            vectors = vectors[keep]
+        scores = textrank_scores(vectors)
+
+    top = np.argsort(-scores, kind="stable")[:num_sentences]
+    chosen = sorted(candidates[i] for i in top)
+    return " ".join(sentences[i] for i in chosen)
+
+
+# --- BOŞLUK DOLDURMA (CLOZE) SORU ÜRETİMİ ---
+
+CLOZE_BLANK = "_____"
+_OPTION_LETTERS = ("A", "B", "C", "D")
+
+
+def _pick_term(sentence_vector: np.ndarray, term_ids: List[int], doc_freq: np.ndarray, difficulty: str) -> int:
+    """
+    Cümleden boşluğa dönüştürülecek terimi seçer.
+    orta: cümledeki en yüksek TF-IDF ağırlıklı terim; kolay: belgede en sık geçen aday;
+    zor: ağırlığı yüksek adaylar arasından en nadir olanı.
+    """
+    weights = sentence_vector[term_ids]
+    if difficulty == "kolay":
+        order = np.lexsort((-weights, -doc_freq[term_ids]))
+    elif difficulty == "zor":
+        order = np.lexsort((-weights, doc_freq[term_ids]))
+    else:
+        order = np.argsort(-weights, kind="stable")
+    return term_ids[int(order[0])]
+
+
+def _pick_distractors(answer_id: int, exclude: set, doc_freq: np.ndarray, terms: List[str], count: int = 3) -> List[int]:
+    """
+    Belgedeki benzer sıklıktaki terimlerden çeldirici seçer.
+    Türkçe eklerle uyum için aynı son ekle (son iki harf) biten adaylar önceliklidir.
+    """
+    answer = terms[answer_id]
+    log_freq = np.log1p(doc_freq)
+    distance = np.abs(log_freq - log_freq[answer_id])
+    # Aynı ekle biten adaylara avantaj, çok kısa/uzun olanlara ceza
+    suffix_bonus = np.array([0.0 if t[-2:] == answer[-2:] else 0.5 for t in terms])
+    length_penalty = np.array([abs(len(t) - len(answer)) for t in terms]) * 0.05
+    score = distance + suffix_bonus + length_penalty
+    chosen = []
+    for term_id in np.argsort(score, kind="stable"):
+        term_id = int(term_id)
+        if term_id in exclude or term_id == answer_id:
+            continue
+        chosen.append(term_id)
+        if len(chosen) == count:
+            break
+    return chosen
+
+
+def _blank_out(sentence: str, term: str) -> Optional[str]:
+    """Cümlede terimin geçtiği ilk kelimeyi boşlukla değiştirir."""
+    for match in _WORD_RE.finditer(sentence):
+        if turkish_lower(match.group(0)) == term:
+            return sentence[:match.start()] + CLOZE_BLANK + sentence[match.end():]
+    return None
+
+
+def generate_cloze_questions(
+    text: str,
+    num_questions: int,
+    question_type: str = "çoktan seçmeli",
+    difficulty: str = "orta",
+    min_words: int = 6,
+    max_words: int = 40,
+) -> List[Dict[str, Any]]:
+    """
+    Metinden boşluk doldurma soruları üretir (LLM kullanmadan).
+
+    Anahtar cümleler merkez benzerliğiyle seçilir, her cümledeki önemli terim boşluğa
+    dönüştürülür. Çoktan seçmeli sorularda çeldiriciler aynı belgedeki benzer sıklıktaki
+    terimlerden gelir. Çıktı parse_quiz_text ile aynı şemadadır:
+    {"question", "options": {"A".."D"}, "correct_answer"}; diğer tiplerde {"raw_text"}.
+    """
+    sentences = split_sentences(text)
+    tokens = [tokenize(s, min_length=4) for s in sentences]
+    candidates = [i for i, s in enumerate(sentences) if min_words <= len(s.split()) <= max_words and tokens[i]]
+    if not candidates:
+        return []
+
+    vectors, vocabulary = tfidf_matrix([tokens[i] for i in candidates])
+    terms = [None] * len(vocabulary)
+    for term, column in vocabulary.items():
+        terms[column] = term
+    doc_freq = np.count_nonzero(vectors, axis=0).astype(np.float32)
+
+    multiple_choice = question_type == "çoktan seçmeli"
+    if multiple_choice and len(terms) < 4:
+        return []
+
+    ranked = np.argsort(-centroid_scores(vectors), kind="stable")
+    questions = []
+    used_terms = set()
+    for row in ranked:
+        if len(questions) >= num_questions:
+            break
+        row = int(row)
+        sentence = sentences[candidates[row]]
+        term_ids = [vocabulary[t] for t in set(tokens[candidates[row]]) if t in vocabulary and vocabulary[t] not in used_terms]
+        if not term_ids:
+            continue
+        answer_id = _pick_term(vectors[row], term_ids, doc_freq, difficulty)
+        question_text = _blank_out(sentence, terms[answer_id])
+        if question_text is None:
+            continue
+
+        if not multiple_choice:
+            used_terms.add(answer_id)
+            questions.append({"raw_text": f"{question_text}\nCevap: {terms[answer_id]}"})
+            continue
+
+        # Cümlede zaten geçen terimler çeldirici olamaz
+        exclude = {vocabulary[t] for t in tokens[candidates[row]] if t in vocabulary}
+        distractors = _pick_distractors(answer_id, exclude, doc_freq, terms)
+        if len(distractors) < 3:
+            continue
+        used_terms.add(answer_id)
+
+        # Cevabın yeri cümleye bağlı olarak deterministik karıştırılır
+        options = [answer_id] + distractors
+        random.Random(zlib.crc32(sentence.encode("utf-8"))).shuffle(options)
+        questions.append({
+            "question": f"Aşağıdaki cümlede boş bırakılan yere hangisi gelmelidir?\n{question_text}",
+            "options": {letter: terms[term_id] for letter, term_id in zip(_OPTION_LETTERS, options)},
+            "correct_answer": _OPTION_LETTERS[options.index(answer_id)]
+        })
+
+    return questions
+
+
+# --- ANAHTAR KELİME ÇIKARIMI ---
+
+def extract_keywords_rake(text: str, top_k: int = 3, max_phrase_words: int = 2) -> List[str]:
+    """
+    RAKE ile anahtar ifade çıkarımı.
+    Metin durak kelimeler ve noktalamadan bölünür; kelime skoru derece/frekans oranıdır.
+    Türkçede durak kelimeler ifadeleri seyrek böldüğü için adaylar bu parçaların içindeki
+    kısa n-gram'lardır ve metinde tekrar eden ifadeler ödüllendirilir.
+    """
+    runs = []
+    for fragment in _PHRASE_DELIMITER_RE.split(turkish_lower(text)):
+        current = []
+        for word in fragment.split():
+            if word in STOPWORDS or len(word) < 3:
+                if current:
+                    runs.append(current)
+                current = []
+            else:
+                current.append(word)
+        if current:
+            runs.append(current)
+    if not runs:
+        return []
+
+    frequency: Dict[str, int] = {}
+    degree: Dict[str, int] = {}
+    for run in runs:
+        for word in run:
+            frequency[word] = frequency.get(word, 0) + 1
+            degree[word] = degree.get(word, 0) + min(len(run), max_phrase_words)
+    word_score = {w: degree[w] / frequency[w] for w in frequency}
+
+    counts: Dict[Tuple[str, ...], int] = {}
+    for run in runs:
+        for n in range(1, max_phrase_words + 1):
+            for start in range(len(run) - n + 1):
+                phrase = tuple(run[start:start + n])
+                counts[phrase] = counts.get(phrase, 0) + 1
+
+    # Tek geçen çok kelimeli ifadeler rastlantısaldır
+    scores = {
+        phrase: count * sum(word_score[w] for w in phrase)
+        for phrase, count in counts.items()
+        if len(phrase) == 1 or count > 1
+    }
+    ranked = sorted(scores, key=lambda p: (-scores[p], p))
+
+    keywords = []
+    seen_words = set()
+    for phrase in ranked:
+        # Aynı kelimeyi paylaşan ifadeler tekrar önerilmez
+        if seen_words.intersection(phrase):
+            continue
+        seen_words.update(phrase)
+        keywords.append(turkish_title(" ".join(phrase)))
+        if len(keywords) == top_k:
+            break
+    return keywords
+
+
+def build_document_frequency_table(documents: List[str]) -> Dict[str, Any]:
+    """Belge koleksiyonundan extract_keywords_tfidf için belge frekansı tablosu üretir."""
+    doc_freq: Dict[str, int] = {}
+    for document in documents:
+        for token in set(tokenize(document, min_length=3)):
+            doc_freq[token] = doc_freq.get(token, 0) + 1
+    return {"documents": len(documents), "df": doc_freq}
+
+
+def load_document_frequency_table(path: str) -> Optional[Dict[str, Any]]:
+    """JSON belge frekansı tablosunu yükler; dosya yoksa veya bozuksa None döner."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            table = json.load(f)
+        if not isinstance(table.get("df"), dict) or int(table.get("documents", 0)) <= 0:
+            raise ValueError("Geçersiz tablo biçimi")
+        return table
+    except Exception as e:
+        print(f"⚠️ Belge frekansı tablosu yüklenemedi ({path}): {e}")
+        return None
+
+
+def extract_keywords_tfidf(text: str, top_k: int = 3, df_table: Optional[Dict[str, Any]] = None) -> List[str]:
+    """
+    TF-IDF ile anahtar kelime çıkarımı.
+    df_table (build_document_frequency_table çıktısı) verilirse IDF bu önceden hesaplanmış
+    korpustan, verilmezse metnin kendi paragraf/cümlelerinden hesaplanır.
+    """
+    tokens = tokenize(text, min_length=3)
+    if not tokens:
+        return []
+    term_freq: Dict[str, int] = {}
+    for token in tokens:
+        term_freq[token] = term_freq.get(token, 0) + 1
+
+    if df_table is not None:
+        n_docs = int(df_table["documents"])
+        doc_freq = df_table["df"]
+    else:
+        units = [set(tokenize(s, min_length=3)) for s in split_sentences(text)]
+        n_docs = len(units)
+        doc_freq = {}
+        for unit in units:
+            for token in unit:
+                doc_freq[token] = doc_freq.get(token, 0) + 1
+        # Yerel IDF'de her yerde geçen kelime yine de konunun kendisidir; sıklığı ağır basar
+        n_docs *= 2
+
+    scores = {
+        term: (1.0 + math.log(count)) * (math.log((1.0 + n_docs) / (1.0 + doc_freq.get(term, 0))) + 1.0)
+        for term, count in term_freq.items()
+    }
+    ranked = sorted(scores, key=lambda t: (-scores[t], t))
+    return [turkish_title(term) for term in ranked[:top_k]]
@@ -40,6 +40,11 @@ TOOLS = [
                     "description": "Soru tipi",
                     "enum": ["çoktan seçmeli", "açık uçlu"],
                     "default": "çoktan seçmeli"
+                },
+                "bank_first": {
+                    "type": "boolean",
+                    "description": "Önce soru bankasındaki sorular kullanılır (varsayılan: false)",
+                    "default": False
                 }
             },
             "required": ["text"]
@@ -93,8 +98,9 @@ def call_tool(tool_name: str, parameters: Dict[str, Any], model: Optional[Any] =
         num_questions = parameters.get("num_questions", 5)
         difficulty = parameters.get("difficulty", "orta")
         question_type = parameters.get("question_type", "çoktan seçmeli")
+        bank_first = parameters.get("bank_first", False)
         
-        result = generate_questions_from_gemini(text, num_questions, question_type, difficulty)
+        result = generate_questions_from_gemini(text, num_questions, question_type, difficulty, bank_first=bank_first)
         return {
             "tool": "generate_quiz",
             "status": "success",
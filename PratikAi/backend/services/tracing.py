@@ -0,0 +1,236 @@
+"""
+İzleme (Tracing) - Etmen döngüsü ve CWD zinciri için iç içe span'ler
+Bir iz (trace) endpoint'te başlatılır; iz kimliği ve etkin span contextvars ile taşınır.
+Her span süreyi, özellikleri (attributes) ve o adımda yapılan provider çağrılarını kaydeder.
+Tamamlanan izler sınırlı bir halka tamponda (ring buffer) tutulur.
+
+Etkin iz yoksa span() paylaşılan boş bir nesne döndürür; maliyet tek bir contextvar okumasıdır.
+"""
+
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Any, Optional, Iterator
+
+# Kapalıyken izler yalnızca istekte açıkça istenirse (include_trace) tutulur
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+# Halka tamponda tutulan en fazla iz sayısı
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+_buffer: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+_buffer_lock = threading.Lock()
+
+
+class Span:
+    """Tek bir adımın süresi, özellikleri ve provider çağrıları"""
+
+    __slots__ = ("name", "span_id", "start", "duration_ms", "attributes", "provider_calls", "children", "error")
+
+    def __init__(self, name: str, span_id: int, start: float, attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = span_id
+        self.start = start
+        self.duration_ms: Optional[float] = None
+        self.attributes = attributes
+        self.provider_calls: List[Dict[str, Any]] = []
+        self.children: List["Span"] = []
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        data = {
+            "name": self.name,
+            "span_id": self.span_id,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+        }
+        if self.provider_calls:
+            data["provider_calls"] = self.provider_calls
+        if self.error:
+            data["error"] = self.error
+        if self.children:
+            data["children"] = [child.to_dict(origin) for child in self.children]
+        return data
+
+
+class _NoopSpan:
+    """Etkin iz yokken dönen paylaşılan boş span"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """Bir isteğin span ağacı"""
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.trace_id = os.urandom(8).hex()
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self._next_id = 0
+        self.root = self._new_span(name, attributes)
+
+    def _new_span(self, name: str, attributes: Dict[str, Any]) -> Span:
+        self._next_id += 1
+        return Span(name, self._next_id, time.perf_counter(), attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "started_at": self.started_at,
+            "duration_ms": self.root.duration_ms,
+            "root": self.root.to_dict(self._origin),
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "started_at": self.started_at,
+            "duration_ms": self.root.duration_ms,
+            "error": self.root.error,
+        }
+
+
+class _SpanContext:
+    """Gerçek span: girişte etkin span olur, çıkışta süresi yazılır ve üst span geri yüklenir"""
+
+    __slots__ = ("trace", "span", "_token")
+
+    def __init__(self, trace: Trace, name: str, attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span = trace._new_span(name, attributes)
+
+    def __enter__(self) -> Span:
+        parent = _current_span.get()
+        (parent or self.trace.root).children.append(self.span)
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.duration_ms = round((time.perf_counter() - self.span.start) * 1000, 3)
+        if exc is not None:
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        return False
+
+
+def span(name: str, **attributes):
+    """
+    Etkin izde iç içe bir span açar (with bloğu). İz yoksa boş span döner.
+
+    Örnek:
+        with span("act.step", task="soru_uretim") as s:
+            s.set_attribute("questions", 5)
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _SpanContext(trace, name, attributes)
+
+
+def traced(name: str):
+    """
+    Metodu span içinde çalıştıran dekoratör. İlk argümanın agent_id özelliği varsa span'e eklenir.
+    İz yoksa fonksiyon doğrudan çağrılır.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _current_trace.get()
+            if trace is None:
+                return func(*args, **kwargs)
+            agent_id = getattr(args[0], "agent_id", None) if args else None
+            with _SpanContext(trace, name, {"agent_id": agent_id} if agent_id else {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def set_span_attribute(key: str, value: Any):
+    """Etkin span'e özellik ekler (iz yoksa hiçbir şey yapmaz)"""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes[key] = value
+
+
+def record_provider_call(provider: str, method: str, duration_ms: float, outcome: str):
+    """Provider çağrısını etkin span'e (yoksa kök span'e) ekler"""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    target = _current_span.get() or trace.root
+    target.provider_calls.append({
+        "provider": provider,
+        "method": method,
+        "duration_ms": round(duration_ms, 3),
+        "outcome": outcome,
+    })
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+@contextmanager
+def start_trace(name: str, force: bool = False, **attributes) -> Iterator[Optional[Trace]]:
+    """
+    Bir iz başlatır; blok bitince iz halka tampona eklenir.
+    İzleme kapalıysa ve force verilmemişse None döner (span'ler boş çalışır).
+    """
+    if not (TRACING_ENABLED or force):
+        yield None
+        return
+
+    trace = Trace(name, attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        trace.root.duration_ms = round((time.perf_counter() - trace.root.start) * 1000, 3)
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        with _buffer_lock:
+            _buffer.append(trace)
+
+
+def recent_traces(limit: int = 20) -> List[Dict[str, Any]]:
+    """Son izlerin özetleri (yeniden eskiye)"""
+    with _buffer_lock:
+        traces = list(_buffer)
+    return [trace.summary() for trace in reversed(traces[-limit:])] if limit > 0 else []
+
+
+def get_trace(trace_id: str) -> Optional[Dict[str, Any]]:
+    """Halka tampondaki izin tam span ağacı (bulunamazsa None)"""
+    with _buffer_lock:
+        for trace in reversed(_buffer):
+            if trace.trace_id == trace_id:
+                return trace.to_dict()
+    return None
@@ -0,0 +1,308 @@
+"""
+Kullanım Muhasebesi - Provider çağrılarının token ve maliyet kaydı, kullanıcı bütçeleri
+Her provider çağrısının istem (prompt) ve yanıt (completion) token'ları kullanıcıya ve endpoint'e
+atfedilir. Sayaçlar bellekte kilit altında toplanır ve arka plan thread'i tarafından periyodik
+olarak SQLite'a yazılır; istek yolunda disk erişimi yoktur.
+Günlük token bütçesi aşılmış kullanıcıların istekleri provider'a gönderilmeden 429 ile reddedilir.
+Kimliği verilmeyen istekler istemci adresine göre ayrı anonim kovalarda sayılır ve onlara da
+bütçe uygulanır; X-User-Id göndermemek bütçeyi atlatmaz.
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+from fastapi import HTTPException
+
+from services.request_context import get_user_id, get_endpoint, get_client_address
+
+USAGE_ACCOUNTING_ENABLED = os.getenv("USAGE_ACCOUNTING_ENABLED", "true").lower() == "true"
+USAGE_DB_PATH = os.getenv(
+    "USAGE_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "usage.db")
+)
+# Bellekteki sayaçların diske yazılma aralığı (saniye)
+USAGE_FLUSH_SECONDS = float(os.getenv("USAGE_FLUSH_SECONDS", "10"))
+
+# 1 milyon token başına USD fiyat (varsayılanlar gemini-2.5-flash liste fiyatı); yerel provider'lar ücretsiz
+PROVIDER_PRICES = {
+    "GeminiProvider": (
+        float(os.getenv("GEMINI_PRICE_INPUT_PER_1M", "0.30")),
+        float(os.getenv("GEMINI_PRICE_OUTPUT_PER_1M", "2.50")),
+    ),
+}
+
+# Kullanıcı başına günlük token bütçesi (0 = sınırsız); USER_BUDGETS ile kullanıcıya özel değer verilir
+# Örnek: USER_BUDGETS='{"ogretmen1": 500000, "demo": 20000}'
+USER_DAILY_TOKEN_BUDGET = int(os.getenv("USER_DAILY_TOKEN_BUDGET", "0"))
+try:
+    USER_BUDGETS: Dict[str, int] = {str(k): int(v) for k, v in json.loads(os.getenv("USER_BUDGETS", "{}")).items()}
+except (ValueError, AttributeError) as e:
+    print(f"⚠️ USER_BUDGETS okunamadı, yok sayılıyor: {e}")
+    USER_BUDGETS = {}
+
+# Kimliği bilinmeyen istekler bu ad altında, istemci adresi biliniyorsa "anonim:<adres>" olarak toplanır
+ANONYMOUS_USER = "anonim"
+# Her anonim kovanın günlük token bütçesi (0 = sınırsız); varsayılan kullanıcı bütçesiyle aynıdır
+ANONYMOUS_DAILY_TOKEN_BUDGET = int(os.getenv("ANONYMOUS_DAILY_TOKEN_BUDGET", str(USER_DAILY_TOKEN_BUDGET)))
+# Endpoint dışı çağrılar (arka plan işleri, betikler)
+INTERNAL_ENDPOINT = "internal"
+
+# Yerel provider'lar için yaklaşık karakter / token oranı
+_CHARS_PER_TOKEN = 4
+
+
+class BudgetExceededError(HTTPException):
+    """Kullanıcının günlük token bütçesi doldu (429)"""
+
+    def __init__(self, user_id: str, used: int, budget: int):
+        super().__init__(
+            status_code=429,
+            detail=f"'{user_id}' kullanıcısının günlük token bütçesi doldu ({used}/{budget}). Yarın tekrar deneyin."
+        )
+        self.user_id = user_id
+        self.used = used
+        self.budget = budget
+
+
+def estimate_tokens(value: Any) -> int:
+    """Token sayısı tahmini (yerel provider'lar için); metin dışı sonuçlar JSON olarak ölçülür"""
+    if value is None:
+        return 0
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False, default=str)
+    return (len(value) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+
+def usage_from_response(response) -> Tuple[int, int]:
+    """Gemini yanıtının usage_metadata alanından (istem, yanıt) token sayıları"""
+    usage = getattr(response, "usage_metadata", None)
+    return (
+        getattr(usage, "prompt_token_count", 0) or 0,
+        getattr(usage, "candidates_token_count", 0) or 0,
+    )
+
+
+def accounting_user() -> str:
+    """Bu isteğin kullanım/bütçe kovası: kullanıcı kimliği, yoksa istemci adresine göre anonim kova"""
+    user_id = get_user_id()
+    if user_id:
+        return user_id
+    address = get_client_address()
+    return f"{ANONYMOUS_USER}:{address}" if address else ANONYMOUS_USER
+
+
+def _is_anonymous(user_id: str) -> bool:
+    return user_id == ANONYMOUS_USER or user_id.startswith(ANONYMOUS_USER + ":")
+
+
+def _today() -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+class UsageLedger:
+    """Bellek içi kullanım sayaçları + periyodik SQLite kaydı"""
+
+    def __init__(self, path: str = USAGE_DB_PATH, flush_seconds: float = USAGE_FLUSH_SECONDS):
+        self.path = path
+        self._lock = threading.Lock()
+        # (gün, kullanıcı, endpoint, provider) -> [çağrı, istem token, yanıt token, maliyet]; henüz yazılmamış
+        self._pending: Dict[Tuple[str, str, str, str], List[float]] = {}
+        # (gün, kullanıcı) -> toplam token; bütçe kontrolü diske gitmeden bununla yapılır
+        self._daily_tokens: Dict[Tuple[str, str], int] = {}
+        self._stop = threading.Event()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS usage (
+                day TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                calls INTEGER NOT NULL DEFAULT 0,
+                prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                completion_tokens INTEGER NOT NULL DEFAULT 0,
+                cost_usd REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, user_id, endpoint, provider)
+            )
+        """)
+        self._conn.commit()
+        self._db_lock = threading.Lock()
+
+        # Yeniden başlatmada bugünkü harcamalar unutulmasın
+        today = _today()
+        for user_id, tokens in self._conn.execute(
+            "SELECT user_id, SUM(prompt_tokens + completion_tokens) FROM usage WHERE day = ? GROUP BY user_id", (today,)
+        ):
+            self._daily_tokens[(today, user_id)] = int(tokens or 0)
+
+        if flush_seconds > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, args=(flush_seconds,), daemon=True, name="usage-flush")
+            self._flusher.start()
+        atexit.register(self.close)
+
+    def record(self, provider: str, prompt_tokens: int, completion_tokens: int,
+               user_id: Optional[str] = None, endpoint: Optional[str] = None):
+        """Bir provider çağrısını kaydeder; kullanıcı/endpoint verilmezse istek bağlamından okunur"""
+        user_id = user_id or accounting_user()
+        endpoint = endpoint or get_endpoint() or INTERNAL_ENDPOINT
+        input_price, output_price = PROVIDER_PRICES.get(provider, (0.0, 0.0))
+        cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+        day = _today()
+
+        with self._lock:
+            counters = self._pending.get((day, user_id, endpoint, provider))
+            if counters is None:
+                counters = self._pending[(day, user_id, endpoint, provider)] = [0, 0, 0, 0.0]
+            counters[0] += 1
+            counters[1] += prompt_tokens
+            counters[2] += completion_tokens
+            counters[3] += cost
+            self._daily_tokens[(day, user_id)] = self._daily_tokens.get((day, user_id), 0) + prompt_tokens + completion_tokens
+
+    def budget_for(self, user_id: str) -> int:
+        """Kullanıcının günlük token bütçesi (0 = sınırsız)"""
+        if user_id in USER_BUDGETS:
+            return USER_BUDGETS[user_id]
+        return ANONYMOUS_DAILY_TOKEN_BUDGET if _is_anonymous(user_id) else USER_DAILY_TOKEN_BUDGET
+
+    def tokens_today(self, user_id: str) -> int:
+        return self._daily_tokens.get((_today(), user_id), 0)
+
+    def check_budget(self, user_id: Optional[str] = None, estimated_tokens: int = 0):
+        """
+        Provider'a gönderilmeden önce çağrılır; bütçesi dolmuş ya da tahmini istem token'ıyla
+        dolacak kullanıcı için BudgetExceededError atar. Kimliği bilinmeyen istekler anonim kovalarının bütçesine tabidir.
+        """
+        user_id = user_id or accounting_user()
+        budget = self.budget_for(user_id)
+        if budget <= 0:
+            return
+        used = self.tokens_today(user_id)
+        if used >= budget or used + estimated_tokens > budget:
+            raise BudgetExceededError(user_id, used, budget)
+
+    def flush(self):
+        """Bekleyen sayaçları tek işlemde SQLite'a ekler"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            # Önceki günlerin bütçe sayaçları artık gerekmez
+            today = _today()
+            for key in [k for k in self._daily_tokens if k[0] != today]:
+                del self._daily_tokens[key]
+        if not pending:
+            return
+        rows = [(*key, int(c[0]), int(c[1]), int(c[2]), c[3]) for key, c in pending.items()]
+        with self._db_lock:
+            self._conn.executemany("""
+                INSERT INTO usage (day, user_id, endpoint, provider, calls, prompt_tokens, completion_tokens, cost_usd)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (day, user_id, endpoint, provider) DO UPDATE SET
+                    calls = calls + excluded.calls,
+                    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                    completion_tokens = completion_tokens + excluded.completion_tokens,
+                    cost_usd = cost_usd + excluded.cost_usd
+            """, rows)
+            self._conn.commit()
+
+    def _flush_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Kullanım kayıtları yazılamadı: {e}")
+
+    def close(self):
+        self._stop.set()
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"⚠️ Kullanım kayıtları yazılamadı: {e}")
+
+    def report(self, user_id: Optional[str] = None, day: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Günlük kullanım raporu (bekleyen sayaçlar önce yazılır).
+
+        Returns:
+            {"day", "totals", "by_endpoint", "by_provider", "by_user" veya "budget"}
+        """
+        self.flush()
+        day = day or _today()
+        where = "day = ?"
+        params: List[Any] = [day]
+        if user_id:
+            where += " AND user_id = ?"
+            params.append(user_id)
+
+        def grouped(column: str) -> Dict[str, Dict[str, Any]]:
+            with self._db_lock:
+                rows = self._conn.execute(f"""
+                    SELECT {column}, SUM(calls), SUM(prompt_tokens), SUM(completion_tokens), SUM(cost_usd)
+                    FROM usage WHERE {where} GROUP BY {column} ORDER BY SUM(prompt_tokens + completion_tokens) DESC
+                """, params).fetchall()
+            return {
+                row[0]: {"calls": row[1], "prompt_tokens": row[2], "completion_tokens": row[3], "cost_usd": round(row[4], 6)}
+                for row in rows
+            }
+
+        by_endpoint = grouped("endpoint")
+        totals = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+        for entry in by_endpoint.values():
+            for key in totals:
+                totals[key] += entry[key]
+        totals["cost_usd"] = round(totals["cost_usd"], 6)
+
+        report = {"day": day, "totals": totals, "by_endpoint": by_endpoint, "by_provider": grouped("provider")}
+        if user_id:
+            budget = self.budget_for(user_id)
+            report["user_id"] = user_id
+            report["budget"] = {
+                "daily_tokens": budget or None,
+                "used": totals["prompt_tokens"] + totals["completion_tokens"],
+                "remaining": max(0, budget - totals["prompt_tokens"] - totals["completion_tokens"]) if budget else None
+            }
+        else:
+            report["by_user"] = grouped("user_id")
+        return report
+
+
+# Global kullanım defteri
+_usage_ledger: Optional[UsageLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_usage_ledger() -> Optional[UsageLedger]:
+    """Kullanım defterini al veya oluştur (muhasebe kapalıysa veya açılamazsa None)"""
+    global _usage_ledger
+    if not USAGE_ACCOUNTING_ENABLED:
+        return None
+    if _usage_ledger is None:
+        with _ledger_lock:
+            if _usage_ledger is None:
+                try:
+                    _usage_ledger = UsageLedger()
+                except Exception as e:
+                    print(f"⚠️ Kullanım muhasebesi başlatılamadı: {e}")
+                    return None
+    return _usage_ledger
+
+
+def record_usage(provider: str, prompt_tokens: int, completion_tokens: int):
+    """Provider katmanı için kısayol; muhasebe kapalıysa hiçbir şey yapmaz"""
+    ledger = get_usage_ledger()
+    if ledger is not None:
+        ledger.record(provider, prompt_tokens, completion_tokens)
+
+
+def check_budget(estimated_tokens: int = 0):
+    """Provider'a gönderimden önce bütçe kontrolü; muhasebe kapalıysa hiçbir şey yapmaz"""
+    ledger = get_usage_ledger()
+    if ledger is not None:
+        ledger.check_budget(estimated_tokens=estimated_tokens)